@@ -0,0 +1,219 @@
+import pygame
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Assets():
+    """
+    Shared image cache\n
+    Startup images are decoded on a thread pool while the first frame renders, rarely used
+    images (win screen, late-tier machines) are only decoded the first time they're needed.
+    Every image is decoded once, callers share the cached surface.
+    """
+    IMG_DIR = "img"
+    LAZY = ("img/win.jpg", "img/machine_quantum_pc.png") # never preloaded
+    WORKERS = 4
+
+    cache = {} # path: pygame.Surface
+    pending = {} # path: Future, decoding in background
+    decode_ms = {} # path: ms spent decoding, for startup report
+    executor = None
+
+
+    @staticmethod
+    def decode(path: str) -> tuple:
+        """Runs on the pool, pygame releases the GIL while decoding"""
+        start = time.perf_counter()
+        surf = pygame.image.load(path)
+        return surf, (time.perf_counter() - start) * 1000
+
+
+    @classmethod
+    def preload(cls, paths: list = None):
+        """Start decoding in the background, defaults to everything in IMG_DIR not in LAZY"""
+        if paths == None:
+            paths = [
+                f"{cls.IMG_DIR}/{name}" for name in sorted(os.listdir(cls.IMG_DIR))
+                if f"{cls.IMG_DIR}/{name}" not in cls.LAZY
+            ]
+
+        if cls.executor == None:
+            cls.executor = ThreadPoolExecutor(max_workers=cls.WORKERS, thread_name_prefix="assets")
+
+        for path in paths:
+            if path not in cls.cache and path not in cls.pending:
+                cls.pending[path] = cls.executor.submit(cls.decode, path)
+
+
+    @classmethod
+    def get(cls, path: str) -> pygame.Surface:
+        """Cached surface, waits for a background decode or decodes right now if never requested"""
+        surf = cls.cache.get(path)
+        if surf != None:
+            return surf
+
+        future = cls.pending.pop(path, None)
+        if future != None:
+            surf, ms = future.result()
+        else:
+            # lazy, first use
+            surf, ms = cls.decode(path)
+
+        cls.cache[path] = surf
+        cls.decode_ms[path] = ms
+        return surf
+
+
+    @classmethod
+    def peek(cls, path: str) -> pygame.Surface | None:
+        """Cached surface without waiting, None if it's still decoding or not requested yet"""
+        if path in cls.cache:
+            return cls.cache[path]
+
+        future = cls.pending.get(path)
+        if future != None and future.done():
+            return cls.get(path)
+        return None
+
+
+    @classmethod
+    def clear(cls):
+        """Drop every cached surface"""
+        for future in cls.pending.values():
+            future.cancel()
+        cls.cache.clear()
+        cls.pending.clear()
+        cls.decode_ms.clear()
+
+
+class Atlas():
+    """
+    Texture atlas, every icon_* and machine_* sprite packed into one surface in display format\n
+    Blits use a subrect of the one surface instead of many small unconverted surfaces,
+    so no blit pays for pixel format conversion. Lazy sprites get packed on first use.
+    """
+    PREFIXES = ("icon_", "machine_")
+    WIDTH = 256
+
+    surf = None
+    rects = {} # path: pygame.Rect inside surf
+    shelf = [0, 0, 0] # packing cursor: x, y, height of current shelf
+
+
+    @classmethod
+    def has(cls, path: str) -> bool:
+        """True if path is a sprite that lives in the atlas"""
+        return os.path.basename(path).startswith(cls.PREFIXES)
+
+
+    @classmethod
+    def build(cls):
+        """Pack every non-lazy sprite, waits for any still decoding"""
+        paths = [
+            f"{Assets.IMG_DIR}/{name}" for name in sorted(os.listdir(Assets.IMG_DIR))
+            if cls.has(name) and f"{Assets.IMG_DIR}/{name}" not in Assets.LAZY
+        ]
+        sprites = [(path, Assets.get(path)) for path in paths]
+        
+        # tallest first packs shelves tighter
+        sprites.sort(key=lambda item: item[1].get_height(), reverse=True)
+        
+        cls.rects = {}
+        cls.shelf = [0, 0, 0]
+        cls.surf = cls.new_surface(cls.WIDTH, 50)
+        for path, sprite in sprites:
+            cls.pack(path, sprite)
+
+
+    @staticmethod
+    def new_surface(width: int, height: int) -> pygame.Surface:
+        """Transparent surface, in display format once there is a display"""
+        surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        if pygame.display.get_surface() != None:
+            surf = surf.convert_alpha()
+        surf.fill((0, 0, 0, 0))
+        return surf
+
+
+    @classmethod
+    def pack(cls, path: str, sprite: pygame.Surface):
+        """Place one sprite on the current shelf, growing the atlas if it runs out of rows"""
+        width, height = sprite.get_size()
+        x, y, shelf_height = cls.shelf
+        if x + width > cls.WIDTH:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        
+        if y + height > cls.surf.get_height():
+            grown = cls.new_surface(cls.WIDTH, y + height)
+            grown.blit(cls.surf, (0, 0))
+            cls.surf = grown
+        
+        cls.surf.blit(sprite, (x, y))
+        cls.rects[path] = pygame.Rect(x, y, width, height)
+        cls.shelf = [x + width, y, max(shelf_height, height)]
+        
+        # the atlas has the pixels now, the standalone surface isn't needed
+        Assets.cache.pop(path, None)
+
+
+    @classmethod
+    def rect(cls, path: str) -> pygame.Rect:
+        """Subrect of a sprite, builds the atlas or packs a lazy sprite on first use"""
+        if cls.surf == None:
+            cls.build()
+        rect = cls.rects.get(path)
+        if rect == None:
+            cls.pack(path, Assets.get(path))
+            rect = cls.rects[path]
+        return rect
+
+
+    @classmethod
+    def sprite(cls, path: str) -> pygame.Surface:
+        """Sprite as a subsurface view of the atlas, for transforms like rotate"""
+        rect = cls.rect(path) # may grow the atlas, so before touching surf
+        return cls.surf.subsurface(rect)
+
+
+    @classmethod
+    def blit(cls, target: pygame.Surface, path: str, coord: tuple) -> pygame.Rect:
+        """Blit a sprite straight from the atlas, returns its subrect"""
+        rect = cls.rect(path)
+        target.blit(cls.surf, coord, rect)
+        return rect
+
+
+    @classmethod
+    def clear(cls):
+        cls.surf = None
+        cls.rects = {}
+        cls.shelf = [0, 0, 0]
+
+
+class StartupTimer():
+    """Startup time breakdown, mark() after each phase and report() once the first frame is up"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = [] # list of (name, ms)
+
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+
+    def total_ms(self) -> float:
+        return (self.last - self.start) * 1000
+
+
+    def report(self) -> str:
+        """One line summary, ex. startup: init 40ms, world 12ms, ... | first frame at 190ms"""
+        phases = ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.phases)
+        decoded = sum(Assets.decode_ms.values())
+        return (
+            f"startup: {phases} | first frame at {self.total_ms():.0f}ms"
+            f" | {len(Assets.decode_ms)} images decoded ({decoded:.0f}ms), {len(Assets.pending)} still loading"
+        )
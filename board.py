@@ -0,0 +1,448 @@
+import pygame
+import math
+import numpy as np
+from assets import Atlas
+from catalog import MACHINE_SPRITES
+
+
+class Camera():
+    """
+    Pan and zoom over a board that can be much bigger than the view\n
+    zoom is the tile size in layout pixels, one of ZOOMS. left and top are the board position
+    at the view's top left corner, in tiles. to_board and to_view convert between the view's
+    layout pixels and board pixels (50 per tile, what clicks and floaters use).
+    """
+    ZOOMS = (50, 36, 25, 16, 10, 6, 4, 2, 1, .5, .25, .125)
+    DETAIL_AT = 16 # from this tile size machines are rotated sprites, below they're colored markers
+    MINIMAP_SIZE = 180 # longest side of the minimap in layout pixels
+    MINIMAP_MARGIN = 10
+
+    def __init__(self, board_size: tuple, view_size: tuple):
+        self.board_size = board_size
+        self.view_size = view_size # layout pixels of the board area on screen
+        self.zoom_index = 0
+        self.left = 0.0
+        self.top = 0.0
+        self.version = 0 # bumps on every move, renderers cache the view per version
+        self.clamp()
+
+
+    @property
+    def zoom(self) -> float:
+        return self.ZOOMS[self.zoom_index]
+
+
+    @property
+    def detailed(self) -> bool:
+        return self.zoom >= self.DETAIL_AT
+
+
+    def clamp(self):
+        """Keep the board on screen, a board smaller than the view is centered"""
+        spans = (self.view_size[0] / self.zoom, self.view_size[1] / self.zoom)
+        pos = [self.left, self.top]
+        for axis in (0, 1):
+            if self.board_size[axis] <= spans[axis]:
+                pos[axis] = (self.board_size[axis] - spans[axis]) / 2
+            else:
+                pos[axis] = min(max(pos[axis], 0), self.board_size[axis] - spans[axis])
+        self.left, self.top = pos
+        self.version += 1
+
+
+    def pan(self, dx: float, dy: float):
+        """Move by layout pixels, the same speed on screen at every zoom"""
+        self.left += dx / self.zoom
+        self.top += dy / self.zoom
+        self.clamp()
+
+
+    def zoom_by(self, steps: int, anchor: tuple = None):
+        """Zoom in (steps > 0) or out, the tile under anchor (view layout pixels) stays put"""
+        if anchor == None:
+            anchor = (self.view_size[0] / 2, self.view_size[1] / 2)
+        tile_x = self.left + anchor[0] / self.zoom
+        tile_y = self.top + anchor[1] / self.zoom
+        self.zoom_index = min(max(self.zoom_index - steps, 0), len(self.ZOOMS) - 1)
+        self.left = tile_x - anchor[0] / self.zoom
+        self.top = tile_y - anchor[1] / self.zoom
+        self.clamp()
+
+
+    def center_on(self, tile: tuple):
+        self.left = tile[0] - self.view_size[0] / self.zoom / 2
+        self.top = tile[1] - self.view_size[1] / self.zoom / 2
+        self.clamp()
+
+
+    def to_board(self, view_pos: tuple) -> tuple:
+        """View layout pixels to board pixels"""
+        return ((self.left + view_pos[0] / self.zoom) * 50, (self.top + view_pos[1] / self.zoom) * 50)
+
+
+    def to_view(self, board_pos: tuple) -> tuple | None:
+        """Board pixels to view layout pixels, None if that's outside the view"""
+        x = (board_pos[0] / 50 - self.left) * self.zoom
+        y = (board_pos[1] / 50 - self.top) * self.zoom
+        if 0 <= x < self.view_size[0] and 0 <= y < self.view_size[1]:
+            return (x, y)
+        return None
+
+
+    def on_board(self, view_pos: tuple) -> bool:
+        x = self.left + view_pos[0] / self.zoom
+        y = self.top + view_pos[1] / self.zoom
+        return 0 <= x < self.board_size[0] and 0 <= y < self.board_size[1]
+
+
+    def covers_view(self) -> bool:
+        return self.left >= 0 and self.top >= 0
+
+
+    def visible_tiles(self) -> tuple:
+        """(x0, y0, x1, y1) tile range on screen, end exclusive"""
+        return (
+            max(math.floor(self.left), 0),
+            max(math.floor(self.top), 0),
+            min(math.ceil(self.left + self.view_size[0] / self.zoom), self.board_size[0]),
+            min(math.ceil(self.top + self.view_size[1] / self.zoom), self.board_size[1]),
+        )
+
+
+    def minimap_rect(self) -> pygame.Rect | None:
+        """Layout rect of the minimap, bottom left of the view. None while the whole board is in view"""
+        if self.board_size[0] * self.zoom <= self.view_size[0] and self.board_size[1] * self.zoom <= self.view_size[1]:
+            return None
+        per_tile = self.MINIMAP_SIZE / max(self.board_size)
+        width = max(round(self.board_size[0] * per_tile), 1)
+        height = max(round(self.board_size[1] * per_tile), 1)
+        return pygame.Rect(self.MINIMAP_MARGIN, self.view_size[1] - height - self.MINIMAP_MARGIN, width, height)
+
+
+    def minimap_tile(self, view_pos: tuple) -> tuple:
+        """Board tile under a point on the minimap"""
+        rect = self.minimap_rect()
+        return (
+            (view_pos[0] - rect.x) / rect.width * self.board_size[0],
+            (view_pos[1] - rect.y) / rect.height * self.board_size[1],
+        )
+
+
+class BoardRenderer():
+    """
+    Whole-board renderer\n
+    Per-tile RGB lives in one small (width, height, 3) array. A redraw writes it to a
+    one-pixel-per-tile surface with surfarray and nearest-neighbour upscales that onto the
+    board surface in one bulk operation, then only the machine sprites are overlaid.
+    scale draws everything at a fraction of the 50 pixel tile size for a smaller screen.\n
+    With a camera only the part of the board in view is drawn. Zoomed out past
+    Camera.DETAIL_AT machines become colored markers in the tile colors, and past one pixel
+    per tile the colors come from a mip pyramid of 2x2 averages. The pyramid and the minimap
+    are kept up to date one changed tile at a time, so a frame costs the same on any board size.
+    """
+    TILE_PIXELS = 50
+    BACKGROUND = (12, 12, 16) # view around a board smaller than it
+    SPIN_CACHE = 1024 # rotated sprites kept for one tile size, a few hundred angles of each machine
+
+    def __init__(self, board_size: tuple, scale: float = 1.0):
+        self.board_size = board_size
+        self.scale = scale
+        self.tile_pixels = self.TILE_PIXELS * scale # on screen
+        self.colors = np.zeros((board_size[0], board_size[1], 3), dtype=np.uint8) # index [x, y]
+        self.dirty = True # colors changed since last upscale
+
+        self.small = pygame.Surface(board_size)
+        self.base = pygame.Surface((round(board_size[0] * self.tile_pixels), round(board_size[1] * self.tile_pixels)))
+        self.frame = 0
+        self.rotated = {} # tile index: (sprite path, angle, rotated surface, tile size)
+        self.spins = {} # (sprite path, angle mod 360): rotated surface at spins_px, shared by every machine
+        self.spins_px = None
+        self.sprites = {} # sprite path: sprite at scale, below scale 1
+        
+        # camera view, see draw_view
+        self.camera = None
+        self.machine_codes = np.zeros(board_size, dtype=np.uint8) # index [x, y], for markers
+        self.zoomed = {} # (sprite path, tile size): sprite at that zoom
+        self.view_surf = None # scaled board colors in view
+        self.view_key = None # what view_surf was drawn for
+        
+        # level of detail, built the first time the camera zooms out
+        self.levels = None # mip pyramid, level k averages 2^k x 2^k tiles, level 0 has markers
+        self.changed = [] # tile coords changed since the pyramid was last updated
+        self.lod_version = 0 # bumps whenever the pyramid changes
+        self.markers = None # index machine code: marker color
+        self.minimap = None # one pixel per cell of minimap_level
+        self.minimap_level = 0
+        self.minimap_scaled = None # (lod_version, surface at minimap size)
+        self.touched = None # tile coords changed since a spectator stream last took them, see watch
+
+
+    def paint(self, coord: tuple, color: tuple):
+        """A tile changed color"""
+        self.colors[coord] = color
+        self.dirty = True
+        if self.levels != None:
+            self.changed.append(coord)
+        if self.touched != None:
+            self.touched.add(coord)
+
+
+    def set_machine(self, coord: tuple, code: int):
+        """A tile's machine changed, far out it shows as a marker"""
+        self.machine_codes[coord] = code
+        if self.levels != None:
+            self.changed.append(coord)
+        if self.touched != None:
+            self.touched.add(coord)
+
+
+    def load(self, colors: np.ndarray, machine_codes: np.ndarray):
+        """Replace every tile's color and machine at once, only the tiles that differ count as changed"""
+        diff = np.any(colors != self.colors, axis=2) | (machine_codes != self.machine_codes)
+        if not diff.any():
+            return
+        self.colors[:] = colors
+        self.machine_codes[:] = machine_codes
+        self.dirty = True
+        if self.levels != None:
+            self.changed.extend(zip(*np.nonzero(diff)))
+        if self.touched != None:
+            self.touched.update(zip(*(axis.tolist() for axis in np.nonzero(diff))))
+
+
+    def watch(self) -> set:
+        """Start recording every tile coord whose color or machine changes, the set fills until it's cleared"""
+        if self.touched == None:
+            self.touched = set()
+        return self.touched
+
+
+    def draw(self, screen: pygame.Surface, machines: list, render_every: int = 1):
+        """
+        Draw the board to screen.\n
+        machines: list of (tile index, tile coord, sprite path, angle).
+        A machine's rotation is only recomputed every render_every frames, staggered by tile
+        """
+        if self.camera != None:
+            self.draw_view(screen, machines, render_every)
+            return
+        
+        if self.dirty:
+            pygame.surfarray.blit_array(self.small, self.colors)
+            pygame.transform.scale(self.small, self.base.get_size(), self.base)
+            self.dirty = False
+        screen.blit(self.base, (0, 0))
+
+        self.frame += 1
+        for index, coord, path, angle in machines:
+            cached = self.rotated.get(index)
+            stale = cached == None or cached[0] != path
+            if stale or (cached[1] != angle and (self.frame + index) % render_every == 0):
+                surf = self.spin(path, angle, self.tile_pixels)
+                cached = (path, angle, surf, self.tile_pixels)
+                self.rotated[index] = cached
+
+            surf = cached[2]
+            x_offset = (self.tile_pixels - surf.get_width()) / 2
+            y_offset = (self.tile_pixels - surf.get_height()) / 2
+            screen.blit(surf, (coord[0] * self.tile_pixels + x_offset, coord[1] * self.tile_pixels + y_offset))
+    
+    
+    def sprite(self, path: str) -> pygame.Surface:
+        """Machine sprite at this renderer's scale"""
+        if self.scale == 1:
+            return Atlas.sprite(path)
+        
+        surf = self.sprites.get(path)
+        if surf == None:
+            sprite = Atlas.sprite(path)
+            size = (max(round(sprite.get_width() * self.scale), 1), max(round(sprite.get_height() * self.scale), 1))
+            surf = pygame.transform.smoothscale(sprite, size)
+            self.sprites[path] = surf
+        return surf
+
+    
+    
+    # ---------------- camera view ----------------
+    def draw_view(self, screen: pygame.Surface, machines: list, render_every: int = 1):
+        """Draw the part of the board the camera sees, machines only needs the visible ones"""
+        camera = self.camera
+        tile_px = camera.zoom * self.scale # tile size in render pixels
+        
+        # edge tiles hang past the view, keep them off the sidebar
+        view = pygame.Rect(0, 0, round(camera.view_size[0] * self.scale), round(camera.view_size[1] * self.scale))
+        clip = screen.get_clip()
+        screen.set_clip(view)
+        if not camera.covers_view():
+            screen.fill(self.BACKGROUND, view)
+        
+        if camera.minimap_rect() != None or not camera.detailed:
+            self.update_levels()
+        
+        x0, y0, x1, y1 = camera.visible_tiles()
+        if camera.detailed:
+            level, colors = 0, self.colors
+            key = ("detail", camera.version, self.scale)
+            if self.dirty:
+                self.view_key = None
+                self.dirty = False
+        else:
+            # coarsest level that still gives every cell at least a pixel, small boards run out of levels first
+            level = min(max(math.ceil(math.log2(1 / tile_px)), 0), len(self.levels) - 1) if tile_px < 1 else 0
+            colors = self.levels[level]
+            key = ("lod", camera.version, self.scale, level, self.lod_version)
+        
+        cell = 2 ** level
+        cx0, cy0 = x0 // cell, y0 // cell
+        cx1, cy1 = min(-(-x1 // cell), colors.shape[0]), min(-(-y1 // cell), colors.shape[1])
+        if key != self.view_key:
+            region = colors[cx0:cx1, cy0:cy1]
+            size = (max(round((cx1 - cx0) * cell * tile_px), 1), max(round((cy1 - cy0) * cell * tile_px), 1))
+            self.view_surf = pygame.transform.scale(pygame.surfarray.make_surface(region), size)
+            self.view_key = key
+        screen.blit(self.view_surf, ((cx0 * cell - camera.left) * tile_px, (cy0 * cell - camera.top) * tile_px))
+        
+        if camera.detailed:
+            self.frame += 1
+            for index, coord, path, angle in machines:
+                cached = self.rotated.get(index)
+                stale = cached == None or cached[0] != path or cached[3] != tile_px
+                if stale or (cached[1] != angle and (self.frame + index) % render_every == 0):
+                    cached = (path, angle, self.spin(path, angle, tile_px), tile_px)
+                    self.rotated[index] = cached
+                
+                surf = cached[2]
+                screen.blit(surf, (
+                    (coord[0] - camera.left) * tile_px + (tile_px - surf.get_width()) / 2,
+                    (coord[1] - camera.top) * tile_px + (tile_px - surf.get_height()) / 2
+                ))
+        
+        self.draw_minimap(screen)
+        screen.set_clip(clip)
+    
+    
+    def spin(self, path: str, angle: float, tile_px: float) -> pygame.Surface:
+        """
+        Machine sprite rotated to angle at tile_px.\n
+        Spin rates are whole degrees per tick, so machines keep landing on the same angles and
+        a spinning board reuses surfaces instead of rotating a new one per machine per frame
+        """
+        if tile_px != self.spins_px or len(self.spins) >= self.SPIN_CACHE:
+            self.spins.clear()
+            self.spins_px = tile_px
+        key = (path, angle % 360)
+        surf = self.spins.get(key)
+        if surf == None:
+            surf = pygame.transform.rotate(self.zoom_sprite(path, tile_px), angle)
+            self.spins[key] = surf
+        return surf
+    
+    
+    def zoom_sprite(self, path: str, tile_px: float) -> pygame.Surface:
+        """Machine sprite sized for tiles of tile_px render pixels"""
+        if tile_px == self.tile_pixels:
+            return self.sprite(path)
+        surf = self.zoomed.get((path, tile_px))
+        if surf == None:
+            sprite = Atlas.sprite(path)
+            factor = tile_px / self.TILE_PIXELS
+            size = (max(round(sprite.get_width() * factor), 1), max(round(sprite.get_height() * factor), 1))
+            surf = pygame.transform.smoothscale(sprite, size)
+            self.zoomed[(path, tile_px)] = surf
+        return surf
+    
+    
+    def marker_colors(self) -> np.ndarray:
+        """Index machine code: mean color of the sprite's opaque pixels"""
+        markers = np.zeros((len(MACHINE_SPRITES), 3), dtype=np.uint8)
+        for code, path in enumerate(MACHINE_SPRITES):
+            if path == None:
+                continue
+            sprite = Atlas.sprite(path)
+            rgb = pygame.surfarray.array3d(sprite)
+            opaque = pygame.surfarray.array_alpha(sprite) > 128
+            if opaque.any():
+                markers[code] = rgb[opaque].mean(axis=0)
+        return markers
+    
+    
+    def shown_colors(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Tile colors with machine tiles replaced by their marker"""
+        codes = self.machine_codes[xs, ys]
+        return np.where((codes != 0)[..., None], self.markers[codes], self.colors[xs, ys])
+    
+    
+    def update_levels(self):
+        """Build the mip pyramid on first use, after that only redo the cells above changed tiles"""
+        if self.levels == None:
+            self.markers = self.marker_colors()
+            xs, ys = np.indices(self.board_size)
+            self.levels = [self.shown_colors(xs, ys)]
+            while max(self.levels[-1].shape[:2]) > 1:
+                prev = self.levels[-1]
+                padded = np.pad(prev, ((0, prev.shape[0] % 2), (0, prev.shape[1] % 2), (0, 0)), mode="edge").astype(np.uint16)
+                width, height = padded.shape[0] // 2, padded.shape[1] // 2
+                self.levels.append((padded.reshape(width, 2, height, 2, 3).sum(axis=(1, 3)) // 4).astype(np.uint8))
+            
+            # minimap: the first level small enough to be drawn about a pixel per cell
+            limit = Camera.MINIMAP_SIZE * self.scale
+            self.minimap_level = next(k for k, level in enumerate(self.levels) if max(level.shape[:2]) <= limit)
+            self.minimap = pygame.surfarray.make_surface(self.levels[self.minimap_level])
+            self.changed.clear()
+            self.lod_version += 1
+            return
+        
+        if not self.changed:
+            return
+        coords = np.unique(np.array(self.changed, dtype=np.int64).reshape(-1, 2), axis=0)
+        self.changed.clear()
+        xs, ys = coords[:, 0], coords[:, 1]
+        self.levels[0][xs, ys] = self.shown_colors(xs, ys)
+        
+        for k in range(1, len(self.levels)):
+            prev = self.levels[k - 1]
+            cells = np.unique(np.stack((xs // 2, ys // 2), axis=1), axis=0)
+            xs, ys = cells[:, 0], cells[:, 1]
+            
+            # out of range children repeat the edge, same as the padding when built
+            left, top = xs * 2, ys * 2
+            right, bottom = np.minimum(left + 1, prev.shape[0] - 1), np.minimum(top + 1, prev.shape[1] - 1)
+            total = (prev[left, top].astype(np.uint16) + prev[right, top] + prev[left, bottom] + prev[right, bottom])
+            self.levels[k][xs, ys] = total // 4
+            
+            if k == self.minimap_level:
+                pixels = pygame.surfarray.pixels3d(self.minimap)
+                pixels[xs, ys] = self.levels[k][xs, ys]
+                del pixels # unlock
+        if self.minimap_level == 0:
+            pixels = pygame.surfarray.pixels3d(self.minimap)
+            pixels[coords[:, 0], coords[:, 1]] = self.levels[0][coords[:, 0], coords[:, 1]]
+            del pixels
+        self.lod_version += 1
+    
+    
+    def draw_minimap(self, screen: pygame.Surface):
+        """Whole board in the corner of the view with the camera's view outlined"""
+        camera = self.camera
+        rect = camera.minimap_rect()
+        if rect == None:
+            return
+        
+        scaled_rect = pygame.Rect(
+            round(rect.x * self.scale), round(rect.y * self.scale),
+            max(round(rect.width * self.scale), 1), max(round(rect.height * self.scale), 1)
+        )
+        if self.minimap_scaled == None or self.minimap_scaled[0] != self.lod_version:
+            self.minimap_scaled = (self.lod_version, pygame.transform.scale(self.minimap, scaled_rect.size))
+        screen.blit(self.minimap_scaled[1], scaled_rect.topleft)
+        
+        per_tile = scaled_rect.width / camera.board_size[0]
+        x0, y0 = max(camera.left, 0), max(camera.top, 0)
+        x1 = min(camera.left + camera.view_size[0] / camera.zoom, camera.board_size[0])
+        y1 = min(camera.top + camera.view_size[1] / camera.zoom, camera.board_size[1])
+        view = pygame.Rect(
+            scaled_rect.x + round(x0 * per_tile), scaled_rect.y + round(y0 * per_tile),
+            max(round((x1 - x0) * per_tile), 2), max(round((y1 - y0) * per_tile), 2)
+        )
+        pygame.draw.rect(screen, (240, 240, 240), view, 1)
+        pygame.draw.rect(screen, (0, 0, 0), scaled_rect, 1)
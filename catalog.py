@@ -0,0 +1,212 @@
+"""
+Item catalog, every tile, machine and upgrade the shop sells in one place\n
+Adding an item is one entry in ITEMS. The rule names (click, payout, placement, rotation,
+on_buy, sell_to) point at functions in tile.py, which compiles everything once at import
+into integer-coded dispatch tables.
+"""
+
+# tile types, index is the tile type code
+TILE_TYPES = ("dirt", "water", "grass", "pavement", "quantum")
+
+# machines, index is the machine code, 0 means no machine
+MACHINES = (None, "dirtexcav", "house", "grassharv", "waterpump", "market", "quantumpc")
+
+TILE_CODES = {name: code for code, name in enumerate(TILE_TYPES)}
+MACHINE_CODES = {name: code for code, name in enumerate(MACHINES)}
+
+# value of clicking a tile with nothing selected, an int is a flat value, a str is a rule name
+TILE_CLICK = {
+    "dirt": 1,
+    "water": 0,
+    "grass": "grass", # depends on grass stage, exhausts grass
+    "pavement": 7,
+    "quantum": "quantum", # 21k * quantum upgrades
+}
+
+SELL_REFUND = .8 # fraction of current cost given back on sell
+
+# item keys:
+# all: label, kind(tile, machine, upgrade), cost, icon
+# tile: increase(cost change per buy/sell), tile(type it converts to), placement, sell_to(None if not sellable)
+# machine: increase, machine, sprite, profit, payout, placement, rotation, on_buy(optional), sell_to,
+#   payout_every(optional, world ticks between tick payouts, default follows rotation speed)
+# upgrade: upgrade_key(Tile.multiplier key), upgrade_max_stages
+# shop items must come before upgrades, buttons are laid out in this order
+ITEMS = (
+    # ---------------- shop ----------------
+    {
+        "label": "Water Tile",
+        "kind": "tile",
+        "cost": 17,
+        "increase": 0,
+        "icon": "img/icon_blue.png",
+        "tile": "water", # can renew and refresh by buying another on top of old
+        "placement": "any",
+        "sell_to": None,
+    },
+    {
+        "label": "Decorative Pavement",
+        "kind": "tile",
+        "cost": 23,
+        "increase": 0,
+        "icon": "img/icon_pavement.png",
+        "tile": "pavement",
+        "placement": "any",
+        "sell_to": "dirt",
+    },
+    {
+        "label": "Dirt Excavator",
+        "kind": "machine",
+        "cost": 32,
+        "increase": 2,
+        "icon": "img/icon_dirt_excav.png",
+        "machine": "dirtexcav",
+        "sprite": "img/machine_dirt_excav.png",
+        "profit": 1,
+        "payout": "flat",
+        "placement": "empty",
+        "rotation": "spin",
+        "sell_to": "dirt",
+    },
+    {
+        "label": "House",
+        "kind": "machine",
+        "cost": 500,
+        "increase": 24,
+        "icon": "img/icon_house.png",
+        "machine": "house",
+        "sprite": "img/machine_house.png",
+        "profit": 8,
+        "payout": "rent", # random chance to pay rent
+        "placement": "empty",
+        "rotation": "orthogonal",
+        "sell_to": "dirt",
+    },
+    {
+        "label": "Grass Harvester",
+        "kind": "machine",
+        "cost": 2100,
+        "increase": 400,
+        "icon": "img/icon_grass_excav.png",
+        "machine": "grassharv",
+        "sprite": "img/machine_grass_excav.png",
+        "profit": 12,
+        "payout": "grass",
+        "placement": "empty",
+        "rotation": "spin",
+        "sell_to": "grass",
+    },
+    {
+        "label": "Water Pump",
+        "kind": "machine",
+        "cost": 34000,
+        "increase": 1000,
+        "icon": "img/icon_water_pump.png",
+        "machine": "waterpump",
+        "sprite": "img/machine_water_pump.png",
+        "profit": -54, # cost to run pump
+        "payout": "pump",
+        "placement": "empty",
+        "rotation": "pump",
+        "on_buy": "flood", # set tile and adjacent tiles to non-evaporating water
+        "sell_to": "water",
+    },
+    {
+        "label": "Market",
+        "kind": "machine",
+        "cost": 210000,
+        "increase": 10000,
+        "icon": "img/icon_market.png",
+        "machine": "market",
+        "sprite": "img/machine_market.png",
+        "profit": 0, # uses a randomly unique mostly positive, sometimes negative rule
+        "payout": "market",
+        "placement": "empty",
+        "rotation": "orthogonal",
+        "sell_to": "dirt",
+    },
+    {
+        "label": "Quantum Tile",
+        "kind": "tile",
+        "cost": 1001000,
+        "increase": 100000,
+        "icon": "img/icon_quantum_tile.png",
+        "tile": "quantum",
+        "placement": "any",
+        "sell_to": "dirt",
+    },
+    {
+        "label": "Quantum PC",
+        "kind": "machine",
+        "cost": 2001000,
+        "increase": 240000,
+        "icon": "img/icon_quantum_pc.png",
+        "machine": "quantumpc",
+        "sprite": "img/machine_quantum_pc.png",
+        "profit": 20000,
+        "payout": "quantum",
+        "payout_every": 41, # rotation is too fast to pace payouts, the mean period the old spin speeds paid at
+        "placement": "empty",
+        "rotation": "quantum",
+        "sell_to": "quantum_or_dirt", # keeps the quantum tile underneath
+    },
+
+    # ---------------- upgrades ----------------
+    {
+        "label": "Grass Profit x2",
+        "kind": "upgrade",
+        "cost": 170,
+        "icon": "img/icon_grass_mult.png",
+        "upgrade_key": "grass",
+        "upgrade_max_stages": 7,
+    },
+    {
+        "label": "Rent x2",
+        "kind": "upgrade",
+        "cost": 500,
+        "icon": "img/icon_house.png",
+        "upgrade_key": "rent",
+        "upgrade_max_stages": 12,
+    },
+    {
+        "label": "Grass Spreads x2",
+        "kind": "upgrade",
+        "cost": 2100,
+        "icon": "img/icon_grass_mult.png",
+        "upgrade_key": "grassspread",
+        "upgrade_max_stages": 5,
+    },
+    {
+        "label": "Market Mult x2",
+        "kind": "upgrade",
+        "cost": 17000,
+        "icon": "img/icon_market.png",
+        "upgrade_key": "market",
+        "upgrade_max_stages": 6,
+    },
+    {
+        "label": "Quantum Mult x2",
+        "kind": "upgrade",
+        "cost": 1700000,
+        "icon": "img/icon_quantum_pc.png",
+        "upgrade_key": "qt",
+        "upgrade_max_stages": 6,
+    },
+    {
+        "label": "WIN",
+        "kind": "upgrade",
+        "cost": 1000000000,
+        "icon": "img/icon_win.png",
+        "upgrade_key": "win",
+        "upgrade_max_stages": 1,
+    },
+)
+
+ITEM_CODES = {item["label"]: code for code, item in enumerate(ITEMS)}
+SHOP_COUNT = sum(1 for item in ITEMS if item["kind"] != "upgrade")
+
+# machine sprite path, index is the machine code, shared by every tile with that machine
+MACHINE_SPRITES = tuple(
+    next((item["sprite"] for item in ITEMS if item["kind"] == "machine" and item["machine"] == name), None)
+    for name in MACHINES
+)
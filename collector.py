@@ -0,0 +1,106 @@
+"""
+Garbage collection on the main loop's schedule\n
+Once startup is done everything alive (tiles, atlas, fonts, UI) is frozen into gc's permanent
+generation, so no collection ever walks it again, and automatic collection is turned off.
+Instead the loop hands over whatever time is left at the end of each frame: young collections
+run when there's slack, older ones every OLDER_EVERY young ones, full ones while idle.
+If frames never have slack a collection is forced once YOUNG_FORCE objects piled up, and it
+takes the older generations along when they're due, or whatever survives young collections
+would never be collected on a machine that's always busy.
+
+Per frame it also reports net growth of gc tracked objects: gc's young count at frame end
+minus at frame start. That's allocations minus deallocations of tracked objects, and a
+collection during the frame resets it, so it shows leaks and churn trends, not an exact
+allocation count.
+
+Every collection is timed through gc.callbacks, so pauses show up in metrics no matter who
+started them.
+"""
+import gc
+import time
+from metrics import Histogram
+
+
+class GCPacer():
+    """Per-frame tracked object growth and collection scheduler, see module doc"""
+    YOUNG_AT = 700 # gc's own default, new objects before a young collection is due
+    YOUNG_FORCE = 20000 # collect even without slack past this many
+    OLDER_EVERY = 10 # young collections per middle one, and middle ones per full one, same ratio as gc
+    MIN_SLACK_MS = 2 # don't start a collection with less time than this left in the frame
+    PAUSE_BUCKETS = (.0001, .0005, .001, .002, .005, .01, .025, .05, .1) # seconds
+
+    def __init__(self):
+        self.running = False
+        self.frame_began = 0.0 # perf counter
+        self.count_began = 0 # gc young count at frame start
+        self.frame_growth = 0 # net new gc tracked objects last frame, never below 0
+        self.growth = 0 # total of frame_growth
+        self.frames = 0
+        self.pause_seconds = Histogram(self.PAUSE_BUCKETS)
+        self.collections = [0, 0, 0] # per generation
+        self.forced = 0 # collections that had to run without slack
+        self.collect_began = None # perf counter of the collection in progress
+
+
+    def start(self):
+        """Freeze what startup left alive and take over from automatic collection"""
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        gc.callbacks.append(self.on_gc)
+        self.running = True
+
+
+    def stop(self):
+        """Hand collection back to gc"""
+        if not self.running:
+            return
+        gc.callbacks.remove(self.on_gc)
+        gc.unfreeze()
+        gc.enable()
+        self.running = False
+
+
+    def on_gc(self, phase: str, info: dict):
+        if phase == "start":
+            self.collect_began = time.perf_counter()
+        elif self.collect_began != None:
+            self.pause_seconds.observe(time.perf_counter() - self.collect_began)
+            self.collections[info["generation"]] += 1
+            self.collect_began = None
+
+
+    def frame_start(self):
+        self.frame_began = time.perf_counter()
+        self.count_began = gc.get_count()[0]
+
+
+    def frame_end(self, budget_ms: float, idle: bool = False) -> int | None:
+        """Count this frame's object growth and collect if it's due and there's time, returns the generation collected"""
+        young, older, oldest = gc.get_count()
+        self.frame_growth = max(young - self.count_began, 0)
+        self.growth += self.frame_growth
+        self.frames += 1
+        if not self.running:
+            return None
+
+        # idle frames have nothing better to do
+        slack = idle or budget_ms - (time.perf_counter() - self.frame_began) * 1000 >= self.MIN_SLACK_MS
+        generation = None
+        if slack and (oldest >= self.OLDER_EVERY or (idle and (older or oldest))):
+            generation = 2
+        elif slack and young >= self.YOUNG_AT:
+            generation = 1 if older >= self.OLDER_EVERY else 0
+        elif young >= self.YOUNG_FORCE:
+            # no slack is coming, older generations can't wait for it either
+            generation = 2 if oldest >= self.OLDER_EVERY else 1 if older >= self.OLDER_EVERY else 0
+            self.forced += 1
+
+        if generation != None:
+            gc.collect(generation)
+        return generation
+
+
+    def per_frame(self) -> float:
+        """Average net tracked object growth per frame so far"""
+        return self.growth / max(self.frames, 1)
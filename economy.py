@@ -0,0 +1,268 @@
+"""
+Headless Monte Carlo economy runner\n
+Plays many independent worlds with a scripted player across a process pool, to see how
+the catalog costs, profits and upgrade multipliers actually pace a game without playing
+one in real time. Each worker builds its world once and resets it between runs.
+
+python economy.py --runs 32 --strategy priciest --minutes 20 --cps 3
+"""
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from tile import TileManager, Tile, TileFunctions
+from simulation import ButtonState
+from catalog import ITEMS, ITEM_CODES
+
+FPS = 30 # world ticks per second in the real game loop
+STRATEGIES = ("cheapest", "priciest", "upgrades_first")
+
+
+class EconomyWorld():
+    """
+    One reusable headless world plus its shop\n
+    A scripted player clicks random tiles and, every DECIDE_EVERY ticks, buys at most
+    one item picked by a strategy, through the same click_event_value and upgrade_button
+    rules the game uses.
+    """
+    DECIDE_EVERY = 15 # ticks between purchase decisions
+
+    def __init__(self, board_size: tuple = (24, 16)):
+        TileFunctions.BOARD_SIZE = board_size
+        TileFunctions.BOARD_SIZE_PIXELS = (board_size[0] * 50, board_size[1] * 50)
+        self.tile_mgr = TileManager()
+        self.shop = []
+        self.coins = 0
+        self.earned = 0 # income only, purchases don't count
+
+
+    def reset(self, seed: int = None):
+        """Fresh game on the same Tile objects, seed reseeds the random module"""
+        if seed != None:
+            random.seed(seed)
+        self.tile_mgr.reset()
+        self.shop = [ButtonState.from_item(code) for code in range(len(ITEMS))]
+        self.coins = 0
+        self.earned = 0
+
+
+    def run(self, seed: int, strategy: str, max_ticks: int, sample_every: int, clicks_per_tick: float = .1) -> dict:
+        """Play one game until the WIN upgrade or max_ticks"""
+        self.reset(seed)
+        start = time.perf_counter()
+        samples = [] # (tick, coins, income per tick since last sample)
+        last_earned = 0
+        click_debt = 0
+        win_tick = None
+
+        tick = 0
+        while tick < max_ticks and win_tick == None:
+            tick += 1
+            self.step()
+
+            # player clicks
+            click_debt += clicks_per_tick
+            while click_debt >= 1:
+                click_debt -= 1
+                tile = random.choice(self.tile_mgr.sprite_tiles)
+                self.earn(self.tile_mgr.click_event_value(tile.rect.center, self.coins, None))
+
+            if tick % self.DECIDE_EVERY == 0 and self.buy(strategy):
+                win_tick = tick
+
+            if tick % sample_every == 0:
+                samples.append((tick, self.coins, (self.earned - last_earned) / sample_every))
+                last_earned = self.earned
+
+        return {
+            "seed": seed,
+            "strategy": strategy,
+            "win_tick": win_tick,
+            "ticks": tick,
+            "coins": self.coins,
+            "samples": samples,
+            "seconds": time.perf_counter() - start,
+        }
+
+
+    def step(self, ticks: int = 1):
+        """One world step of ticks ticks (see TileManager.simulate), machine payouts go straight to coins"""
+        self.tile_mgr.simulate(ticks)
+        for _, val in self.tile_mgr.queued_val_arr:
+            self.earn(val)
+        self.tile_mgr.queued_val_arr.clear()
+
+
+    def earn(self, val: int):
+        self.coins += val
+        self.earned += val
+
+
+    def buy(self, strategy: str) -> bool:
+        """Buy at most one item, returns True if it was the win upgrade"""
+        state = self.choose(strategy)
+        if state == None:
+            return False
+
+        if state.upgrade_key:
+            return self.upgrade(state)
+
+        tile = self.place(state.item_code)
+        if tile == None:
+            return False
+        val = self.tile_mgr.click_event_value(tile.rect.center, self.coins, state)
+        if isinstance(val, int):
+            self.coins += val
+        return False
+
+
+    def upgrade(self, state: ButtonState) -> bool:
+        """Pay for an affordable upgrade and apply it, returns True if it was the win upgrade"""
+        self.coins -= state.cost
+        state.double_cost()
+        return TileManager.upgrade_button(state)
+
+
+    def affordable(self, state: ButtonState) -> bool:
+        if state.upgrade_key:
+            return state.upgrade_stage <= state.upgrade_max_stages and self.coins > state.cost
+        return ITEMS[state.item_code]["kind"] == "machine" and self.coins >= state.cost
+
+
+    def choose(self, strategy: str) -> ButtonState | None:
+        """Item to buy this decision, None to keep saving"""
+        win = self.shop[ITEM_CODES["WIN"]]
+        if self.affordable(win):
+            return win
+
+        candidates = [state for state in self.shop if self.affordable(state)]
+
+        # a quantum pc only pays on a quantum tile, lay one down first
+        quantum_pc = self.shop[ITEM_CODES["Quantum PC"]]
+        if quantum_pc in candidates and self.place(quantum_pc.item_code) == None:
+            candidates.remove(quantum_pc)
+            quantum_tile = self.shop[ITEM_CODES["Quantum Tile"]]
+            if self.coins >= quantum_tile.cost:
+                candidates.append(quantum_tile)
+
+        if not candidates:
+            return None
+        if strategy == "cheapest":
+            return min(candidates, key=lambda state: state.cost)
+        if strategy == "upgrades_first":
+            upgrades = [state for state in candidates if state.upgrade_key]
+            if upgrades:
+                return min(upgrades, key=lambda state: state.cost)
+        return max(candidates, key=lambda state: state.cost)
+
+
+    def place(self, item_code: int) -> Tile | None:
+        """Random machine-empty tile that suits the item, None if there isn't one"""
+        item = ITEMS[item_code]
+        empty = [st for st in self.tile_mgr.sprite_tiles if not st.machine_code]
+
+        if item.get("payout") == "quantum":
+            suited = [st for st in empty if st.type == "quantum"]
+        elif item.get("payout") == "grass":
+            suited = [st for st in empty if st.type == "grass"] or [st for st in empty if st.type == "dirt"]
+        else:
+            suited = [st for st in empty if st.type == "dirt"]
+
+        if not suited:
+            return None
+        return random.choice(suited)
+
+
+# ---------------- process pool ----------------
+_world = None # one per worker process, reused for every run it gets
+
+
+def _init_worker(board_size: tuple):
+    global _world
+    _world = EconomyWorld(board_size)
+
+
+def _run_one(args: tuple) -> dict:
+    return _world.run(*args)
+
+
+def run_batch(runs: int, strategy: str = "priciest", max_ticks: int = FPS * 60 * 20,
+        sample_every: int = FPS * 60, clicks_per_sec: float = 3, workers: int = None,
+        board_size: tuple = (24, 16), seed: int = 0) -> dict:
+    """Play runs games across a process pool and summarize them"""
+    start = time.perf_counter()
+    jobs = [(seed + i, strategy, max_ticks, sample_every, clicks_per_sec / FPS) for i in range(runs)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(board_size,)) as pool:
+        results = list(pool.map(_run_one, jobs))
+    return summarize(results, time.perf_counter() - start)
+
+
+def summarize(results: list, wall_seconds: float) -> dict:
+    """Time-to-win distribution, mean coins and income curves, throughput"""
+    win_ticks = sorted(result["win_tick"] for result in results if result["win_tick"] != None)
+
+    def percentile(values: list, perc: float):
+        if not values:
+            return None
+        return values[min(int(len(values) * perc), len(values) - 1)]
+
+    # samples line up by index since every run samples on the same ticks, won runs stop early
+    curve = []
+    for i in range(max((len(result["samples"]) for result in results), default=0)):
+        row = [result["samples"][i] for result in results if i < len(result["samples"])]
+        curve.append({
+            "tick": row[0][0],
+            "runs": len(row),
+            "coins": statistics.mean(sample[1] for sample in row),
+            "coins_per_tick": statistics.mean(sample[2] for sample in row),
+        })
+
+    total_ticks = sum(result["ticks"] for result in results)
+    return {
+        "runs": len(results),
+        "wins": len(win_ticks),
+        "win_tick": {"p10": percentile(win_ticks, .1), "p50": percentile(win_ticks, .5), "p90": percentile(win_ticks, .9)},
+        "curve": curve,
+        "sims_per_sec": len(results) / wall_seconds,
+        "ticks_per_sec": total_ticks / wall_seconds,
+    }
+
+
+def report(summary: dict) -> str:
+    """Printable table of a summary"""
+    def minutes(tick):
+        return "-" if tick == None else f"{tick / FPS / 60:.1f}m"
+
+    win = summary["win_tick"]
+    lines = [
+        f"{summary['runs']} runs, {summary['wins']} won | time to win p10 {minutes(win['p10'])}, "
+        f"p50 {minutes(win['p50'])}, p90 {minutes(win['p90'])}",
+        f"{summary['sims_per_sec']:.2f} sims/sec, {summary['ticks_per_sec']:.0f} ticks/sec",
+        f"{'time':>8} {'runs':>5} {'coins':>14} {'coins/tick':>12}",
+    ]
+    for row in summary["curve"]:
+        lines.append(f"{minutes(row['tick']):>8} {row['runs']:>5} {row['coins']:>14.0f} {row['coins_per_tick']:>12.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tile Clicker economy runner")
+    parser.add_argument("--runs", type=int, default=16)
+    parser.add_argument("--strategy", choices=STRATEGIES, default="priciest")
+    parser.add_argument("--minutes", type=float, default=20, help="game minutes per run, at 30 ticks a second")
+    parser.add_argument("--sample", type=float, default=1, help="game minutes between curve samples")
+    parser.add_argument("--cps", type=float, default=3, help="scripted player clicks per second")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to one per cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = run_batch(
+        args.runs, args.strategy,
+        max_ticks=int(args.minutes * 60 * FPS),
+        sample_every=max(int(args.sample * 60 * FPS), 1),
+        clicks_per_sec=args.cps,
+        workers=args.workers,
+        seed=args.seed
+    )
+    print(report(summary))
@@ -0,0 +1,78 @@
+import pygame
+
+
+class IdleMode():
+    """
+    Low-power states for the main loop\n
+    paused: the ESC menu is up. It fades in over a few frames, after that nothing on screen
+    changes until input, so the loop stops drawing and slows to IDLE_FPS.\n
+    unfocused: the window is visible but another one has focus. Still drawn, at UNFOCUSED_FPS.\n
+    hidden: minimized or hidden. Nothing is drawn and the loop runs at IDLE_FPS.\n
+    While unfocused or hidden the world keeps its ACTIVE_FPS ticks a second of game time, but
+    each slow frame advances it in one coarse step covering the ticks it skipped
+    (TileManager.simulate(ticks)), so world CPU drops with the frame rate.
+    """
+    ACTIVE_FPS = 30
+    UNFOCUSED_FPS = 10
+    IDLE_FPS = 5
+    PAUSE_FADE_FRAMES = 32 # menu is alpha 40 over a still board, after this many blends it's fully faded in
+
+    def __init__(self):
+        self.paused = False
+        self.focused = True
+        self.hidden = False
+        self.fade_frames = 0 # menu frames drawn since pausing
+        self.resumed = False # became visible again, screen needs a full redraw
+
+
+    def handle(self, event) -> bool:
+        """Track window events, returns True if the event was one"""
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.focused = True
+        elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+            self.hidden = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWEXPOSED):
+            # the screen surface kept the last frame, it only has to be presented again
+            self.hidden = False
+            self.resumed = True
+        else:
+            return False
+        return True
+
+
+    def set_paused(self, paused: bool):
+        if paused and not self.paused:
+            self.fade_frames = 0
+        self.paused = paused
+
+
+    @property
+    def idle(self) -> bool:
+        return self.paused or self.hidden or not self.focused
+
+
+    def fps(self) -> int:
+        """Frame rate cap for this frame"""
+        if self.hidden or self.paused:
+            return self.IDLE_FPS
+        if not self.focused:
+            return self.UNFOCUSED_FPS
+        return self.ACTIVE_FPS
+
+
+    def ticks_per_frame(self) -> int:
+        """World ticks this frame's one step covers, so the world still runs ACTIVE_FPS ticks a second"""
+        return max(self.ACTIVE_FPS // self.fps(), 1)
+
+
+    def menu_fading(self) -> bool:
+        """True while the pause menu still changes the screen, count drawn frames in fade_frames"""
+        return not self.hidden and self.fade_frames < self.PAUSE_FADE_FRAMES
+
+
+    def take_resumed(self) -> bool:
+        """True once after becoming visible again"""
+        resumed, self.resumed = self.resumed, False
+        return resumed
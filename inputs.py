@@ -0,0 +1,187 @@
+import pygame
+
+
+class PaintStroke():
+    """
+    Tiles swept by a held left button while a shop item is selected\n
+    drag: every tile the mouse passes over, in order. Fast moves skip tiles between frames,
+    so the gap from the last tile is filled in with a straight line.\n
+    rect: every tile in the rectangle between where the drag started and where it is now
+    """
+    OUTLINE_COLOR = (255, 215, 0)
+
+    def __init__(self, tile_coord: tuple, rect: bool = False):
+        self.rect = rect
+        self.start = tile_coord
+        self.end = tile_coord
+        self.swept = {tile_coord: None} # drag tiles in order, dict as an ordered set
+
+
+    def extend(self, tile_coord: tuple):
+        if tile_coord == self.end:
+            return
+        if not self.rect:
+            (x0, y0), (x1, y1) = self.end, tile_coord
+            steps = max(abs(x1 - x0), abs(y1 - y0))
+            for step in range(1, steps + 1):
+                self.swept[(round(x0 + (x1 - x0) * step / steps), round(y0 + (y1 - y0) * step / steps))] = None
+        self.end = tile_coord
+
+
+    def bounds(self) -> tuple:
+        """(x0, y0, x1, y1) of the rectangle, end exclusive"""
+        return (
+            min(self.start[0], self.end[0]), min(self.start[1], self.end[1]),
+            max(self.start[0], self.end[0]) + 1, max(self.start[1], self.end[1]) + 1,
+        )
+
+
+    def tile_coords(self) -> list:
+        """Painted tiles, the first one is where the stroke started"""
+        if not self.rect:
+            return list(self.swept)
+        x0, y0, x1, y1 = self.bounds()
+        coords = [(x, y) for x in range(x0, x1) for y in range(y0, y1)]
+        coords.remove(self.start)
+        return [self.start] + coords
+
+
+    def draw(self, screen: pygame.Surface, camera, scale: float):
+        """Outline the painted tiles over the board view"""
+        tile_px = camera.zoom * scale
+        to_screen = lambda x, y: ((x - camera.left) * tile_px, (y - camera.top) * tile_px)
+        clip = screen.get_clip()
+        screen.set_clip(pygame.Rect(0, 0, round(camera.view_size[0] * scale), round(camera.view_size[1] * scale)))
+        if self.rect:
+            x0, y0, x1, y1 = self.bounds()
+            pygame.draw.rect(screen, self.OUTLINE_COLOR, (*to_screen(x0, y0), (x1 - x0) * tile_px, (y1 - y0) * tile_px), 2)
+        else:
+            for x, y in self.swept:
+                pygame.draw.rect(screen, self.OUTLINE_COLOR, (*to_screen(x, y), tile_px, tile_px), 1)
+        screen.set_clip(clip)
+
+
+class InputStage():
+    """
+    Per-frame click batching\n
+    Noisy event types are blocked before they reach the queue. Board clicks are collected
+    for the whole frame and applied together: tiles are resolved in one pass, each tile gets
+    one floater, and coins and the active button are updated once. Anything that changes
+    what a board click means (shop selection, right click, ESC) flushes the clicks queued
+    before it, so clicks still apply in order.\n
+    With a shop item selected a held left button paints instead (shift for a rectangle),
+    the whole stroke is one purchase when the button comes back up, see TileManager.paint_tiles.
+    """
+    BLOCKED = (
+        pygame.MOUSEMOTION, pygame.MOUSEBUTTONUP, pygame.KEYUP,
+        pygame.TEXTINPUT, pygame.TEXTEDITING, pygame.FINGERMOTION,
+        pygame.JOYAXISMOTION, pygame.JOYBALLMOTION, pygame.JOYHATMOTION,
+    )
+
+    def __init__(self, tile_mgr, ui_mgr, float_n, sim_process: bool = False):
+        self.tile_mgr = tile_mgr
+        self.ui_mgr = ui_mgr
+        self.float_n = float_n
+        self.sim_process = sim_process
+        self.clicks = [] # layout pixel coords of board clicks this frame, in order
+        self.stroke = None # PaintStroke while the left button is held with a shop item selected
+
+
+    @classmethod
+    def block_noise(cls):
+        """Stop SDL from queueing events the main loop never reads"""
+        pygame.event.set_blocked(list(cls.BLOCKED))
+
+
+    def add_click(self, coord: tuple):
+        self.clicks.append(coord)
+
+
+    def flush(self):
+        """Apply every queued board click"""
+        if not self.clicks:
+            return
+        clicks, self.clicks = self.clicks, []
+        button = self.ui_mgr.active_button
+
+        # results come back from the simulation with its events
+        if self.sim_process:
+            self.tile_mgr.click_batch(clicks, self.ui_mgr.coins.get_inner_attr("coins"), button)
+            return
+
+        coins = float(self.ui_mgr.coins.get_inner_attr("coins"))
+        total = 0
+        changed = False
+        floaters = {} # tile: [coord, value], one floater per tile
+        for coord, tile in zip(clicks, self.tile_mgr.tiles_at(clicks)):
+            # later clicks in the batch see coins spent or earned by earlier ones
+            val = self.tile_mgr.click_tile(tile, coins + total, button)
+            if isinstance(val, int):
+                total += val
+                changed = True
+
+            floater = floaters.get(tile)
+            if floater != None and isinstance(val, int) and isinstance(floater[1], int):
+                floater[1] += val
+            else:
+                floaters[tile] = [coord, val]
+
+        for coord, val in floaters.values():
+            self.float_n.create_number(coord, val)
+
+        if changed:
+            # buying and selling moves coins but isn't income
+            self.ui_mgr.update_coins(total, is_income=button == None)
+            self.ui_mgr.refresh_button()
+
+
+    # ---------------- painting ----------------
+    @staticmethod
+    def tile_coord(pixel_coord: tuple) -> tuple:
+        return (int(pixel_coord[0] // 50), int(pixel_coord[1] // 50))
+
+
+    def begin_stroke(self, pixel_coord: tuple, rect: bool = False):
+        self.end_stroke()
+        self.stroke = PaintStroke(self.tile_coord(pixel_coord), rect)
+
+
+    def extend_stroke(self, pixel_coord: tuple):
+        if self.stroke != None:
+            self.stroke.extend(self.tile_coord(pixel_coord))
+
+
+    def cancel_stroke(self):
+        self.stroke = None
+
+
+    def end_stroke(self):
+        """Button released, a stroke that never left its tile is an ordinary click"""
+        if self.stroke == None:
+            return
+        coords = [(x * 50 + 25, y * 50 + 25) for x, y in self.stroke.tile_coords()]
+        self.stroke = None
+        if len(coords) == 1:
+            self.add_click(coords[0])
+        else:
+            self.paint(coords)
+
+
+    def paint(self, pixel_coords: list):
+        """Apply a painted stroke as one purchase, one coin update and one floater for all of it"""
+        self.flush()
+        button = self.ui_mgr.active_button
+        if button == None:
+            return
+        
+        # result comes back from the simulation as a single click
+        if self.sim_process:
+            self.tile_mgr.paint_batch(pixel_coords, self.ui_mgr.coins.get_inner_attr("coins"), button)
+            return
+        
+        coins = float(self.ui_mgr.coins.get_inner_attr("coins"))
+        val = self.tile_mgr.paint_tiles(self.tile_mgr.tiles_at(pixel_coords), coins, button)
+        self.float_n.create_number(pixel_coords[-1], val)
+        if isinstance(val, int):
+            self.ui_mgr.update_coins(val, is_income=False)
+            self.ui_mgr.refresh_button()
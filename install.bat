@@ -1,5 +1,5 @@
 @echo off
 echo Must have Python installed!
 pause
-pip install pygame
+pip install pygame numpy
 pause
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Load generator for server.py\n
+Opens many sessions spread over a few connections. Each session clicks tiles and now and
+then buys a machine like a player would. Reports command latency percentiles and how many
+sessions the server holds per core of cpu it used.
+
+python server.py &
+python loadgen.py --sessions 60 --seconds 20
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+BUY_CHANCE = .05 # fraction of commands that try to buy a dirt excavator instead of clicking
+
+
+class Connection():
+    """One socket, requests are matched to responses by id so many sessions can share it"""
+    ids = itertools.count(1)
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {} # request id: Future
+        self.listener = asyncio.create_task(self.listen())
+
+
+    @classmethod
+    async def open(cls, host: str, port: int):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            response = json.loads(line)
+            future = self.waiting.pop(response.get("id"), None)
+            if future != None:
+                future.set_result(response)
+
+
+    async def request(self, **request) -> dict:
+        request["id"] = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request["id"]] = future
+        self.writer.write((json.dumps(request) + "\n").encode())
+        await self.writer.drain()
+        return await future
+
+
+    async def close(self):
+        self.listener.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play(conn: Connection, session: int, board_size: tuple, rate: float, until: float, latencies: list):
+    """One scripted player, rate commands per second until the deadline"""
+    while time.monotonic() < until:
+        await asyncio.sleep(random.expovariate(rate))
+        x, y = random.randrange(board_size[0]), random.randrange(board_size[1])
+        if random.random() < BUY_CHANCE:
+            request = {"op": "buy", "session": session, "item": "Dirt Excavator", "x": x, "y": y}
+        else:
+            request = {"op": "click", "session": session, "x": x, "y": y}
+
+        start = time.perf_counter()
+        await conn.request(**request)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run(host: str, port: int, sessions: int, connections: int, seconds: float, rate: float,
+        board_size: tuple = (24, 16)) -> dict:
+    conns = [await Connection.open(host, port) for _ in range(connections)]
+    players = []
+    for i in range(sessions):
+        conn = conns[i % connections]
+        players.append((conn, (await conn.request(op="new"))["session"]))
+
+    latencies = []
+    before = await conns[0].request(op="stats")
+    until = time.monotonic() + seconds
+    await asyncio.gather(*(play(conn, session, board_size, rate, until, latencies) for conn, session in players))
+    after = await conns[0].request(op="stats")
+
+    for conn in conns:
+        await conn.close()
+    return summarize(latencies, before, after, sessions)
+
+
+def summarize(latencies: list, before: dict, after: dict, sessions: int) -> dict:
+    """Latency percentiles from the client side, cpu and tick health from server stats"""
+    latencies = sorted(latencies)
+
+    def percentile(perc: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(int(len(latencies) * perc), len(latencies) - 1)]
+
+    wall = after["wall_seconds"] - before["wall_seconds"]
+    cpu = (after["cpu_seconds"] - before["cpu_seconds"]) / wall # cores busy on average
+    ticks = after["tick"] - before["tick"]
+    return {
+        "sessions": sessions,
+        "commands": len(latencies),
+        "commands_per_sec": len(latencies) / wall,
+        "p50_ms": percentile(.5),
+        "p90_ms": percentile(.9),
+        "p99_ms": percentile(.99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "server_cpu": cpu,
+        "sessions_per_core": sessions / cpu if cpu > 0 else None,
+        "ticks_per_sec": ticks / wall,
+        "ticks_late": after["ticks_late"] - before["ticks_late"],
+    }
+
+
+def report(summary: dict) -> str:
+    per_core = summary["sessions_per_core"]
+    return "\n".join([
+        f"{summary['sessions']} sessions, {summary['commands']} commands ({summary['commands_per_sec']:.0f}/sec)",
+        f"latency p50 {summary['p50_ms']:.2f}ms, p90 {summary['p90_ms']:.2f}ms, "
+        f"p99 {summary['p99_ms']:.2f}ms, max {summary['max_ms']:.2f}ms",
+        f"server cpu {summary['server_cpu']:.2f} cores, "
+        f"{'-' if per_core == None else f'{per_core:.0f}'} sessions/core, "
+        f"{summary['ticks_per_sec']:.1f} ticks/sec, {summary['ticks_late']} ticks late",
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tile Clicker server load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--rate", type=float, default=3, help="commands per second per session")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args.host, args.port, args.sessions, args.connections, args.seconds, args.rate))
+    print(report(summary))
@@ -1,58 +1,152 @@
 import pygame
 import sys
 import random
+import argparse
+import signal
 from tile import TileManager, Tile, TileFunctions
+from board import Camera
 from ui import UIManager, FloatingNumber, PauseMenu, WinMenu, BaseUI
+from simulation import SimulationClient
+from assets import Assets, StartupTimer
+from metrics import Metrics
+from inputs import InputStage
+from idle import IdleMode
+from memory import MemoryTracker
+from collector import GCPacer
+from profiler import SamplingProfiler, game_tags
+from spectate import SpectatorPublisher, parse_address
 
-def main():
+PAN_SPEED = 20 # layout pixels per frame with an arrow key held
+
+
+def main(sim_process: bool = False, render_scale: float = 1.0, metrics_port: int = None, memory: bool = False,
+        board_size: tuple = (24, 16), profile_seconds: float = SamplingProfiler.SECONDS, spectate: int | str = None):
+    """
+    sim_process: run the world simulation in a separate process, this one only handles input and drawing\n
+    render_scale: draw at this fraction of full resolution, the window stretches it back up\n
+    metrics_port: serve Prometheus metrics on localhost:metrics_port/metrics\n
+    memory: trace allocations, F9 prints memory by subsystem and the change since the last F9\n
+    board_size: board in tiles, the view shows at most 24x16 of it at full zoom, pan and zoom for the rest\n
+    profile_seconds: length of a sampling profiler capture, started with F10 or SIGUSR1\n
+    spectate: stream the board to spectators on this localhost port or unix socket path, see spectate.py
+    """
+    if memory:
+        MemoryTracker.start()
+    timer = StartupTimer()
     pygame.init()
     
+    # decode images in the background while everything else starts up
+    Assets.preload()
+    timer.mark("init")
+    
     # display:: just tiles: 1400x1000 # with sidebar: 1600x1000 # x 0-27, y 0-19
-    BOARD_SIZE = (24, 16) # originally 28, 20
+    BOARD_SIZE = board_size # originally 28, 20
     BOARD_SIZE_PIXELS = (BOARD_SIZE[0] * 50, BOARD_SIZE[1] * 50)
-    screen = pygame.display.set_mode((BOARD_SIZE_PIXELS[0] + 400, BOARD_SIZE_PIXELS[1])) 
-    #screen = pygame.display.set_mode((1800, 1000)) 
+    VIEW_SIZE_PIXELS = (min(BOARD_SIZE[0], 24) * 50, min(BOARD_SIZE[1], 16) * 50) # board area on screen
     TileFunctions.BOARD_SIZE = BOARD_SIZE
     TileFunctions.BOARD_SIZE_PIXELS = BOARD_SIZE_PIXELS
+    TileFunctions.RENDER_SCALE = render_scale
     BaseUI.BOARD_SIZE = BOARD_SIZE
-    BaseUI.BOARD_SIZE_PIXELS = BOARD_SIZE_PIXELS
+    BaseUI.BOARD_SIZE_PIXELS = VIEW_SIZE_PIXELS # the UI lays out around the view
+    BaseUI.RENDER_SCALE = render_scale
+    
+    # screen is the internal render resolution, SDL scales it to the resizable window in one pass
+    # game logic and clicks stay in full size layout pixels, see BaseUI.to_logical
+    screen = pygame.display.set_mode(
+        BaseUI.to_render((VIEW_SIZE_PIXELS[0] + 400, VIEW_SIZE_PIXELS[1])),
+        pygame.SCALED | pygame.RESIZABLE
+    )
+    #screen = pygame.display.set_mode((1800, 1000)) 
     
     pygame.display.set_caption("Tile Clicker")
-    favicon = pygame.image.load("img/icon_tilecoin_sm.png")
+    favicon = Assets.get("img/icon_tilecoin_sm.png")
     pygame.display.set_icon(favicon)
+    timer.mark("display")
 
     clock = pygame.time.Clock()
-    tile_mgr = TileManager()
+    if sim_process:
+        # tile_mgr stands in for TileManager, clicks come back as events
+        tile_mgr = SimulationClient(BOARD_SIZE)
+    else:
+        tile_mgr = TileManager()
+    timer.mark("world")
     ui_mgr = UIManager(screen)
     float_n = FloatingNumber(screen)
     i_menu = PauseMenu(screen)
     w_menu = WinMenu(screen)
+    timer.mark("ui")
+    
+    # board clicks and floaters go through the camera
+    camera = Camera(BOARD_SIZE, VIEW_SIZE_PIXELS)
+    renderer = tile_mgr.renderer if sim_process else tile_mgr.board
+    renderer.camera = camera
+    float_n.view = camera.to_view
+    drag_from = None # view layout pixel the middle mouse drag is at, None when not dragging
+    
+    inputs = InputStage(tile_mgr, ui_mgr, float_n, sim_process)
+    InputStage.block_noise()
+    
+    # collections wait for the end of a frame with time to spare, see collector.py
+    pacer = GCPacer()
+    
+    metrics = None
+    if metrics_port != None:
+        metrics = Metrics(clock, tile_mgr, ui_mgr, float_n, pacer)
+        metrics.serve(metrics_port)
+    
+    # sampling profiler, F10 or SIGUSR1 toggles a capture of this loop, see profiler.py
+    profiler = SamplingProfiler(game_tags(tile_mgr, BOARD_SIZE), on_written=lambda paths: print("profile written:", *paths))
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle(profile_seconds))
+    
+    spectators = None
+    if spectate != None:
+        spectators = SpectatorPublisher(tile_mgr, renderer, BOARD_SIZE, spectate)
+    
+    mem_tracker = None
+    mem_last = None # snapshot from the previous F9
+    if memory:
+        mem_tracker = MemoryTracker.for_game(tile_mgr, ui_mgr, float_n, [i_menu, w_menu])
 
     # draw bg once before menu
-    tile_mgr.frame_update(screen)
+    if sim_process:
+        tile_mgr.draw(screen)
+    else:
+        tile_mgr.frame_update(screen)
 
     menu = True
     win_menu = False
+    idle = IdleMode()
+    idle.set_paused(menu)
     while True:
         """
         ----------------------------- MAIN GAME LOOP -----------------------------\n
         Everything that exists in this section is mainly for interscript 
         communication or player inputs
         """
+        pacer.frame_start()
+        
         # check events first for player input
         for event in pygame.event.get():
             
+            # event::window focus, minimize and restore
+            if idle.handle(event):
+                continue
+            
             # event::click down
             if event.type == pygame.MOUSEBUTTONDOWN:
                 
-                # LClick
-                if pygame.mouse.get_pressed()[0]:
-                    click_coord = pygame.mouse.get_pos()
-                    value_clicked = 0
+                # LClick, position from the event since a frame can hold many clicks
+                if event.button == 1:
+                    click_coord = BaseUI.to_logical(event.pos)
                     
                     
                     # UI menu click
-                    if click_coord[0] > BOARD_SIZE_PIXELS[0] + 1:
+                    if click_coord[0] > VIEW_SIZE_PIXELS[0] + 1:
+                        
+                        # board clicks queued before this one used the old selection
+                        inputs.end_stroke()
+                        inputs.flush()
                         
                         # set active button
                         ui_mgr.button_check(click_coord)
@@ -67,111 +161,275 @@ def main():
                                 old_cost = float(ui_mgr.active_button.cost)
                                 if float(ui_mgr.coins.get_inner_attr("coins")) > old_cost:
                                     # deduct cost and double cost of button
-                                    ui_mgr.update_coins(-old_cost)
+                                    ui_mgr.update_coins(-old_cost, is_income=False)
                                     ui_mgr.active_button.double_cost()
                                     
                                     # rpg number
-                                    float_n.create_number((1200, 400), -old_cost)
+                                    float_n.create_number((1200, 400), -old_cost, on_board=False)
                                     
                                     # send to tile for upgrade and deselect
                                     win_menu = tile_mgr.upgrade_button(ui_mgr.active_button)
-                                    ui_mgr.button_check((0, 0))
+                                    ui_mgr.deselect()
                                 
                                 # can't purchase
                                 else:
-                                    float_n.create_number((1200, 400), "Can't afford")
-                                    ui_mgr.button_check((0, 0))
+                                    float_n.create_number((1200, 400), "Can't afford", on_board=False)
+                                    ui_mgr.deselect()
                         
                         
-                    # Tile click
-                    elif click_coord[0] < BOARD_SIZE_PIXELS[0] - 1:
-                        value_clicked = tile_mgr.click_event_value(
-                            click_coord, 
-                            ui_mgr.coins.get_inner_attr("coins"), 
-                            ui_mgr.active_button
-                        )
+                    # minimap click moves the camera there
+                    elif camera.minimap_rect() != None and camera.minimap_rect().collidepoint(click_coord):
+                        camera.center_on(camera.minimap_tile(click_coord))
                     
-                        # floating rpg number
-                        float_n.create_number(click_coord, value_clicked)
-                            
-                        # is int
-                        if isinstance(value_clicked, int):
-                            ui_mgr.update_coins(value_clicked)
-                            ui_mgr.refresh_button()
+                    # Tile click, applied with the rest of this frame's clicks
+                    # with a shop item selected it starts a paint stroke, shift for a rectangle
+                    elif click_coord[0] < VIEW_SIZE_PIXELS[0] - 1 and camera.on_board(click_coord):
+                        if ui_mgr.active_button != None:
+                            inputs.begin_stroke(camera.to_board(click_coord), rect=bool(pygame.key.get_mods() & pygame.KMOD_SHIFT))
+                        else:
+                            inputs.add_click(camera.to_board(click_coord))
+                
+                # MClick, drag to pan
+                elif event.button == 2:
+                    drag_from = BaseUI.to_logical(event.pos)
                     
                 
                 # RClick
-                elif pygame.mouse.get_pressed()[2]:
+                elif event.button == 3:
                     
-                    # deselect
-                    ui_mgr.button_check((0, 0))
+                    # deselect, drops a stroke still being painted
+                    inputs.cancel_stroke()
+                    inputs.flush()
+                    ui_mgr.deselect()
+            
+            # event::zoom around the mouse
+            elif event.type == pygame.MOUSEWHEEL and not menu:
+                mouse = BaseUI.to_logical(pygame.mouse.get_pos())
+                if mouse[0] < VIEW_SIZE_PIXELS[0]:
+                    camera.zoom_by(event.y, mouse)
             
             # event::keyboard
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     
                     # deselect UI buttons
-                    ui_mgr.button_check((0, 0))
+                    inputs.cancel_stroke()
+                    inputs.flush()
+                    ui_mgr.deselect()
                     
                     # flip menu bool
                     menu = bool(1 - menu)
+                    ui_mgr.invalidate()
                     
                     # if win menu, take down
                     if win_menu:
                         win_menu = False
                         menu = False
+                    idle.set_paused(menu)
+                
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS) and not menu:
+                    camera.zoom_by(1)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS) and not menu:
+                    camera.zoom_by(-1)
+                
+                elif event.key == pygame.K_F9 and mem_tracker != None:
+                    # memory report, and what grew since the last one
+                    snap = mem_tracker.take()
+                    print(mem_tracker.report(snap))
+                    if mem_last != None:
+                        print(mem_tracker.diff(mem_last, snap))
+                    mem_last = snap
+                
+                elif event.key == pygame.K_F10:
+                    if profiler.toggle(profile_seconds):
+                        print(f"profiling for {profile_seconds}s, F10 stops early")
                     
             # event::quit
             if event.type == pygame.QUIT:
+                if sim_process:
+                    tile_mgr.stop()
+                profiler.stop()
+                if spectators != None:
+                    spectators.stop()
+                if metrics != None:
+                    metrics.stop()
                 pygame.quit()
                 sys.exit()
         
+        # a held left button keeps painting, letting go buys the whole stroke
+        if inputs.stroke != None:
+            if pygame.mouse.get_pressed()[0]:
+                mouse = BaseUI.to_logical(pygame.mouse.get_pos())
+                if mouse[0] < VIEW_SIZE_PIXELS[0] - 1 and camera.on_board(mouse):
+                    inputs.extend_stroke(camera.to_board(mouse))
+            else:
+                inputs.end_stroke()
+        
+        # this frame's board clicks, one coin update for all of them
+        inputs.flush()
+        
+        # pan with held arrow keys or a middle mouse drag, the same screen speed at every zoom
+        if not menu:
+            keys = pygame.key.get_pressed()
+            pan_x = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * PAN_SPEED
+            pan_y = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * PAN_SPEED
+            if drag_from != None:
+                if pygame.mouse.get_pressed()[1]:
+                    mouse = BaseUI.to_logical(pygame.mouse.get_pos())
+                    pan_x += drag_from[0] - mouse[0]
+                    pan_y += drag_from[1] - mouse[1]
+                    drag_from = mouse
+                else:
+                    drag_from = None
+            if pan_x or pan_y:
+                camera.pan(pan_x, pan_y)
 
+        # results from the simulation process
+        income = 0
+        spent = 0 # purchases and sales, not income
+        if sim_process:
+            # the world holds still while a menu is up and takes coarse steps while idle
+            tile_mgr.pause(menu or win_menu)
+            tile_mgr.pace(idle.ticks_per_frame())
+            for sim_event in tile_mgr.poll():
+                if sim_event[0] == "click":
+                    _, click_coord, value_clicked, state = sim_event
+                    if not idle.hidden:
+                        float_n.create_number(click_coord, value_clicked)
+                    
+                    if isinstance(value_clicked, int) and state == None:
+                        income += value_clicked
+                    elif isinstance(value_clicked, int):
+                        spent += value_clicked
+                    if state != None:
+                        # simulation owns the costs, mirror them on the button
+                        button = ui_mgr.buy_buttons_arr[state.item_code]
+                        button.cost = state.cost
+                        button.invalidate()
+                
+                elif sim_event[0] == "payouts":
+                    for coord, val in sim_event[1]:
+                        if not idle.hidden:
+                            float_n.create_number(coord, val)
+                        if spectators != None:
+                            spectators.add_payout(coord, val)
+                        income += val
+        
         # calculate machine profits for this frame
-        queue = tile_mgr.queued_val_arr
-        if queue != []:
+        queue = () if sim_process else tile_mgr.queued_val_arr
+        if queue:
             # not empty
-            for q in queue:
-                float_n.create_number(q["coord"], q["val"])
-                ui_mgr.update_coins(q["val"])
-                queue.remove(q)
+            for coord, val in queue:
+                # nobody sees floaters while minimized, don't pile them up
+                if not idle.hidden:
+                    float_n.create_number(coord, val)
+                if spectators != None:
+                    spectators.add_payout(coord, val)
+                income += val
+            queue.clear()
+        
+        # one coin update for everything this frame
+        if income != 0:
+            ui_mgr.update_coins(income)
+        if spent != 0:
+            ui_mgr.update_coins(spent, is_income=False)
 
 
-        # frame refresh updates
+        # frame refresh updates, only present the screen if something drew to it
+        drew = idle.take_resumed()
+        if drew:
+            ui_mgr.invalidate()
         if not menu and not win_menu:
-            # regular frame updates
-            tile_mgr.frame_update(screen)
-            float_n.draw_all_floaters()
+            # regular frame updates, unfocused and minimized frames are slower and step over the ticks they skip
+            ticks = idle.ticks_per_frame()
+            if idle.hidden:
+                # minimized, tick without drawing
+                if not sim_process:
+                    tile_mgr.simulate(ticks)
+            else:
+                if sim_process:
+                    tile_mgr.draw(screen)
+                else:
+                    tile_mgr.frame_update(screen, ticks)
+                if inputs.stroke != None:
+                    inputs.stroke.draw(screen, camera, render_scale)
+                float_n.draw_all_floaters()
+                drew = True
             
             # update money per second
-            sma = float_n.calc_sma()
-            ui_mgr.update_mps(sma)
+            ui_mgr.update_mps()
         elif menu:
-            # pause menu
-            i_menu.draw_menu()
+            # pause menu fades in over a still board, then the screen is left alone
+            if idle.menu_fading() and i_menu.draw_menu():
+                idle.fade_frames += 1
+                drew = True
         elif win_menu:
             # win menu
             w_menu.draw_menu()
+            drew = True
         
         
         
         # dynamic fps cuts expensive renders in fractions if fps drops too low
         # this doesn't help output render, but it does help player input lag
-        curr_fps = clock.get_fps()
-        render_every = Tile.dynamic_render # this number should go up for better performance
-        if curr_fps < 16.0:
-            # too low, render_every goes up
-            render_every = min(render_every + 1, 3) # max every 3
-        elif curr_fps > 28:
-            # maintaining good, render goes down
-            render_every = max(render_every - 1, 1) # min every frame
+        # idle frame rates are on purpose, they don't count
+        if not idle.idle:
+            curr_fps = clock.get_fps()
+            render_every = Tile.dynamic_render # this number should go up for better performance
+            if curr_fps < 16.0:
+                # too low, render_every goes up
+                render_every = min(render_every + 1, 3) # max every 3
+            elif curr_fps > 28:
+                # maintaining good, render goes down
+                render_every = max(render_every - 1, 1) # min every frame
+            
+            Tile.dynamic_render = render_every
+        
+        # sidebar only redraws what changed this frame
+        if not idle.hidden and ui_mgr.render():
+            drew = True
+        if drew:
+            pygame.display.update()
+        
+        # time to first frame
+        if timer != None:
+            timer.mark("first frame")
+            print(timer.report())
+            timer = None
+            
+            # everything startup made lives for the whole game, gc doesn't need to look at it again
+            pacer.start()
         
-        Tile.dynamic_render = render_every
-        pygame.display.update()
+        # this frame's changes for spectators, sent in batches off the loop
+        if spectators != None:
+            spectators.publish(tile_mgr.tick, float(ui_mgr.coins.get_inner_attr("coins")))
         
+        # collect in the time this frame leaves over, idle frames have plenty
+        pacer.frame_end(1000 / idle.fps(), idle.idle)
         
-        # max fps
-        clock.tick(30)
+        # max fps, lower while idle
+        clock.tick(idle.fps())
+        if metrics != None:
+            metrics.observe_frame(clock.get_rawtime())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Tile Clicker")
+    parser.add_argument("--sim-process", action="store_true", help="run the world simulation in a second process")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus metrics on this localhost port")
+    parser.add_argument("--render-scale", type=float, default=1.0, help="internal resolution, ex. 0.5 draws at half size for slow machines")
+    parser.add_argument("--memory", action="store_true", help="trace allocations, F9 prints a memory report")
+    parser.add_argument("--profile-seconds", type=float, default=SamplingProfiler.SECONDS, help="length of an F10 / SIGUSR1 profiler capture")
+    parser.add_argument("--spectate", default=None, help="stream the board to spectators on this localhost port or unix socket path")
+    parser.add_argument("--board", default="24x16", help="board size in tiles, ex. 200x120, pan with arrows or middle drag and zoom with the wheel")
+    args = parser.parse_args()
+    if not 0.25 <= args.render_scale <= 1:
+        parser.error("--render-scale must be between 0.25 and 1")
+    try:
+        board_size = tuple(int(side) for side in args.board.lower().split("x"))
+    except ValueError:
+        board_size = ()
+    if len(board_size) != 2 or min(board_size) < 4:
+        parser.error("--board must look like 200x120, at least 4 tiles a side")
+    main(sim_process=args.sim_process, render_scale=args.render_scale, metrics_port=args.metrics_port, memory=args.memory,
+        board_size=board_size, profile_seconds=args.profile_seconds,
+        spectate=parse_address(args.spectate) if args.spectate != None else None)
\ No newline at end of file
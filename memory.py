@@ -0,0 +1,310 @@
+"""
+Memory accounting by subsystem\n
+tracemalloc only sees memory allocated through Python (objects, numpy arrays), pygame surface
+pixels and fonts live in SDL's own heap. So a snapshot has two halves:
+python heap, every traced block charged to the subsystem of the innermost game frame that
+allocated it, and surfaces, found by walking the live game objects and counted at pitch * height.
+Two snapshots can be diffed to catch leaks in long sessions, ex. surfaces that are never freed.
+
+python main.py --memory            F9 prints a report and the diff since the previous F9
+python memory.py --frames 3000     headless session, report at the start and the end and their diff
+"""
+import argparse
+import ast
+import linecache
+import os
+import tracemalloc
+from collections import Counter
+import pygame
+from assets import Assets, Atlas
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FRAMES = 16 # traceback depth, enough to get from pygame or numpy back to the game frame
+GAME_MODULES = {"tile", "board", "ui", "assets", "simulation", "inputs", "metrics", "idle", "main", "__main__"} # objects walked for surfaces
+
+# first match wins: file, qualified function name prefix or None for the whole file, subsystem
+TRACE_RULES = (
+    ("tile.py", "TileManager.check_moneymaking", "payouts"),
+    ("tile.py", "TileManager.payout_", "payouts"),
+    ("tile.py", None, "board"),
+    ("board.py", "BoardRenderer.sprite", "sprites"),
+    ("board.py", None, "board"),
+    ("assets.py", None, "sprites"),
+    ("ui.py", "FloatingNumber", "floaters"),
+    ("ui.py", None, "ui"),
+    ("simulation.py", None, "board"),
+)
+
+
+class MemorySnapshot():
+    """Python heap by subsystem and live surfaces, taken at one moment"""
+    def __init__(self, python: Counter, traces: tracemalloc.Snapshot | None, surfaces: list, fonts: Counter):
+        self.python = python # subsystem: bytes
+        self.traces = traces # raw tracemalloc snapshot, for line level diffs
+        self.surfaces = surfaces # list of (subsystem, (w, h), bytes)
+        self.fonts = fonts # subsystem: font objects
+
+
+    def surfaces_by_subsystem(self) -> Counter:
+        total = Counter()
+        for subsystem, _, size in self.surfaces:
+            total[subsystem] += size
+        return total
+
+
+    def surfaces_by_size(self) -> dict:
+        """(w, h): [count, bytes], subsurfaces share their parent's pixels so count 0 bytes"""
+        sizes = {}
+        for _, dims, size in self.surfaces:
+            entry = sizes.setdefault(dims, [0, 0])
+            entry[0] += 1
+            entry[1] += size
+        return sizes
+
+
+class MemoryTracker():
+    """
+    Takes snapshots of one running game\n
+    roots: subsystem name to the objects it owns, in order. Objects reachable from several
+    roots belong to the first one, so put shared things (the display, sprite caches) first.
+    """
+    def __init__(self, roots: list):
+        self.roots = roots
+        self.scopes = {} # file: list of (first line, last line, qualified name)
+        self.charged = {} # traceback: subsystem
+
+
+    @staticmethod
+    def start():
+        """Trace from here on, call as early as possible, everything allocated before is invisible"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(FRAMES)
+
+
+    @classmethod
+    def for_game(cls, tile_mgr, ui_mgr, float_n, menus: list = ()):
+        """The usual roots for a game built like main() builds it"""
+        board = getattr(tile_mgr, "board", None) or getattr(tile_mgr, "renderer", None)
+        return cls([
+            ("display", [pygame.display.get_surface()]),
+            ("sprites", [Assets.cache, Atlas.surf, getattr(board, "sprites", None)]),
+            ("board", [tile_mgr]),
+            ("floaters", [float_n]),
+            ("ui", [ui_mgr, *menus]),
+        ])
+
+
+    # ---------------- snapshots ----------------
+    def take(self) -> MemorySnapshot:
+        traces = None
+        python = Counter()
+        if tracemalloc.is_tracing():
+            traces = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                # the tracker's own caches
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, ast.__file__),
+                tracemalloc.Filter(False, linecache.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ))
+            for trace in traces.traces:
+                python[self.subsystem(trace.traceback)] += trace.size
+
+        surfaces = []
+        fonts = Counter()
+        seen = set()
+        for subsystem, objects in self.roots:
+            for obj in self.walk(objects, seen):
+                if isinstance(obj, pygame.font.Font):
+                    fonts[subsystem] += 1
+                    continue
+                size = 0 if obj.get_parent() != None else obj.get_pitch() * obj.get_height()
+                surfaces.append((subsystem, obj.get_size(), size))
+        return MemorySnapshot(python, traces, surfaces, fonts)
+
+
+    @staticmethod
+    def walk(objects: list, seen: set):
+        """Surfaces and fonts reachable through containers and game object attributes"""
+        stack = list(objects)
+        while stack:
+            obj = stack.pop()
+            # is, not ==, numpy arrays are walked past too
+            if obj is None or id(obj) in seen or isinstance(obj, (str, bytes, int, float, type)):
+                continue
+            seen.add(id(obj))
+
+            if isinstance(obj, (pygame.Surface, pygame.font.Font)):
+                yield obj
+            elif isinstance(obj, dict):
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            elif type(obj).__module__ in GAME_MODULES:
+                stack.extend(getattr(obj, "__dict__", {}).values())
+                for cls in type(obj).__mro__:
+                    for slot in getattr(cls, "__slots__", ()):
+                        stack.append(getattr(obj, slot, None))
+
+
+    def subsystem(self, traceback: tracemalloc.Traceback) -> str:
+        """Subsystem of the innermost frame in a game file, tracebacks repeat so they're cached"""
+        charged = self.charged.get(traceback)
+        if charged != None:
+            return charged
+
+        charged = "other"
+        for frame in reversed(traceback): # tracebacks run oldest first
+            if os.path.dirname(os.path.abspath(frame.filename)) != ROOT or frame.filename.endswith("memory.py"):
+                continue
+            name = os.path.basename(frame.filename)
+            scope = self.scope_at(frame.filename, frame.lineno)
+            for rule_file, prefix, subsystem in TRACE_RULES:
+                if rule_file == name and (prefix == None or scope.startswith(prefix)):
+                    charged = subsystem
+                    break
+            source = linecache.getline(frame.filename, frame.lineno)
+            if "font.SysFont" in source or "font.Font" in source:
+                charged = "fonts"
+            break
+
+        self.charged[traceback] = charged
+        return charged
+
+
+    def scope_at(self, filename: str, lineno: int) -> str:
+        """Qualified name of the innermost class or function around a line, ex. TileManager.payout_grass"""
+        scopes = self.scopes.get(filename)
+        if scopes == None:
+            scopes = []
+            try:
+                with open(filename, encoding="utf-8") as file:
+                    tree = ast.parse(file.read())
+            except (OSError, SyntaxError):
+                tree = ast.Module(body=[], type_ignores=[])
+
+            def visit(node, prefix: str):
+                for child in ast.iter_child_nodes(node):
+                    if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                        name = f"{prefix}{child.name}"
+                        scopes.append((child.lineno, child.end_lineno, name))
+                        visit(child, f"{name}.")
+            visit(tree, "")
+            self.scopes[filename] = scopes
+
+        found = ""
+        for first, last, name in scopes:
+            # nested scopes come after their parent, the last match is the innermost
+            if first <= lineno <= last:
+                found = name
+        return found
+
+
+    # ---------------- reports ----------------
+    @staticmethod
+    def report(snap: MemorySnapshot) -> str:
+        surfaces = snap.surfaces_by_subsystem()
+        subsystems = sorted(set(snap.python) | set(surfaces) | set(snap.fonts))
+        lines = [f"{'subsystem':<10} {'python':>10} {'surfaces':>10} {'fonts':>6}"]
+        for subsystem in subsystems:
+            lines.append(f"{subsystem:<10} {kb(snap.python[subsystem]):>10} {kb(surfaces[subsystem]):>10} {snap.fonts[subsystem]:>6}")
+        lines.append(f"{'total':<10} {kb(sum(snap.python.values())):>10} {kb(sum(surfaces.values())):>10} {sum(snap.fonts.values()):>6}")
+        if snap.traces == None:
+            lines.append("(python heap not traced, start with --memory)")
+
+        lines.append(f"{'surface':>10} {'count':>6} {'bytes':>10}")
+        for dims, (count, size) in sorted(snap.surfaces_by_size().items(), key=lambda item: -item[1][1]):
+            lines.append(f"{dims[0]:>4}x{dims[1]:<5} {count:>6} {kb(size):>10}")
+        return "\n".join(lines)
+
+
+    @staticmethod
+    def diff(old: MemorySnapshot, new: MemorySnapshot, top: int = 8) -> str:
+        """What grew between two snapshots: subsystems, surface sizes, and the top allocating lines"""
+        old_surfaces, new_surfaces = old.surfaces_by_subsystem(), new.surfaces_by_subsystem()
+        lines = [f"{'subsystem':<10} {'python':>10} {'surfaces':>10} {'fonts':>6}"]
+        for subsystem in sorted(set(old.python) | set(new.python) | set(old_surfaces) | set(new_surfaces)):
+            lines.append(
+                f"{subsystem:<10} {signed_kb(new.python[subsystem] - old.python[subsystem]):>10} "
+                f"{signed_kb(new_surfaces[subsystem] - old_surfaces[subsystem]):>10} "
+                f"{new.fonts[subsystem] - old.fonts[subsystem]:>+6}"
+            )
+
+        old_sizes, new_sizes = old.surfaces_by_size(), new.surfaces_by_size()
+        for dims in sorted(set(old_sizes) | set(new_sizes)):
+            count = new_sizes.get(dims, [0, 0])[0] - old_sizes.get(dims, [0, 0])[0]
+            if count != 0:
+                lines.append(f"surfaces {dims[0]}x{dims[1]}: {count:+d}")
+
+        if old.traces != None and new.traces != None:
+            for stat in new.traces.compare_to(old.traces, "lineno")[:top]:
+                if stat.size_diff != 0:
+                    frame = stat.traceback[0]
+                    lines.append(f"{signed_kb(stat.size_diff):>10} {stat.count_diff:>+7} blocks  {os.path.basename(frame.filename)}:{frame.lineno}")
+        return "\n".join(lines)
+
+
+def kb(size: int) -> str:
+    return f"{size / 1024:.1f}K"
+
+
+def signed_kb(size: int) -> str:
+    return f"{size / 1024:+.1f}K"
+
+
+def run(frames: int, clicks_per_frame: float = .5) -> tuple:
+    """Headless session like main() with random clicks, returns the first and last snapshot"""
+    import random
+    from tile import TileManager, TileFunctions
+    from ui import UIManager, FloatingNumber, PauseMenu, BaseUI
+    from inputs import InputStage
+
+    MemoryTracker.start()
+    pygame.init()
+    board_size = (24, 16)
+    TileFunctions.BOARD_SIZE = BaseUI.BOARD_SIZE = board_size
+    TileFunctions.BOARD_SIZE_PIXELS = BaseUI.BOARD_SIZE_PIXELS = (board_size[0] * 50, board_size[1] * 50)
+    screen = pygame.display.set_mode((board_size[0] * 50 + 400, board_size[1] * 50))
+    Assets.preload()
+
+    tile_mgr = TileManager()
+    ui_mgr = UIManager(screen)
+    float_n = FloatingNumber(screen)
+    inputs = InputStage(tile_mgr, ui_mgr, float_n)
+    tracker = MemoryTracker.for_game(tile_mgr, ui_mgr, float_n, [PauseMenu(screen)])
+
+    def frame():
+        if random.random() < clicks_per_frame:
+            inputs.add_click((random.randrange(TileFunctions.BOARD_SIZE_PIXELS[0]), random.randrange(TileFunctions.BOARD_SIZE_PIXELS[1])))
+        inputs.flush()
+        for coord, val in tile_mgr.queued_val_arr:
+            float_n.create_number(coord, val)
+            ui_mgr.update_coins(val)
+        tile_mgr.queued_val_arr.clear()
+        tile_mgr.frame_update(screen)
+        float_n.draw_all_floaters()
+        ui_mgr.update_mps()
+        ui_mgr.render()
+
+    # warm up first so caches filled on the first frames don't read as growth
+    for _ in range(30):
+        frame()
+    first = tracker.take()
+    for _ in range(frames):
+        frame()
+    return tracker, first, tracker.take()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tile Clicker memory report")
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--headless", action="store_true", help="no window, uses SDL's dummy video driver")
+    args = parser.parse_args()
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    tracker, first, last = run(args.frames)
+    print(tracker.report(last))
+    print(f"\nchange over {args.frames} frames")
+    print(tracker.diff(first, last))
@@ -0,0 +1,138 @@
+"""
+Local metrics endpoint in Prometheus text format\n
+The main loop only records frame times into a fixed-bucket histogram. Everything else
+(fps, dynamic_render, tile and machine counts, queue lengths, coins/sec) is read from the
+live game objects when /metrics is scraped, on the server's background thread.
+
+python main.py --metrics-port 9100
+curl localhost:9100/metrics
+"""
+import threading
+from bisect import bisect_left
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from tile import Tile
+
+PREFIX = "tileclicker"
+
+
+class Histogram():
+    """Fixed buckets, observe is a bisect and an increment"""
+    def __init__(self, bounds: tuple):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # per bucket, last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+    def lines(self, name: str) -> list:
+        """Prometheus histogram lines, buckets are cumulative"""
+        out = []
+        total = 0
+        for bound, count in zip(self.bounds + ("+Inf",), list(self.counts)):
+            total += count
+            out.append(f'{name}_bucket{{le="{bound}"}} {total}')
+        out.append(f"{name}_sum {self.sum}")
+        out.append(f"{name}_count {total}")
+        return out
+
+
+class Metrics():
+    """
+    Telemetry for one running game\n
+    observe_frame is the only call on the main loop, collect runs on scrape
+    """
+    FRAME_BUCKETS = (.005, .01, .016, .025, .033, .05, .1, .25, .5) # seconds
+
+    def __init__(self, clock, tile_mgr, ui_mgr, float_n, pacer=None):
+        self.clock = clock
+        self.tile_mgr = tile_mgr
+        self.ui_mgr = ui_mgr
+        self.float_n = float_n
+        self.pacer = pacer # GCPacer, for object growth and collection metrics
+        self.frame_seconds = Histogram(self.FRAME_BUCKETS)
+        self.server = None
+
+
+    def observe_frame(self, ms: float):
+        self.frame_seconds.observe(ms / 1000)
+
+
+    def collect(self) -> str:
+        """Whole exposition text, reads game state without locking, a scrape may be a frame stale"""
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{labels} {value}")
+
+        lines.append(f"# HELP {PREFIX}_frame_seconds Main loop frame time, before waiting for the next frame")
+        lines.append(f"# TYPE {PREFIX}_frame_seconds histogram")
+        lines.extend(self.frame_seconds.lines(f"{PREFIX}_frame_seconds"))
+
+        metric("fps", "gauge", "Frames per second", [("", self.clock.get_fps())])
+        metric("dynamic_render", "gauge", "Tile.dynamic_render level, higher renders machines less often",
+            [("", Tile.dynamic_render)])
+
+        types, machines = self.tile_mgr.tile_counts()
+        metric("tiles", "gauge", "Tiles by type", [(f'{{type="{name}"}}', count) for name, count in sorted(types.items())])
+        metric("machines", "gauge", "Machines by type", [(f'{{machine="{name}"}}', count) for name, count in sorted(machines.items())])
+
+        queued = getattr(self.tile_mgr, "queued_val_arr", None)
+        if queued != None:
+            metric("payout_queue", "gauge", "Machine payouts waiting for the main loop", [("", len(queued))])
+        metric("floaters", "gauge", "Floating numbers on screen", [("", len(self.float_n.list_floaters))])
+
+        # running window sums, expired by the main loop's own rate reads
+        income = self.ui_mgr.income
+        metric("coins_per_second", "gauge", "Income over a sliding window",
+            [(f'{{window="{window}s"}}', total / window) for window, total in zip(income.windows, list(income.sums))])
+        metric("coins", "gauge", "Coins held", [("", self.ui_mgr.coins.get_inner_attr("coins"))])
+        
+        pacer = self.pacer
+        if pacer != None:
+            metric("frame_object_growth", "gauge", "Net growth of gc tracked objects in the last frame, not an allocation count", [("", pacer.frame_growth)])
+            metric("object_growth_total", "counter", "Net growth of gc tracked objects summed over frames", [("", pacer.growth)])
+            metric("gc_collections_total", "counter", "Garbage collections by generation",
+                [(f'{{generation="{gen}"}}', count) for gen, count in enumerate(list(pacer.collections))])
+            metric("gc_forced_total", "counter", "Collections that ran in a frame without time to spare", [("", pacer.forced)])
+            lines.append(f"# HELP {PREFIX}_gc_pause_seconds Time the game stood still for each garbage collection")
+            lines.append(f"# TYPE {PREFIX}_gc_pause_seconds histogram")
+            lines.extend(pacer.pause_seconds.lines(f"{PREFIX}_gc_pause_seconds"))
+        return "\n".join(lines) + "\n"
+
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Serve /metrics from a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.collect().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+
+
+    def stop(self):
+        if self.server != None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,194 @@
+"""
+On-demand sampling profiler for a running game\n
+A daemon thread wakes every INTERVAL seconds and records the main loop thread's stack from
+sys._current_frames, the game itself runs untouched. A capture stops after its seconds run
+out (or on a second toggle) and writes three files next to each other in out_dir:
+
+<name>.collapsed    one "root;caller;...;leaf count" line per distinct stack, for flamegraph.pl,
+                    speedscope or inferno. The root frame carries the tags
+<name>.pstats       the same samples as pstats data, python -m pstats <name>.pstats
+<name>.json         tags (board size, machines, Tile.dynamic_render at capture start) and totals
+
+Sampled pstats count samples instead of calls, and times are samples * INTERVAL.
+The sampler only sees the main thread when that gives up the GIL. Left alone that waits for
+a voluntary release (numpy, I/O) or python's 5ms switch interval, which would pile samples
+onto whatever releases it, so a capture shortens the switch interval to SWITCH_INTERVAL.
+
+python main.py                   F10 starts a capture, F10 again stops it early
+kill -USR1 <pid>                 same toggle, for a session nobody is sitting at
+"""
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler():
+    """Samples one thread's stack, see module doc"""
+    INTERVAL = .005 # seconds between samples
+    SECONDS = 10 # default capture length
+    SWITCH_INTERVAL = .00001 # seconds, sys.setswitchinterval while capturing
+
+    def __init__(self, tags=None, out_dir: str = "profiles", thread_id: int = None, on_written=None):
+        self.tags = tags # callable returning a dict, read at capture start
+        self.on_written = on_written # called with the paths once a capture is written, on the sampler thread
+        self.out_dir = out_dir
+        self.thread_id = thread_id if thread_id != None else threading.main_thread().ident
+        self.thread = None
+        self.stopping = threading.Event()
+        self.samples = Counter() # stack, leaf first (file, first line, function): samples
+        self.captured = {} # tags of the running capture
+        self.written = None # paths of the last finished capture
+        self.lock = threading.Lock()
+
+
+    @property
+    def running(self) -> bool:
+        return self.thread != None and self.thread.is_alive()
+
+
+    def start(self, seconds: float = None):
+        """Start a capture of seconds (default SECONDS), does nothing if one is running"""
+        if self.running:
+            return
+        self.captured = self.capture_tags()
+        self.samples = Counter()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, args=(seconds or self.SECONDS,), name="profiler", daemon=True)
+        self.thread.start()
+
+
+    def stop(self) -> list | None:
+        """End the capture early and wait for its files, returns their paths"""
+        if self.thread == None:
+            return self.written
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        return self.written
+
+
+    def toggle(self, seconds: float = None) -> bool:
+        """Start a capture or end the running one, returns True if one started"""
+        if self.running:
+            self.stop()
+            return False
+        self.start(seconds)
+        return True
+
+
+    def capture_tags(self) -> dict:
+        tags = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "interval": self.INTERVAL}
+        if self.tags != None:
+            tags.update(self.tags())
+        return tags
+
+
+    # ---------------- sampler thread ----------------
+    def run(self, seconds: float):
+        deadline = time.perf_counter() + seconds
+        began = time.perf_counter()
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.SWITCH_INTERVAL)
+        while not self.stopping.wait(self.INTERVAL) and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame != None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(stack)] += 1
+            del frame
+        sys.setswitchinterval(switch_interval)
+        self.captured["seconds"] = round(time.perf_counter() - began, 3)
+        self.written = self.write()
+        if self.on_written != None:
+            self.on_written(self.written)
+
+
+    # ---------------- output ----------------
+    def root_frame(self) -> str:
+        """Tags as the flamegraph's root frame, no ; since that splits frames"""
+        tags = self.captured
+        parts = [f"{key}={tags[key]}" for key in ("board", "dynamic_render", "machines") if key in tags]
+        return "tileclicker " + " ".join(parts) if parts else "tileclicker"
+
+
+    @staticmethod
+    def frame_label(func: tuple) -> str:
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+    def collapsed(self) -> list:
+        """Collapsed stack lines, root first"""
+        root = self.root_frame()
+        return [
+            ";".join([root] + [self.frame_label(func) for func in reversed(stack)]) + f" {count}"
+            for stack, count in self.samples.most_common()
+        ]
+
+
+    def pstats_data(self) -> dict:
+        """Samples in pstats' marshal layout: func: (calls, calls, own time, total time, callers)"""
+        stats = {}
+        for stack, count in self.samples.items():
+            seconds = count * self.INTERVAL
+            seen = set()
+            for depth, func in enumerate(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+                if depth == 0:
+                    entry[2] += seconds
+                # recursion shows up once per sample
+                if func in seen:
+                    continue
+                seen.add(func)
+                entry[0] += count
+                entry[1] += count
+                entry[3] += seconds
+                if depth + 1 < len(stack):
+                    caller = entry[4].setdefault(stack[depth + 1], [0, 0, 0.0, 0.0])
+                    caller[0] += count
+                    caller[1] += count
+                    caller[2] += seconds if depth == 0 else 0.0
+                    caller[3] += seconds
+        return {
+            func: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+            for func, (cc, nc, tt, ct, callers) in stats.items()
+        }
+
+
+    def write(self) -> list:
+        """Write the finished capture, returns the three paths"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        tags = self.captured
+        board = tags.get("board", "")
+        name = os.path.join(self.out_dir, time.strftime("profile-%Y%m%d-%H%M%S") + (f"-{board}" if board else ""))
+        paths = [name + ".collapsed", name + ".pstats", name + ".json"]
+
+        with open(paths[0], "w") as out:
+            out.write("\n".join(self.collapsed()) + "\n")
+        with open(paths[1], "wb") as out:
+            marshal.dump(self.pstats_data(), out)
+        with open(paths[2], "w") as out:
+            json.dump(dict(tags, samples=sum(self.samples.values()), stacks=len(self.samples)), out, indent=2)
+        return paths
+
+
+def game_tags(tile_mgr, board_size: tuple):
+    """Tag reader for a running game, tile_mgr is a TileManager or SimulationClient"""
+    from tile import Tile
+
+    def tags() -> dict:
+        machines = tile_mgr.tile_counts()[1]
+        return {
+            "board": f"{board_size[0]}x{board_size[1]}",
+            "dynamic_render": Tile.dynamic_render,
+            "machines": sum(machines.values()),
+            "machine_counts": dict(sorted(machines.items())),
+        }
+    return tags
@@ -0,0 +1,266 @@
+"""
+Multi-session game server\n
+One asyncio process hosts many headless worlds. A shared scheduler ticks every world that
+had a command recently at SIM_FPS, idle worlds are caught up in staggered coarse steps of
+IDLE_BATCH ticks at the cost of one.
+Clients send one JSON object per line and get one JSON object back per line:
+
+{"op": "new"}                                               -> {"ok": true, "session": 1}
+{"op": "click", "session": 1, "x": 3, "y": 4}               -> {"ok": true, "val": 1, "coins": 1}
+{"op": "buy", "session": 1, "item": "House", "x": 3, "y": 4} (buying over the same item sells it)
+{"op": "fill", "session": 1, "item": "House", "x0": 0, "y0": 0, "x1": 5, "y1": 5} (rectangle, end inclusive, one purchase)
+{"op": "upgrade", "session": 1, "item": "Rent x2"}          -> {"ok": true, "val": -500, "win": false, ...}
+{"op": "state", "session": 1}
+{"op": "close", "session": 1}
+{"op": "stats"}
+
+x, y are tile coords on the board, item is a catalog label or code. Any "id" in a request is
+echoed back. A session only answers the connection that opened it and is closed when that
+connection disconnects.
+
+python server.py --port 8765
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from tile import Tile
+from economy import EconomyWorld
+from catalog import ITEMS, ITEM_CODES
+
+SIM_FPS = 30
+IDLE_AFTER = 5 # seconds without a command before a world counts as idle
+IDLE_BATCH = 30 # idle worlds catch up this many ticks at a time in one coarse step, no more than the shortest payout period
+YIELD_EVERY = 4 # sessions ticked between giving commands a turn
+
+
+class Session():
+    """One player's world with its own upgrade multipliers"""
+    def __init__(self, session_id: int, board_size: tuple):
+        self.id = session_id
+        self.multiplier = dict(Tile.BASE_MULTIPLIER)
+        self.activate()
+        self.world = EconomyWorld(board_size)
+        self.world.reset()
+        self.last_command = time.monotonic()
+        self.ticks_owed = 0 # ticks an idle world still has to simulate
+
+
+    def activate(self):
+        """Every world shares the Tile class, point Tile.multiplier at this world's upgrades"""
+        Tile.multiplier = self.multiplier
+
+
+    def tick(self, count: int = 1):
+        """Advance count ticks, more than one is a single coarse step"""
+        self.activate()
+        self.world.step(count)
+
+
+    def catch_up(self):
+        if self.ticks_owed:
+            self.tick(self.ticks_owed)
+            self.ticks_owed = 0
+
+
+    def is_idle(self, now: float) -> bool:
+        return now - self.last_command >= IDLE_AFTER
+
+
+class GameServer():
+    """Owns every session, runs the shared tick scheduler and answers commands"""
+    def __init__(self, board_size: tuple = (24, 16)):
+        self.board_size = board_size
+        self.sessions = {} # session id: Session
+        self.next_id = 1
+        self.tick = 0
+        self.tick_ms = 0.0 # cost of the last scheduler tick
+        self.ticks_late = 0 # ticks that started behind schedule
+        self.commands = 0
+
+
+    # ---------------- scheduler ----------------
+    async def run_scheduler(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            start = time.perf_counter()
+            self.tick += 1
+            now = time.monotonic()
+            for i, session in enumerate(list(self.sessions.values())):
+                if not session.is_idle(now):
+                    session.tick()
+                else:
+                    # staggered by id so every idle world doesn't catch up on the same tick
+                    session.ticks_owed += 1
+                    if (self.tick + session.id) % IDLE_BATCH == 0:
+                        session.catch_up()
+
+                if i % YIELD_EVERY == YIELD_EVERY - 1:
+                    await asyncio.sleep(0)
+            self.tick_ms = (time.perf_counter() - start) * 1000
+
+            next_tick += 1 / SIM_FPS
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # fell behind, don't try to make up the backlog
+                self.ticks_late += 1
+                next_tick = loop.time()
+            await asyncio.sleep(max(delay, 0))
+
+
+    # ---------------- commands ----------------
+    def dispatch(self, request: dict, owned: set) -> dict:
+        """Apply one command, owned is the set of session ids of the calling connection"""
+        self.commands += 1
+        op = request["op"]
+        if op == "new":
+            session = Session(self.next_id, self.board_size)
+            self.sessions[session.id] = session
+            owned.add(session.id)
+            self.next_id += 1
+            return {"ok": True, "session": session.id}
+        if op == "stats":
+            return self.stats()
+
+        session = self.sessions.get(request.get("session"))
+        if session == None:
+            return {"ok": False, "error": "no such session"}
+        if session.id not in owned:
+            return {"ok": False, "error": "not your session"}
+        if op == "close":
+            del self.sessions[session.id]
+            owned.discard(session.id)
+            return {"ok": True}
+
+        # an idle world catches up before anything reads or changes it
+        session.last_command = time.monotonic()
+        session.catch_up()
+        session.activate()
+        world = session.world
+        tile_mgr = world.tile_mgr
+
+        # tile coords are clamped to the board further down, out of range ones never get there
+        corners = [("x0", "y0"), ("x1", "y1")] if op == "fill" else [("x", "y")] if op in ("click", "buy") else []
+        if not all(self.on_board(request[x], request[y]) for x, y in corners):
+            return {"ok": False, "error": "off the board"}
+
+        if op == "click":
+            tile = tile_mgr.return_sprite_at_coord((request["x"], request["y"]))
+            val = tile_mgr.click_event_value(tile.rect.center, world.coins, None)
+            world.earn(val)
+            return {"ok": True, "val": val, "coins": world.coins}
+
+        if op == "buy":
+            state = world.shop[self.item_code(request["item"])]
+            if state.upgrade_key:
+                return {"ok": False, "error": "use upgrade for upgrades"}
+            tile = tile_mgr.return_sprite_at_coord((request["x"], request["y"]))
+            val = tile_mgr.click_event_value(tile.rect.center, world.coins, state)
+            if isinstance(val, int):
+                world.coins += val
+            return {"ok": True, "val": val, "coins": world.coins, "cost": state.cost}
+
+        if op == "fill":
+            state = world.shop[self.item_code(request["item"])]
+            if state.upgrade_key:
+                return {"ok": False, "error": "use upgrade for upgrades"}
+            # start corner first, it decides between buying and selling
+            x0, y0, x1, y1 = request["x0"], request["y0"], request["x1"], request["y1"]
+            step_x, step_y = (1 if x1 >= x0 else -1), (1 if y1 >= y0 else -1)
+            tiles = [
+                tile_mgr.return_sprite_at_coord((x, y))
+                for x in range(x0, x1 + step_x, step_x) for y in range(y0, y1 + step_y, step_y)
+            ]
+            val = tile_mgr.paint_tiles(tiles, world.coins, state)
+            if isinstance(val, int):
+                world.coins += val
+            return {"ok": True, "val": val, "coins": world.coins, "cost": state.cost}
+
+        if op == "upgrade":
+            state = world.shop[self.item_code(request["item"])]
+            if not state.upgrade_key:
+                return {"ok": False, "error": "not an upgrade"}
+            if not world.affordable(state):
+                return {"ok": True, "val": "Can't afford", "coins": world.coins}
+            cost = state.cost
+            win = world.upgrade(state)
+            return {"ok": True, "val": -cost, "win": win, "coins": world.coins, "cost": state.cost}
+
+        if op == "state":
+            machines = Counter(st.machine for st in tile_mgr.sprite_tiles if st.machine_code)
+            return {"ok": True, "coins": world.coins, "earned": world.earned, "tick": tile_mgr.tick, "machines": machines}
+
+        return {"ok": False, "error": f"unknown op {op}"}
+
+
+    def on_board(self, x: int, y: int) -> bool:
+        return isinstance(x, int) and isinstance(y, int) and 0 <= x < self.board_size[0] and 0 <= y < self.board_size[1]
+
+
+    @staticmethod
+    def item_code(item: int | str) -> int:
+        if isinstance(item, int) and 0 <= item < len(ITEMS):
+            return item
+        return ITEM_CODES[item]
+
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        idle = sum(1 for session in self.sessions.values() if session.is_idle(now))
+        return {
+            "ok": True,
+            "sessions": len(self.sessions),
+            "active": len(self.sessions) - idle,
+            "idle": idle,
+            "tick": self.tick,
+            "tick_ms": self.tick_ms,
+            "ticks_late": self.ticks_late,
+            "commands": self.commands,
+            "cpu_seconds": time.process_time(),
+            "wall_seconds": now,
+        }
+
+
+    # ---------------- connections ----------------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = self.dispatch(request, owned)
+                except (ValueError, KeyError, TypeError, AttributeError) as err:
+                    if not isinstance(request, dict):
+                        request = {}
+                    response = {"ok": False, "error": f"bad request: {err!r}"}
+                if "id" in request:
+                    response["id"] = request["id"]
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session_id in owned:
+                self.sessions.pop(session_id, None)
+            writer.close()
+
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"serving on {host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_scheduler())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tile Clicker multi-session server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(GameServer().serve(args.host, args.port))
@@ -0,0 +1,366 @@
+import pygame
+import numpy as np
+import multiprocessing
+import queue
+from collections import Counter
+from multiprocessing import shared_memory
+from tile import TileManager, Tile, TileFunctions
+from catalog import ITEMS, MACHINE_SPRITES, TILE_TYPES, MACHINES
+from board import BoardRenderer
+from collector import GCPacer
+
+
+# per tile record in a snapshot buffer: type code, grass stage, machine code, r, g, b, angle(2 bytes)
+TILE_BYTES = 8
+HEADER_BYTES = 16 # seq of buffer 0, seq of buffer 1, front buffer index, world tick of the front (all uint32)
+SIM_FPS = 30
+
+
+class ButtonState():
+    """
+    The parts of a shop Button that tile logic reads and writes.\n
+    Sent to the simulation process instead of the Button, which owns pygame fonts and surfaces
+    """
+    def __init__(self, item_code: int, cost: int, increase: int, profit: int, machine_location: str,
+            upgrade_key: str = "", upgrade_stage: int = 1, upgrade_max_stages: int = 2):
+        self.item_code = item_code
+        self.cost = cost
+        self.increase = increase
+        self.profit = profit
+        self.machine_location = machine_location
+        self.upgrade_key = upgrade_key
+        self.upgrade_stage = upgrade_stage
+        self.upgrade_max_stages = upgrade_max_stages
+
+
+    @classmethod
+    def from_button(cls, button):
+        return cls(
+            button.item_code, button.cost, button.increase, button.profit, button.machine_location,
+            button.upgrade_key, button.upgrade_stage, button.upgrade_max_stages
+        )
+    
+    
+    @classmethod
+    def from_item(cls, item_code: int):
+        """Fresh shop state straight from the catalog, for worlds without a UI"""
+        item = ITEMS[item_code]
+        return cls(
+            item_code, item["cost"], item.get("increase", 0), item.get("profit"), item.get("sprite"),
+            item.get("upgrade_key", ""), 1, item.get("upgrade_max_stages", 2)
+        )
+    
+    
+    def double_cost(self):
+        """Same upgrade cost progression as Button.double_cost"""
+        if self.upgrade_stage < self.upgrade_max_stages:
+            self.upgrade_stage += 1
+            self.cost *= 3
+        elif self.upgrade_stage == self.upgrade_max_stages:
+            self.upgrade_stage += 1
+            self.cost = 0
+
+
+class SharedBoard():
+    """
+    Double-buffered tile snapshots in multiprocessing shared memory.\n
+    The writer fills the back buffer and flips the front index. Each buffer has a sequence
+    number that is odd while it is being written, so a reader that raced a write retries.
+    """
+    def __init__(self, tile_count: int, name: str = None):
+        self.tile_count = tile_count
+        self.buffer_bytes = tile_count * TILE_BYTES
+        size = HEADER_BYTES + self.buffer_bytes * 2
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shm.buf[:size] = bytes(size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = self.shm.buf[:HEADER_BYTES].cast("I")
+        self.record = bytearray(self.buffer_bytes) # writer side scratch buffer
+
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+
+    def buffer_offset(self, index: int) -> int:
+        return HEADER_BYTES + index * self.buffer_bytes
+
+
+    def write(self, sprite_tiles, tick: int = 0):
+        """Pack every tile into the back buffer, then make it the front. tick: world tick for machine angles"""
+        record = self.record
+        i = 0
+        for tile in sprite_tiles:
+            record[i] = tile.type_code
+            record[i + 1] = tile.grass_stage
+            record[i + 2] = tile.machine_code
+            record[i + 3], record[i + 4], record[i + 5] = tile.color
+            angle = int(tile.machine_angle(tick)) % 360
+            record[i + 6] = angle & 0xFF
+            record[i + 7] = angle >> 8
+            i += TILE_BYTES
+
+        back = 1 - self.header[2]
+        offset = self.buffer_offset(back)
+        self.header[back] += 1 # odd, writing
+        self.shm.buf[offset:offset + self.buffer_bytes] = record
+        self.header[back] += 1 # even, done
+        self.header[2] = back
+        self.header[3] = tick
+
+
+    def read(self) -> tuple[int, bytes] | None:
+        """Copy of the newest complete snapshot as (seq, bytes), None if every try raced the writer"""
+        for _ in range(3):
+            front = self.header[2]
+            seq = self.header[front]
+            if seq % 2:
+                continue
+            offset = self.buffer_offset(front)
+            data = bytes(self.shm.buf[offset:offset + self.buffer_bytes])
+            if self.header[front] == seq:
+                return (seq * 2 + front, data)
+        return None
+
+
+    def close(self):
+        self.header.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def run_world(shm_name: str, board_size: tuple, commands, events):
+    """
+    ----------------------------- SIMULATION PROCESS -----------------------------\n
+    Owns the TileManager. Applies commands, ticks the world, publishes snapshots and
+    sends payouts and click results back as events.
+    """
+    pygame.init()
+    TileFunctions.BOARD_SIZE = board_size
+    TileFunctions.BOARD_SIZE_PIXELS = (board_size[0] * 50, board_size[1] * 50)
+    Tile.dynamic_render = 3 # nothing is displayed from here, keep machine rendering to a minimum
+
+    tile_mgr = TileManager()
+    board = SharedBoard(len(tile_mgr.sprite_tiles), name=shm_name)
+    clock = pygame.time.Clock()
+    shop = {} # item code: ButtonState
+    pacer = GCPacer()
+    pacer.start()
+
+    running = True
+    paused = False # menus are up, the world holds still like the in-process loop
+    step = 1 # ticks per loop, idle render sides ask for fewer, coarser steps
+    while running:
+        pacer.frame_start()
+        
+        # commands from render / input process
+        out = []
+        while True:
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                break
+
+            if command[0] == "clicks":
+                _, pixel_coords, coins, state = command
+                coins = float(coins)
+                
+                # costs live here so clicks queued before the last result came back still pay the right price
+                if state != None:
+                    state = shop.setdefault(state.item_code, state)
+                for pixel_coord, tile in zip(pixel_coords, tile_mgr.tiles_at(pixel_coords)):
+                    val = tile_mgr.click_tile(tile, coins, state)
+                    if isinstance(val, int):
+                        coins += val
+                    out.append(("click", pixel_coord, val, state))
+            elif command[0] == "paint":
+                _, pixel_coords, coins, state = command
+                state = shop.setdefault(state.item_code, state)
+                val = tile_mgr.paint_tiles(tile_mgr.tiles_at(pixel_coords), float(coins), state)
+                out.append(("click", pixel_coords[-1], val, state))
+            elif command[0] == "upgrade":
+                tile_mgr.upgrade_button(command[1])
+            elif command[0] == "pause":
+                paused = command[1]
+            elif command[0] == "pace":
+                step = command[1]
+            elif command[0] == "stop":
+                running = False
+
+        if not paused:
+            tile_mgr.simulate(step)
+        board.write(tile_mgr.sprite_tiles, tile_mgr.tick)
+
+        # machine profits for this frame
+        if tile_mgr.queued_val_arr:
+            out.append(("payouts", list(tile_mgr.queued_val_arr)))
+            tile_mgr.queued_val_arr.clear()
+        if out:
+            events.put(out)
+
+        pacer.frame_end(1000 * step / SIM_FPS, step > 1)
+        clock.tick(SIM_FPS // step)
+
+    board.close()
+
+
+class SimulationClient():
+    """
+    Render / input side of the process split\n
+    World simulation runs in a worker process writing into SharedBoard. This side draws the
+    newest snapshot and sends clicks and upgrades over a queue, so a slow world tick never
+    blocks event handling.
+    """
+    def __init__(self, board_size: tuple):
+        self.board_size = board_size
+        self.tile_count = board_size[0] * board_size[1]
+        self.board = SharedBoard(self.tile_count)
+        self.commands = multiprocessing.Queue()
+        self.events = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=run_world,
+            args=(self.board.name, board_size, self.commands, self.events),
+            daemon=True
+        )
+        self.process.start()
+        self.paused = False
+        self.step = 1
+
+        # render side, tile colors only get upscaled again if the snapshot changed them
+        self.renderer = BoardRenderer(board_size, TileFunctions.RENDER_SCALE)
+        self.last_seq = None
+        self.records = None # (w, h, TILE_BYTES) uint8 view of the last snapshot
+        self.machines = [] # (tile index, coord, sprite path, angle) in view from the last snapshot
+        self.machines_version = None # camera version the machines were picked for
+        self.machine_imgs = MACHINE_SPRITES
+
+
+    def click(self, pixel_coord: tuple, coins: float, active_button):
+        """Queue a tile click, its result comes back from poll as a "click" event"""
+        self.click_batch([pixel_coord], coins, active_button)
+
+
+    def click_batch(self, pixel_coords: list, coins: float, active_button):
+        """Queue a frame's tile clicks as one command, one "click" event comes back per click"""
+        state = None if active_button == None else ButtonState.from_button(active_button)
+        self.commands.put(("clicks", pixel_coords, coins, state))
+
+
+    def paint_batch(self, pixel_coords: list, coins: float, active_button):
+        """Queue a painted stroke as one purchase, one "click" event comes back for all of it"""
+        self.commands.put(("paint", pixel_coords, coins, ButtonState.from_button(active_button)))
+
+
+    def pause(self, paused: bool):
+        """Hold the world still while a menu is up, only sent when it changes"""
+        if paused != self.paused:
+            self.paused = paused
+            self.commands.put(("pause", paused))
+
+
+    def pace(self, ticks: int):
+        """World ticks per simulation step, more while idle so the worker loops less often"""
+        if ticks != self.step:
+            self.step = ticks
+            self.commands.put(("pace", ticks))
+
+
+    def upgrade_button(self, active_button) -> bool:
+        """Apply an upgrade here (for win check) and in the simulation"""
+        self.commands.put(("upgrade", ButtonState.from_button(active_button)))
+        return TileManager.upgrade_button(active_button)
+
+
+    def poll(self) -> list:
+        """All events the simulation sent since last poll"""
+        out = []
+        while True:
+            try:
+                out.extend(self.events.get_nowait())
+            except queue.Empty:
+                return out
+
+
+    def draw(self, screen: pygame.Surface):
+        """Draw the newest complete snapshot"""
+        snapshot = self.board.read()
+        if snapshot != None and snapshot[0] != self.last_seq:
+            self.last_seq, data = snapshot
+            records = np.frombuffer(data, dtype=np.uint8).reshape(self.board_size[0], self.board_size[1], TILE_BYTES)
+            self.records = records
+
+            # tiles are stored x-major, same [x, y] layout as the renderer's color array
+            self.renderer.load(records[:, :, 3:6], records[:, :, 2])
+            self.machines = None
+
+        camera = self.renderer.camera
+        if self.machines == None or (camera != None and camera.version != self.machines_version):
+            self.machines = self.visible_machines()
+            self.machines_version = None if camera == None else camera.version
+        self.renderer.draw(screen, self.machines, Tile.dynamic_render)
+
+
+    def visible_machines(self) -> list:
+        """(tile index, coord, sprite path, angle) for machines the renderer draws as sprites"""
+        if self.records is None:
+            return []
+        x0, y0 = 0, 0
+        x1, y1 = self.board_size
+        camera = self.renderer.camera
+        if camera != None:
+            if not camera.detailed:
+                return [] # markers, drawn from the machine codes
+            x0, y0, x1, y1 = camera.visible_tiles()
+        
+        region = self.records[x0:x1, y0:y1]
+        xs, ys = np.nonzero(region[:, :, 2])
+        codes = region[xs, ys, 2].tolist()
+        angles = (region[xs, ys, 6].astype(np.int64) | (region[xs, ys, 7].astype(np.int64) << 8)).tolist()
+        xs, ys = (xs + x0).tolist(), (ys + y0).tolist()
+        height = self.board_size[1]
+        return [
+            (x * height + y, (x, y), self.machine_imgs[code], angle)
+            for x, y, code, angle in zip(xs, ys, codes, angles)
+        ]
+
+
+    @property
+    def tick(self) -> int:
+        """World tick of the newest snapshot"""
+        return int(self.board.header[3])
+
+
+    def tile_records(self, coords: list) -> bytes:
+        """Spectator records from the last snapshot drawn, see TileManager.tile_records"""
+        if not coords or self.records is None:
+            return bytes(len(coords) * 6)
+        xs, ys = zip(*coords)
+        return self.records[list(xs), list(ys), :6].tobytes()
+
+
+    def tile_counts(self) -> tuple[Counter, Counter]:
+        """(tile type: count, machine: count) from the last snapshot"""
+        if self.records is None:
+            return Counter(), Counter()
+        types = np.bincount(self.records[:, :, 0].ravel(), minlength=len(TILE_TYPES))
+        machines = np.bincount(self.records[:, :, 2].ravel(), minlength=len(MACHINES))
+        return (
+            Counter({TILE_TYPES[code]: int(count) for code, count in enumerate(types) if count}),
+            Counter({MACHINES[code]: int(count) for code, count in enumerate(machines) if code and count})
+        )
+
+
+    def stop(self):
+        """Stop the simulation process and free shared memory"""
+        self.commands.put(("stop",))
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.board.close()
@@ -0,0 +1,299 @@
+"""
+Spectator stream of a running world\n
+The game loop only collects what changed: the board renderer records every tile whose color or
+machine changes, payouts and coins are handed over once a frame. Every BATCH_FRAMES frames those
+become one delta, a background thread compresses it and writes it to every subscriber without
+blocking. A new subscriber first gets a full snapshot, then the deltas after it. A subscriber
+that can't keep up (more than MAX_BACKLOG bytes unsent) is dropped instead of slowing the game.
+
+Wire format, every message is a 4 byte big endian length then that many zlib compressed bytes:
+
+snapshot  "<cHHQd" b"S", width, height, tick, coins, then width * height tile records
+delta     "<cQdII" b"D", tick, coins, changed count, payout count, then changed count uint32
+          tile indexes, changed count tile records, payout count (uint32 tile index, int64 value)
+
+A tile record is 6 bytes: type code, grass stage, machine code, r, g, b (codes from catalog.py).
+Tile index is x * height + y, the same as TileManager.sprite_tiles.
+
+python main.py --spectate 8766            publish on localhost:8766 (or a unix socket path)
+python spectate.py 8766                   reference viewer, rebuilds the board from the stream
+"""
+import argparse
+import errno
+import os
+import queue
+import selectors
+import socket
+import stat
+import struct
+import threading
+import zlib
+import numpy as np
+
+RECORD_BYTES = 6
+SNAPSHOT = struct.Struct("<cHHQd")
+DELTA = struct.Struct("<cQdII")
+LENGTH = struct.Struct(">I")
+PAYOUT = np.dtype([("index", "<u4"), ("val", "<i8")])
+BATCH_FRAMES = 3 # game frames per delta, 10 a second at 30 fps
+MAX_BACKLOG = 1 << 20 # unsent bytes before a subscriber is dropped
+COMPRESS_LEVEL = 1 # deltas are small and often, favour speed
+
+
+def listen(address: int | str) -> socket.socket:
+    """Listening socket on localhost:port for an int, a unix socket at the path for a str"""
+    if isinstance(address, int):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", address))
+    else:
+        # a crashed or killed game leaves its socket file behind, nobody answers on a stale one
+        try:
+            if stat.S_ISSOCK(os.lstat(address).st_mode):
+                connect(address).close()
+                raise OSError(errno.EADDRINUSE, "address in use, a game is already serving it", address)
+        except FileNotFoundError:
+            pass
+        except ConnectionRefusedError:
+            os.unlink(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(address)
+    sock.listen()
+    sock.setblocking(False)
+    return sock
+
+
+def connect(address: int | str) -> socket.socket:
+    if isinstance(address, int):
+        return socket.create_connection(("127.0.0.1", address))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(address)
+    return sock
+
+
+def parse_address(text: str) -> int | str:
+    return int(text) if text.isdigit() else text
+
+
+class Subscriber():
+    """One connected spectator, the bytes it hasn't taken yet"""
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.pending = bytearray()
+        self.ready = False # got its snapshot, deltas from here on
+
+
+class SpectatorPublisher():
+    """
+    Collects changes on the game loop and streams them, see module doc\n
+    world: TileManager or SimulationClient, anything with tile_records(coords) and the board size.
+    board: its BoardRenderer, which records changed tile coords once watched
+    """
+    def __init__(self, world, board, board_size: tuple, address: int | str):
+        self.world = world
+        self.board_size = board_size
+        self.touched = board.watch() # tile coords changed since the last delta
+        self.payouts = [] # (tile index, value) since the last delta
+        self.frames = 0
+        self.outbox = queue.Queue() # (kind, raw body) for the sender thread
+        self.waiting = 0 # subscribers that connected and want a snapshot, sender thread counts up
+        self.lock = threading.Lock()
+
+        self.address = address
+        self.server = listen(address)
+        self.inode = os.stat(address).st_ino if isinstance(address, str) else None # of our socket file
+        self.subscribers = [] # sender thread only
+        self.dropped = 0
+        self.sent_bytes = 0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="spectate", daemon=True)
+        self.thread.start()
+
+
+    # ---------------- game loop side ----------------
+    def add_payout(self, pixel_coord: tuple, val: int):
+        x, y = int(pixel_coord[0] // 50), int(pixel_coord[1] // 50)
+        self.payouts.append((x * self.board_size[1] + y, val))
+
+
+    def publish(self, tick: int, coins: float):
+        """Once a frame, every BATCH_FRAMES frames the changes so far go out as one delta"""
+        self.frames += 1
+        if self.frames % BATCH_FRAMES:
+            return
+
+        # subscribers without a snapshot get one after this delta, so it starts where the delta ends
+        if self.touched or self.payouts:
+            coords = list(self.touched)
+            self.touched.clear()
+            indexes = np.array([x * self.board_size[1] + y for x, y in coords], dtype="<u4")
+            payouts = np.array(self.payouts, dtype=PAYOUT)
+            self.payouts.clear()
+            body = b"".join((
+                DELTA.pack(b"D", tick, coins, len(coords), len(payouts)),
+                indexes.tobytes(), self.world.tile_records(coords), payouts.tobytes()
+            ))
+        else:
+            body = DELTA.pack(b"D", tick, coins, 0, 0)
+        self.outbox.put(("delta", body))
+
+        if self.waiting:
+            with self.lock:
+                self.waiting = 0
+            width, height = self.board_size
+            coords = [(x, y) for x in range(width) for y in range(height)]
+            self.outbox.put(("snapshot", SNAPSHOT.pack(b"S", width, height, tick, coins) + self.world.tile_records(coords)))
+
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join(timeout=1)
+
+
+    # ---------------- sender thread ----------------
+    def run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.server, selectors.EVENT_READ)
+        while not self.stopping.is_set():
+            for key, _ in selector.select(timeout=.01):
+                sock, _ = self.server.accept()
+                sock.setblocking(False)
+                self.subscribers.append(Subscriber(sock))
+                with self.lock:
+                    self.waiting += 1
+
+            while True:
+                try:
+                    kind, body = self.outbox.get_nowait()
+                except queue.Empty:
+                    break
+                data = zlib.compress(body, COMPRESS_LEVEL)
+                message = LENGTH.pack(len(data)) + data
+                for sub in self.subscribers:
+                    if kind == "snapshot" and not sub.ready:
+                        sub.ready = True
+                        sub.pending += message
+                    elif kind == "delta" and sub.ready:
+                        sub.pending += message
+            self.flush()
+
+        for sub in self.subscribers:
+            sub.sock.close()
+        selector.close()
+        self.server.close()
+        # only remove the socket file if it is still ours
+        if self.inode != None:
+            try:
+                if os.lstat(self.address).st_ino == self.inode:
+                    os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+
+
+    def flush(self):
+        """Write what each subscriber will take right now, drop the ones too far behind"""
+        keep = []
+        for sub in self.subscribers:
+            try:
+                if sub.pending:
+                    sent = sub.sock.send(sub.pending)
+                    self.sent_bytes += sent
+                    del sub.pending[:sent]
+            except BlockingIOError:
+                pass
+            except OSError:
+                sub.pending = None
+            if sub.pending == None or len(sub.pending) > MAX_BACKLOG:
+                sub.sock.close()
+                self.dropped += 1
+                continue
+            keep.append(sub)
+        self.subscribers = keep
+
+
+class BoardMirror():
+    """A spectator's copy of the board, rebuilt from snapshot and delta messages"""
+    def __init__(self):
+        self.board_size = None
+        self.records = None # (width * height, RECORD_BYTES) uint8, index x * height + y
+        self.tick = 0
+        self.coins = 0.0
+        self.payouts = [] # (tile index, value) from the last delta
+        self.deltas = 0
+
+
+    def apply(self, data: bytes):
+        """Apply one message body, already decompressed"""
+        if data[:1] == b"S":
+            _, width, height, self.tick, self.coins = SNAPSHOT.unpack_from(data)
+            self.board_size = (width, height)
+            self.records = np.frombuffer(data, dtype=np.uint8, offset=SNAPSHOT.size).reshape(-1, RECORD_BYTES).copy()
+            self.payouts = []
+            return
+
+        _, self.tick, self.coins, changed, paid = DELTA.unpack_from(data)
+        offset = DELTA.size
+        indexes = np.frombuffer(data, dtype="<u4", count=changed, offset=offset)
+        offset += changed * 4
+        self.records[indexes] = np.frombuffer(data, dtype=np.uint8, count=changed * RECORD_BYTES, offset=offset).reshape(-1, RECORD_BYTES)
+        offset += changed * RECORD_BYTES
+        self.payouts = np.frombuffer(data, dtype=PAYOUT, count=paid, offset=offset).tolist()
+        self.deltas += 1
+
+
+    def grid(self, column: int) -> np.ndarray:
+        """One record column as a [x, y] array, ex. grid(2) for machine codes"""
+        return self.records[:, column].reshape(self.board_size)
+
+
+    def colors(self) -> np.ndarray:
+        return self.records[:, 3:6].reshape(self.board_size[0], self.board_size[1], 3)
+
+
+def read_messages(sock: socket.socket):
+    """Yield decompressed message bodies until the publisher goes away"""
+    buffer = bytearray()
+    while True:
+        chunk = sock.recv(1 << 16)
+        if not chunk:
+            return
+        buffer += chunk
+        while len(buffer) >= LENGTH.size:
+            (size,) = LENGTH.unpack_from(buffer)
+            if len(buffer) < LENGTH.size + size:
+                break
+            yield zlib.decompress(bytes(buffer[LENGTH.size:LENGTH.size + size]))
+            del buffer[:LENGTH.size + size]
+
+
+def view(address: int | str, scale: int = 8):
+    """Reference viewer, board colors with machines as dots and a title with coins and tick"""
+    import pygame
+    from catalog import MACHINES
+    pygame.init()
+    mirror = BoardMirror()
+    sock = connect(address)
+    screen = None
+    for body in read_messages(sock):
+        mirror.apply(body)
+        if screen == None:
+            screen = pygame.display.set_mode((mirror.board_size[0] * scale, mirror.board_size[1] * scale))
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                sock.close()
+                return
+
+        colors = mirror.colors().copy()
+        colors[mirror.grid(2) != 0] = (240, 240, 240) # machines
+        pygame.transform.scale(pygame.surfarray.make_surface(colors), screen.get_size(), screen)
+        machines = np.bincount(mirror.grid(2).ravel(), minlength=len(MACHINES))
+        pygame.display.set_caption(f"tick {mirror.tick}  coins {mirror.coins:,.0f}  machines {int(machines[1:].sum())}  payouts {len(mirror.payouts)}")
+        pygame.display.update()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tile Clicker spectator, watches a game started with --spectate")
+    parser.add_argument("address", help="port on localhost or unix socket path")
+    parser.add_argument("--scale", type=int, default=8, help="window pixels per tile")
+    args = parser.parse_args()
+    view(parse_address(args.address), args.scale)
@@ -10,6 +10,7 @@ BOARD_SIZE_PIXELS = (BOARD_SIZE[0] * 50, BOARD_SIZE[1] * 50)
 
 from ui import *
 from tile import *
+from catalog import ITEMS, ITEM_CODES, MACHINES
 TileFunctions.BOARD_SIZE = BOARD_SIZE
 TileFunctions.BOARD_SIZE_PIXELS = BOARD_SIZE_PIXELS
 BaseUI.BOARD_SIZE = BOARD_SIZE
@@ -25,14 +26,89 @@ def test_floating_number():
         fn.draw_all_floaters()
     assert len(fn.list_floaters) == 0
 
+def test_income_meter():
+    im = IncomeMeter(windows=(1, 10), capacity=8)
+    im.record(10, now=100.0)
+    im.record(5, now=100.0) # same timestamp merges
+    im.record(20, now=105.5)
+    assert im.rate(10, now=106.0) == 3.5
+    assert im.rate(1, now=106.0) == 20
+    assert im.rates(now=111.0) == {1: 0.0, 10: 2.0}
+    
+    # ring wraps around, oldest entries are evicted from the sums
+    for t in range(20):
+        im.record(1, now=200.0 + t / 10)
+    assert im.count - im.tails[1] == 8
+    assert im.rate(10, now=202.0) == .8
+
 def test_ui_mgr():
     um = UIManager(screen)
     assert type(um.coins) == DynamicUI
 
+def test_sidebar_render():
+    um = UIManager(screen)
+    assert um.render() # first render draws everything
+    assert not um.render() # nothing changed
+    
+    um.update_coins(5)
+    um.update_coins(7)
+    assert um.coins.dirty
+    assert um.render()
+    assert not um.coins.dirty and um.coins.get_inner_attr("coins") == "12.0"
+    assert not any(b.dirty for b in um.buy_buttons_arr)
+    
+    um.update_coins(0) # no change, no redraw
+    assert not um.render()
+
+def test_button_hit_test():
+    um = UIManager(screen)
+    um.render()
+    x = BaseUI.BOARD_SIZE_PIXELS[0] + 100
+    UIManager(screen) # another manager's buttons don't change this one's hit testing
+    buttons = um.buy_buttons_arr
+    for index, button in enumerate(buttons):
+        assert BuyButtons.index_at(buttons, (100, button.uly + 10)) == index
+    assert BuyButtons.index_at(buttons, (100, 520)) == None # gap between shop and upgrades
+    assert BuyButtons.index_at(buttons, (395, 170)) == None # right of buttons
+    assert BuyButtons.index_at(buttons[:-1], (100, buttons[-1].uly + 10)) == None
+    
+    um.button_check((x, 170))
+    assert um.active_button is um.buy_buttons_arr[0]
+    um.render()
+    um.button_check((x, 250))
+    assert um.active_button is um.buy_buttons_arr[2]
+    dirty = [b for b in um.buy_buttons_arr if b.dirty]
+    assert dirty == [um.buy_buttons_arr[0], um.buy_buttons_arr[2]] # only old and new redraw
+    um.button_check((x, 250)) # toggles off
+    assert um.active_button == None
+
 def test_pause():
     pm = PauseMenu(screen)
     assert type(pm.surf) == pygame.surface.Surface
 
+def test_assets():
+    from assets import Assets, StartupTimer
+    timer = StartupTimer()
+    Assets.preload()
+    assert "img/win.jpg" not in Assets.pending # lazy
+    icon = Assets.get("img/icon_house.png")
+    assert Assets.get("img/icon_house.png") is icon # decoded once, shared
+    assert Assets.peek("img/win.jpg") == None
+    assert Assets.get("img/win.jpg").get_size() == (400, 400)
+    timer.mark("load")
+    assert "load" in timer.report()
+
+def test_atlas():
+    from assets import Atlas
+    Atlas.clear()
+    rect = Atlas.rect("img/machine_house.png")
+    assert rect.size == (50, 50) and Atlas.surf.get_width() == Atlas.WIDTH
+    assert Atlas.rect("img/icon_house.png").size == (25, 25)
+    assert "img/machine_quantum_pc.png" not in Atlas.rects # lazy until used
+    assert Atlas.sprite("img/machine_quantum_pc.png").get_size() == (50, 50)
+    rects = list(Atlas.rects.values())
+    assert not any(a.colliderect(b) for i, a in enumerate(rects) for b in rects[i + 1:])
+
 def test_base_ui():
     assert BaseUI.GOLD_COLOR == (255, 190, 50)
     bu = BaseUI(screen, False)
@@ -47,13 +123,652 @@ def test_tile():
     ti = Tile((0,0))
     assert ti.type == "dirt"
 
+def test_board_renderer():
+    tm = TileManager()
+    tile = tm.return_sprite_at_coord((3, 2))
+    tile.convert_to_pavement()
+    assert tuple(tm.board.colors[3, 2]) == tile.color
+    assert tm.board.dirty
+    
+    surf = pygame.Surface(BOARD_SIZE_PIXELS)
+    tm.board.draw(surf, [])
+    assert not tm.board.dirty
+    assert tuple(surf.get_at((3 * 50 + 10, 2 * 50 + 40)))[:3] == tile.color
+
+def test_render_scale():
+    BaseUI.RENDER_SCALE = .5
+    assert BaseUI.to_render((1300, 260)) == (650, 130)
+    assert BaseUI.to_logical((650, 131)) == (1300, 262)
+    assert BaseUI.scale_surface(pygame.Surface((400, 800))).get_size() == (200, 400)
+    BaseUI.RENDER_SCALE = 1.0
+    
+    board = BoardRenderer(BOARD_SIZE, scale=.5)
+    surf = pygame.Surface((BOARD_SIZE_PIXELS[0] // 2, BOARD_SIZE_PIXELS[1] // 2))
+    board.paint((2, 1), (10, 200, 30))
+    board.draw(surf, [(0, (0, 0), "img/machine_house.png", 0)])
+    assert tuple(surf.get_at((2 * 25 + 12, 1 * 25 + 12)))[:3] == (10, 200, 30)
+    assert board.sprites["img/machine_house.png"].get_width() <= 25
+
+def test_camera_lod():
+    from board import Camera
+    TileFunctions.BOARD_SIZE = (200, 120)
+    try:
+        tm = TileManager()
+        camera = Camera((200, 120), BOARD_SIZE_PIXELS)
+        tm.board.camera = camera
+        
+        # full zoom starts at the top left like the fixed board did
+        assert camera.to_board((260, 170)) == (260, 170) and camera.to_view((260, 170)) == (260, 170)
+        assert len(tm.drawn_indexes()) == BOARD_SIZE[0] * BOARD_SIZE[1]
+        
+        # zooming keeps the tile under the mouse, panning stops at the board edge
+        camera.center_on((100, 60))
+        before = camera.to_board((300, 200))
+        camera.zoom_by(-3, (300, 200))
+        assert camera.zoom == Camera.ZOOMS[3] and camera.to_board((300, 200)) == before
+        camera.pan(-99999, 0)
+        assert camera.left == 0 and camera.minimap_rect() != None
+        
+        # far out machines are markers from the mip pyramid, kept up to date tile by tile
+        camera.zoom_by(-20)
+        surf = pygame.Surface((BOARD_SIZE_PIXELS[0] + 400, BOARD_SIZE_PIXELS[1]))
+        tm.frame_update(surf)
+        assert tm.drawn_indexes() == ()
+        for x in range(0, 200, 7):
+            tm.return_sprite_at_coord((x, x % 120)).convert_to_pavement()
+        tm.return_sprite_at_coord((3, 4)).machine = "house"
+        tm.frame_update(surf)
+        levels = [level.copy() for level in tm.board.levels]
+        tm.board.levels = None
+        tm.board.update_levels()
+        assert all(np.array_equal(a, b) for a, b in zip(levels, tm.board.levels))
+        assert tuple(tm.board.levels[0][3, 4]) == tuple(tm.board.markers[MACHINE_CODES["house"]])
+        
+        # nothing drawn over the sidebar
+        surf.fill((1, 2, 3))
+        camera.zoom_by(20)
+        tm.frame_update(surf)
+        assert tuple(surf.get_at((BOARD_SIZE_PIXELS[0] + 5, 5)))[:3] == (1, 2, 3)
+        
+        # small boards have fewer levels than the far zooms ask for
+        for size, scale in (((4, 4), 1), ((8, 8), .25)):
+            TileFunctions.BOARD_SIZE = size
+            tm = TileManager()
+            tm.board.scale = scale
+            camera = Camera(size, BOARD_SIZE_PIXELS)
+            tm.board.camera = camera
+            camera.zoom_by(-20)
+            tm.frame_update(surf)
+            assert tm.drawn_indexes() == () and max(tm.board.levels[-1].shape[:2]) == 1
+    finally:
+        TileFunctions.BOARD_SIZE = BOARD_SIZE
+
+def test_tile_compact():
+    tm = TileManager()
+    tile = tm.return_sprite_at_coord((5, 3))
+    assert not hasattr(tile, "__dict__")
+    assert tile.coord == (5, 3) and tile.rect.topleft == (250, 150)
+    assert tm.return_sprite_at_coord((260, 170), coord_mode=False) is tile
+    assert tm.return_sprite_at_coord((-1, 99)).coord == (0, BOARD_SIZE[1] - 1) # clamped
+    tile.machine = "house"
+    assert tile.machine_img == "img/machine_house.png"
+
 def test_tile_mgr():
     tm = TileManager()
     for _ in range(30):
         tm.frame_update(screen)
         assert len(tm.sprite_tiles) <= 560
 
+def test_growth_frontiers():
+    tm = TileManager()
+    Tile.multiplier["grassspread"] = 1
+    for i in range(200):
+        st = random.choice(tm.sprite_tiles)
+        random.choice([st.convert_to_water, st.convert_to_grass, st.convert_to_dirt, st.convert_to_pavement])()
+        if i % 10 == 0:
+            tm.simulate()
+    Tile.multiplier["grassspread"] = Tile.BASE_MULTIPLIER["grassspread"]
+    
+    # same answer as checking every tile's neighbours
+    for index, st in enumerate(tm.sprite_tiles):
+        assert (index in tm.water_frontier) == (st.type == "dirt" and tm.is_adjacent_to_type(st.coord, "water"))
+        assert (index in tm.grass_frontier) == (st.type == "dirt" and tm.is_adjacent_to_type(st.coord, "grass"))
+    
+    # a reset world only has its new lakes on the frontier
+    tm.reset()
+    assert len(tm.water_frontier) <= 16 and not tm.grass_frontier
+
 def tile_funcs():
     surf = pygame.surface.Surface((0, 0))
     tf = TileFunctions(surf)
-    assert tf.image == surf
\ No newline at end of file
+    assert tf.image == surf
+
+def test_catalog_dispatch():
+    assert len(Tile.TICK_PAYOUTS) == len(Tile.CHANCE_PAYOUTS) == len(MACHINES)
+    assert len(TileManager.ITEM_TABLE) == len(ITEMS)
+    
+    tm = TileManager()
+    um = UIManager(screen)
+    excav = um.buy_buttons_arr[ITEM_CODES["Dirt Excavator"]]
+    tile = tm.return_sprite_at_coord((0, 0))
+    assert tm.click_event_value((25, 25), 0, excav) == "Can't Afford!"
+    assert tm.click_event_value((25, 25), 1000, excav) == -32
+    assert tile.machine == "dirtexcav" and excav.cost == 34
+    assert tm.click_event_value((25, 25), 1000, um.buy_buttons_arr[ITEM_CODES["House"]]) == "Occupied!"
+    
+    # sell it back
+    assert tm.click_event_value((25, 25), 0, excav) == 27
+    assert tile.machine == None and excav.cost == 32
+    
+    # plain click
+    assert tm.click_event_value((25, 25), 0, None) == 1
+    tile.convert_to_pavement()
+    assert tm.click_event_value((25, 25), 0, None) == 7
+
+def test_census():
+    tm = TileManager()
+    um = UIManager(screen)
+    assert tm.count_type("dirt") + tm.count_type("water") == BOARD_SIZE[0] * BOARD_SIZE[1]
+    
+    # buy, sell and click through the catalog while the world runs
+    for i in range(400):
+        st = random.choice(tm.sprite_tiles)
+        button = random.choice([None, *um.buy_buttons_arr[:ITEM_CODES["Quantum PC"] + 1]])
+        tm.click_event_value(st.rect.center, 10 ** 9, button)
+        if i % 20 == 0:
+            tm.simulate()
+    assert tm.check_census() == []
+    
+    types, machines = tm.tile_counts()
+    assert types["grass"] == tm.count_type("grass") == sum(tm.count_grass_stage(stage) for stage in range(5))
+    assert machines["grassharv"] == tm.count_machine("grassharv") == sum(st.machine == "grassharv" for st in tm.sprite_tiles)
+    
+    tm.reset()
+    assert tm.check_census() == [] and tm.count_machine("house") == 0
+
+def test_batched_payouts():
+    tm = TileManager()
+    houses = tm.sprite_tiles[:50]
+    for st in houses:
+        st.machine = "house"
+        st.machine_moneymake = 8
+    
+    tm.CHANCE_HOUSE_TAX = 1
+    Tile.multiplier["rent"] = 4
+    tm.payout_rent(houses)
+    Tile.multiplier["rent"] = 1
+    assert all(st.queued_val == 32 for st in houses)
+    
+    tm.CHANCE_MARKET_PNL = 1
+    tm.payout_market(houses)
+    assert all(st.queued_val % 120 == 0 and -720 <= st.queued_val <= 960 for st in houses)
+
+def test_payout_clock():
+    tm = TileManager()
+    tile = tm.sprite_tiles[0]
+    tile.machine = "dirtexcav"
+    tile.machine_moneymake = 1
+    tile.machine_rot_rate = 7 # doesn't divide 180, used to never pay
+    tile.schedule_payouts(tm.tick)
+    assert tile.machine_payout_every == 26
+    
+    payouts = 0
+    for _ in range(260):
+        tm.tick += 1
+        tm.process_machines()
+        payouts += tile.queued_val
+        tile.queued_val = 0
+    assert payouts == 10
+    assert tile.machine_angle(10) == 70
+
+def test_input_batch():
+    from inputs import InputStage
+    tm = TileManager()
+    for st in tm.sprite_tiles[:2]:
+        st.convert_to_dirt()
+    um = UIManager(screen)
+    fn = FloatingNumber(screen)
+    stage = InputStage(tm, um, fn)
+    
+    for coord in [(10, 10), (20, 30), (40, 40), (10, 60)]: # 3 on tile (0, 0), 1 on (0, 1)
+        stage.add_click(coord)
+    stage.flush()
+    assert float(um.coins.get_inner_attr("coins")) == 4
+    assert um.income.count == 1 # one coin update for the batch
+    assert [f["val"] for f in fn.list_floaters] == ["3", "1"] # one floater per tile
+    
+    # later clicks in a batch see coins spent by earlier ones
+    um.select(um.buy_buttons_arr[ITEM_CODES["Water Tile"]])
+    um.update_coins(20, is_income=False)
+    stage.add_click((300, 300))
+    stage.add_click((400, 300))
+    stage.flush()
+    assert float(um.coins.get_inner_attr("coins")) == 24 - 17
+    assert tm.return_sprite_at_coord((8, 6)).type == "dirt"
+    assert stage.clicks == []
+
+def test_paint_stroke():
+    from inputs import InputStage, PaintStroke
+    assert TileManager.series_cost(32, 2, 5) == 32 + 34 + 36 + 38 + 40
+    assert TileManager.affordable_count(32, 2, 179, 100) == 4 # 5 would be 180
+    assert TileManager.affordable_count(32, 2, 180, 100) == 5
+    assert TileManager.affordable_count(17, 0, 1000, 10) == 10
+    assert TileManager.affordable_count(500, 24, 499, 10) == 0
+    
+    # fast drags fill the tiles skipped between frames, rectangles start at the press
+    stroke = PaintStroke((0, 0))
+    stroke.extend((3, 1))
+    assert stroke.tile_coords() == [(0, 0), (1, 0), (2, 1), (3, 1)]
+    stroke = PaintStroke((2, 2), rect=True)
+    stroke.extend((0, 1))
+    assert len(stroke.tile_coords()) == 6 and stroke.tile_coords()[0] == (2, 2)
+    
+    tm = TileManager()
+    for st in tm.sprite_tiles:
+        st.convert_to_dirt()
+        st.machine = None
+    um = UIManager(screen)
+    fn = FloatingNumber(screen)
+    stage = InputStage(tm, um, fn)
+    button = um.buy_buttons_arr[ITEM_CODES["Dirt Excavator"]]
+    um.select(button)
+    um.update_coins(200, is_income=False)
+    
+    # 3x2 rectangle, coins cover 5 excavators, paid once with one floater
+    stage.begin_stroke((25, 25), rect=True)
+    stage.extend_stroke((125, 75))
+    stage.end_stroke()
+    assert float(um.coins.get_inner_attr("coins")) == 200 - 180
+    assert button.cost == 32 + 5 * 2
+    assert tm.count_machine("dirtexcav") == 5 and len(fn.list_floaters) == 1
+    assert tm.return_sprite_at_coord((0, 0), coord_mode=True).machine_moneymake == 1
+    
+    # starting on an excavator sells every one in the stroke
+    stage.begin_stroke((25, 25), rect=True)
+    stage.extend_stroke((125, 75))
+    stage.end_stroke()
+    assert float(um.coins.get_inner_attr("coins")) == 20 + math.floor((42 + 40 + 38 + 36 + 34) * .8)
+    assert button.cost == 32 and tm.count_machine("dirtexcav") == 0
+    assert tm.check_census() == [] and um.income.count == 0
+    
+    # water can't be sold, painting over it refreshes it like a click does
+    water = um.buy_buttons_arr[ITEM_CODES["Water Tile"]]
+    um.select(water)
+    tm.return_sprite_at_coord((0, 0), coord_mode=True).convert_to_water()
+    for st in tm.sprite_tiles[:3]:
+        st.water_evap = 1
+    coins = float(um.coins.get_inner_attr("coins"))
+    stage.begin_stroke((25, 25))
+    stage.extend_stroke((25, 125))
+    stage.end_stroke()
+    assert float(um.coins.get_inner_attr("coins")) == coins - 3 * 17
+    assert all(st.type == "water" and st.water_evap > 1 for st in tm.sprite_tiles[:3])
+    um.select(button)
+    
+    # a stroke that stays on one tile is a plain click
+    stage.begin_stroke((25, 25))
+    stage.end_stroke()
+    assert stage.clicks == [(25, 25)]
+
+def test_idle_mode():
+    from idle import IdleMode
+    idle = IdleMode()
+    assert idle.fps() == 30 and idle.ticks_per_frame() == 1
+    
+    idle.handle(pygame.event.Event(pygame.WINDOWFOCUSLOST))
+    assert idle.fps() == 10 and idle.ticks_per_frame() == 3 # world keeps its pace
+    idle.handle(pygame.event.Event(pygame.WINDOWMINIMIZED))
+    assert idle.hidden and idle.ticks_per_frame() == 6
+    assert not idle.handle(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a))
+    idle.handle(pygame.event.Event(pygame.WINDOWRESTORED))
+    idle.handle(pygame.event.Event(pygame.WINDOWFOCUSGAINED))
+    assert idle.take_resumed() and not idle.take_resumed()
+    assert not idle.idle
+    
+    # pause menu draws until it has faded in
+    idle.set_paused(True)
+    frames = 0
+    while idle.menu_fading():
+        idle.fade_frames += 1
+        frames += 1
+    assert frames == IdleMode.PAUSE_FADE_FRAMES and idle.fps() == 5
+
+def test_coarse_steps():
+    from tile import step_chance
+    assert step_chance(.2, 1) == .2 and abs(step_chance(.5, 2) - .75) < 1e-9
+    
+    # an idle frame's one step keeps the payout clocks on world time
+    tm = TileManager()
+    st = tm.sprite_tiles[0]
+    st.convert_to_dirt()
+    st.machine = "dirtexcav"
+    st.machine_moneymake = 1
+    st.schedule_payouts(tm.tick, 60)
+    for _ in range(10):
+        tm.simulate(6)
+    paid = len(tm.queued_val_arr) + (st.queued_val != 0)
+    assert tm.tick == 60 and st.machine_next_payout == 120 and paid == 1
+    
+    # rolls that can come up every tick count every tick of the step, not at most one
+    house, grass = tm.sprite_tiles[1], tm.sprite_tiles[2]
+    house.machine = "house"
+    house.machine_moneymake = 10
+    grass.convert_to_grass()
+    grass.grass_stage = 0
+    tm.CHANCE_HOUSE_TAX = tm.CHANCE_CHECK_MACHINE = 0
+    Tile.CHANCE_GREENER_GRASS, greener = 1, Tile.CHANCE_GREENER_GRASS
+    try:
+        tm.simulate(3)
+    finally:
+        Tile.CHANCE_GREENER_GRASS = greener
+    assert house.queued_val == 0 and grass.grass_stage == 3
+    tm.CHANCE_HOUSE_TAX = 1
+    tm.simulate(3)
+    assert house.queued_val == 10 * Tile.multiplier["rent"] * 3
+
+# ------------------- collector -------------------
+def test_gc_pacer():
+    import gc
+    from collector import GCPacer
+    pacer = GCPacer()
+    pacer.start()
+    try:
+        assert not gc.isenabled() and gc.get_freeze_count() > 0
+        
+        # cycles only go away when the pacer collects
+        pacer.frame_start()
+        junk = []
+        for _ in range(GCPacer.YOUNG_AT):
+            cycle = []
+            cycle.append(cycle)
+            junk.append(cycle)
+        del junk, cycle
+        assert pacer.frame_end(0) == None # no time left this frame
+        assert pacer.frame_growth >= GCPacer.YOUNG_AT
+        pacer.frame_start()
+        assert pacer.frame_end(1000) == 0 and pacer.collections[0] == 1
+        assert pacer.pause_seconds.count == 1
+        pacer.frame_start()
+        assert pacer.frame_end(0, idle=True) == 2 # survivors are tidied while idle
+        
+        # frames that never have slack still get older collections once they're due
+        forced = set()
+        for _ in range((GCPacer.OLDER_EVERY + 1) ** 2):
+            pacer.frame_start()
+            junk = [[] for _ in range(GCPacer.YOUNG_FORCE + 1000)]
+            forced.add(pacer.frame_end(0))
+            del junk
+        assert forced == {0, 1, 2}
+    finally:
+        pacer.stop()
+    assert gc.isenabled() and gc.get_freeze_count() == 0
+    
+    # payouts and floaters recycle their buffers
+    tm = TileManager()
+    fn = FloatingNumber(screen)
+    tm.sprite_tiles[5].queued_val = 3
+    tm.CHANCE_CHECK_MACHINE, chance = 1, tm.CHANCE_CHECK_MACHINE
+    tm.check_moneymaking()
+    tm.CHANCE_CHECK_MACHINE = chance
+    assert tm.queued_val_arr == [(tm.centers[5], 3)]
+    fn.create_number((100, 100), 3)
+    for _ in range(10):
+        fn.draw_all_floaters()
+    assert fn.list_floaters == [] and len(fn.spare) == 1
+    spare = fn.spare[0]
+    fn.create_number((100, 100), 4)
+    assert fn.list_floaters == [spare] and fn.spare == [] and spare["val"] == "4"
+
+# ------------------- profiler -------------------
+def test_sampling_profiler():
+    import json, pstats, tempfile, threading, time
+    from profiler import SamplingProfiler, game_tags
+    tm = TileManager()
+    tm.sprite_tiles[0].machine = "house"
+    with tempfile.TemporaryDirectory() as out_dir:
+        profiler = SamplingProfiler(game_tags(tm, BOARD_SIZE), out_dir, threading.get_ident())
+        assert profiler.toggle(5)
+        end = time.perf_counter() + .2
+        while time.perf_counter() < end:
+            tm.simulate()
+        assert not profiler.toggle() # second toggle stops early and writes
+        collapsed, stats, tags = profiler.written
+        
+        lines = open(collapsed).read().splitlines()
+        root = f"tileclicker board={BOARD_SIZE[0]}x{BOARD_SIZE[1]} dynamic_render={Tile.dynamic_render} machines=1"
+        assert lines and all(line.startswith(root + ";") and line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any("simulate (tile.py:" in line for line in lines)
+        
+        stats = pstats.Stats(stats)
+        assert any(name == "simulate" for _, _, name in stats.stats)
+        tags = json.load(open(tags))
+        assert tags["machine_counts"] == {"house": 1} and tags["samples"] > 0
+
+# ------------------- spectate -------------------
+def test_spectator_stream():
+    import socket, time
+    from spectate import SpectatorPublisher, BoardMirror, Subscriber, read_messages, connect, MAX_BACKLOG, BATCH_FRAMES
+    tm = TileManager()
+    publisher = SpectatorPublisher(tm, tm.board, BOARD_SIZE, 0)
+    try:
+        client = connect(publisher.server.getsockname()[1])
+        client.settimeout(5)
+        end = time.perf_counter() + 5
+        while not publisher.waiting and time.perf_counter() < end:
+            time.sleep(.01)
+        for _ in range(BATCH_FRAMES):
+            publisher.publish(tm.tick, 10)
+        
+        tm.sprite_tiles[5].machine = "house"
+        tm.sprite_tiles[6].convert_to_water()
+        publisher.add_payout((25, 275), 8)
+        for _ in range(BATCH_FRAMES):
+            publisher.publish(tm.tick + 1, 18)
+        
+        # snapshot, then the delta on top of it rebuilds the same board
+        mirror = BoardMirror()
+        messages = read_messages(client)
+        mirror.apply(next(messages))
+        assert mirror.board_size == BOARD_SIZE and mirror.deltas == 0
+        mirror.apply(next(messages))
+        assert mirror.deltas == 1 and mirror.coins == 18 and mirror.payouts == [(5, 8)]
+        coords = [(x, y) for x in range(BOARD_SIZE[0]) for y in range(BOARD_SIZE[1])]
+        assert mirror.records.tobytes() == tm.tile_records(coords)
+        assert mirror.grid(2)[0, 5] == MACHINE_CODES["house"]
+        client.close()
+    finally:
+        publisher.stop()
+    
+    # a subscriber too far behind is dropped, not waited on
+    slow, peer = socket.socketpair()
+    slow.setblocking(False)
+    sub = Subscriber(slow)
+    sub.ready = True
+    sub.pending += bytes(MAX_BACKLOG * 4)
+    publisher.subscribers = [sub]
+    publisher.flush()
+    assert publisher.subscribers == [] and publisher.dropped == 1
+    peer.close()
+    
+    # a socket file left by a killed game is replaced, anything else at the path is left alone
+    import errno, os, tempfile
+    from spectate import listen
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "spectate.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        live = listen(path)
+        
+        # one that's still served is refused, and the running listener keeps its path
+        try:
+            listen(path)
+            assert False, "bound over a live socket"
+        except OSError as error:
+            assert error.errno == errno.EADDRINUSE
+        client = connect(path)
+        live.setblocking(True)
+        live.accept()[0].close() # the refused listen's probe
+        live.accept()[0].close()
+        client.close()
+        live.close()
+        
+        # a publisher stopping late doesn't take a newer game's socket file with it
+        publisher = SpectatorPublisher(tm, tm.board, BOARD_SIZE, path)
+        os.unlink(path)
+        newer = listen(path)
+        publisher.stop()
+        assert os.path.exists(path) and not publisher.thread.is_alive()
+        newer.close()
+        
+        path = os.path.join(folder, "notes.txt")
+        open(path, "w").close()
+        try:
+            listen(path)
+            assert False, "bound over a regular file"
+        except OSError:
+            pass
+        assert os.path.isfile(path)
+
+# ------------------- metrics -------------------
+def test_metrics():
+    from metrics import Metrics, Histogram
+    hist = Histogram((.01, .1))
+    for value in (.005, .05, .05, 3):
+        hist.observe(value)
+    assert hist.lines("t") == ['t_bucket{le="0.01"} 1', 't_bucket{le="0.1"} 3', 't_bucket{le="+Inf"} 4', "t_sum 3.105", "t_count 4"]
+    
+    tm = TileManager()
+    tm.sprite_tiles[0].machine = "house"
+    from collector import GCPacer
+    metrics = Metrics(pygame.time.Clock(), tm, UIManager(screen), FloatingNumber(screen), GCPacer())
+    metrics.observe_frame(12)
+    text = metrics.collect()
+    assert 'tileclicker_machines{machine="house"} 1' in text
+    assert 'tileclicker_gc_collections_total{generation="2"} 0' in text
+    assert 'tileclicker_frame_seconds_bucket{le="0.016"} 1' in text
+
+# ------------------- simulation -------------------
+def test_shared_board():
+    from simulation import SharedBoard, TILE_BYTES
+    tm = TileManager()
+    tile = tm.return_sprite_at_coord((0, 1))
+    tile.convert_to_water()
+    
+    writer = SharedBoard(len(tm.sprite_tiles))
+    reader = SharedBoard(len(tm.sprite_tiles), name=writer.name)
+    writer.write(tm.sprite_tiles)
+    seq, data = reader.read()
+    writer.write(tm.sprite_tiles)
+    assert reader.read()[0] != seq # new snapshot in the other buffer
+    
+    record = data[TILE_BYTES:TILE_BYTES * 2] # tile (0, 1)
+    assert record[0] == tile.type_code and tuple(record[3:6]) == tile.color
+    reader.close()
+    writer.close()
+
+def test_simulation_pause():
+    import time
+    from simulation import SimulationClient
+    client = SimulationClient(BOARD_SIZE)
+    try:
+        client.pause(True)
+        time.sleep(.3)
+        paused_at = client.tick
+        time.sleep(.3)
+        assert client.tick == paused_at # menus stop the worker's ticks
+        
+        client.pause(False)
+        deadline = time.monotonic() + 3
+        while client.tick == paused_at and time.monotonic() < deadline:
+            time.sleep(.05)
+        assert client.tick > paused_at
+    finally:
+        client.stop()
+
+# ------------------- economy -------------------
+def test_economy_world():
+    from economy import EconomyWorld, summarize
+    world = EconomyWorld(BOARD_SIZE)
+    tiles = list(world.tile_mgr.sprite_tiles)
+    
+    results = [world.run(seed, "cheapest", max_ticks=300, sample_every=100, clicks_per_tick=1) for seed in (1, 2)]
+    assert world.tile_mgr.sprite_tiles == tiles and all(a is b for a, b in zip(world.tile_mgr.sprite_tiles, tiles))
+    assert results[0]["ticks"] == 300 and len(results[0]["samples"]) == 3
+    assert world.run(1, "cheapest", max_ticks=300, sample_every=100, clicks_per_tick=1)["coins"] == results[0]["coins"]
+    
+    summary = summarize(results, 1.0)
+    assert summary["runs"] == 2 and summary["wins"] == 0
+    assert [row["tick"] for row in summary["curve"]] == [100, 200, 300]
+
+# ------------------- memory -------------------
+def test_memory_report():
+    import os, tracemalloc
+    from memory import MemoryTracker
+    tm = TileManager()
+    um = UIManager(screen)
+    fn = FloatingNumber(screen)
+    tracker = MemoryTracker.for_game(tm, um, fn)
+    first = tracker.take()
+    sizes = first.surfaces_by_size()
+    assert (BOARD_SIZE[0] * 50, BOARD_SIZE[1] * 50) in sizes # board surfaces
+    assert first.surfaces_by_subsystem()["board"] > 0 and first.fonts["ui"] > 0
+    
+    # a leaked surface shows up in the diff by size
+    um.leaked = [pygame.Surface((37, 11))]
+    diff = tracker.diff(first, tracker.take())
+    assert "surfaces 37x11: +1" in diff
+    assert "python" in tracker.report(first)
+    
+    # traced blocks are charged to the subsystem of the game code that allocated them
+    tile_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tile.py")
+    assert tracker.scope_at(tile_py, tm.payout_grass.__code__.co_firstlineno + 2) == "TileManager.payout_grass"
+    tracing = tracemalloc.is_tracing()
+    MemoryTracker.start()
+    try:
+        before = tracker.take()
+        for st in tm.sprite_tiles:
+            st.queued_val = 1
+        tm.CHANCE_CHECK_MACHINE = 1
+        tm.check_moneymaking()
+        after = tracker.take()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    assert len(tm.queued_val_arr) == len(tm.sprite_tiles)
+    assert after.python["payouts"] > before.python["payouts"]
+    assert "tile.py:" in tracker.diff(before, after)
+
+# ------------------- server -------------------
+def test_server_dispatch():
+    from server import GameServer
+    server = GameServer(BOARD_SIZE)
+    owned = set()
+    a = server.dispatch({"op": "new"}, owned)["session"]
+    b = server.dispatch({"op": "new"}, owned)["session"]
+    assert owned == {a, b}
+    
+    assert server.dispatch({"op": "click", "session": a, "x": 0, "y": 0}, owned)["ok"]
+    bought = server.dispatch({"op": "buy", "session": a, "item": "Dirt Excavator", "x": 0, "y": 0}, owned)
+    assert bought["val"] == "Can't Afford!"
+    
+    # upgrades only touch their own world's multipliers
+    server.sessions[a].world.coins = 1000
+    upgraded = server.dispatch({"op": "upgrade", "session": a, "item": "Rent x2"}, owned)
+    assert upgraded["val"] == -500 and upgraded["cost"] == 1500
+    assert server.sessions[a].multiplier["rent"] == 2 and server.sessions[b].multiplier["rent"] == 1
+    
+    server.sessions[b].ticks_owed = 3
+    assert server.dispatch({"op": "state", "session": b}, owned)["tick"] == 3 # idle world caught up first
+    filled = server.dispatch({"op": "fill", "session": a, "item": "Dirt Excavator", "x0": 3, "y0": 3, "x1": 2, "y1": 2}, owned)
+    assert filled["val"] == -(32 + 34 + 36 + 38) and filled["cost"] == 40
+    assert server.dispatch({"op": "close", "session": b}, owned)["ok"] and owned == {a}
+    assert not server.dispatch({"op": "click", "session": b, "x": 0, "y": 0}, owned)["ok"]
+    
+    # other connections' sessions and tiles off the board are refused
+    assert server.dispatch({"op": "state", "session": a}, set()) == {"ok": False, "error": "not your session"}
+    assert not server.dispatch({"op": "close", "session": a}, set())["ok"] and a in server.sessions
+    assert server.dispatch({"op": "click", "session": a, "x": 999, "y": 0}, owned)["error"] == "off the board"
+    assert not server.dispatch({"op": "buy", "session": a, "item": "Dirt Excavator", "x": 0, "y": -1}, owned)["ok"]
+    assert not server.dispatch({"op": "fill", "session": a, "item": "Dirt Excavator", "x0": 0, "y0": 0, "x1": BOARD_SIZE[0], "y1": 1}, owned)["ok"]
+    Tile.multiplier = dict(Tile.BASE_MULTIPLIER)
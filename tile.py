@@ -1,12 +1,26 @@
 import pygame
 import random
 import math
+import numpy as np
+from collections import Counter
+from board import BoardRenderer
+from catalog import ITEMS, TILE_TYPES, MACHINES, MACHINE_SPRITES, TILE_CODES, MACHINE_CODES, TILE_CLICK, SELL_REFUND
+
+DIRT_CODE, WATER_CODE, GRASS_CODE = TILE_CODES["dirt"], TILE_CODES["water"], TILE_CODES["grass"]
+GRASS_STAGES = 4 # grass grows from stage 1 up to this
+
+
+def step_chance(chance: float, ticks: int) -> float:
+    """Chance of a per tick event happening at least once over a step of ticks world ticks"""
+    return chance if ticks == 1 else 1 - (1 - chance) ** ticks
 
 
 class TileFunctions():
     """Base reuseable functions"""
+    __slots__ = ("color", "image")
     BOARD_SIZE = ()
     BOARD_SIZE_PIXELS = ()
+    RENDER_SCALE = 1.0 # board is drawn at this fraction of its pixel size, tile logic stays in full pixels
     
     def __init__(self, surface_image):
         self.color = (0, 0, 0)
@@ -25,8 +39,13 @@ class TileFunctions():
             self.color_clamp(self.color[1] + dg),
             self.color_clamp(self.color[2] + db),
         )
-        self.image.fill(new_color)
         self.color = new_color
+        self.paint(new_color)
+    
+    
+    def paint(self, color: tuple):
+        """Show a new color, fills own surface"""
+        self.image.fill(color)
 
 
     def rperc(self, perc_true_chance: float) -> bool:
@@ -35,8 +54,19 @@ class TileFunctions():
         return random.randint(0, 10000) < perc_true_chance
 
 
-class Tile(pygame.sprite.Sprite, TileFunctions):
-    """The primary, individual Tile class for world tiles"""
+class Tile(TileFunctions):
+    """
+    The primary, individual Tile class for world tiles\n
+    Kept compact since there is one per board cell: fixed __slots__ instead of a __dict__,
+    type and machine stored as small int codes, rect and machine sprite derived on demand\n
+    type, grass_stage and machine are properties so the world's growth frontiers and census
+    hear about every change, whichever convert_*, click or payout made it
+    """
+    __slots__ = (
+        "coord", "board", "world", "type_code", "grass_stage_code", "water_evap", "water_does_evap",
+        "machine_code", "machine_rot_start", "machine_rot_rate", "machine_moneymake", "queued_val",
+        "machine_payout_every", "machine_next_payout"
+    )
     
     # STATIC VARIABLES
     # percent chance to 
@@ -48,14 +78,15 @@ class Tile(pygame.sprite.Sprite, TileFunctions):
     # machine
     CHANCE_CHECK_MACHINE = .2 # .2
     MACHINE_ROTATION_SPEED = (3, 6) # range of random, affects some machines outputs
-    MACHINE_TICK_EVERY = 180 # every rotational degree, higher = less frequent
+    MACHINE_TICK_EVERY = 180 # default payout period in degrees of rotation, higher = less frequent
     GRASSHARV_TOTALLY_EAT_GRASS = .1
     CHANCE_HOUSE_TAX = .02
     CHANCE_MARKET_PNL = .02
     dynamic_render = 1 # higher = less refresh rate but better performance
+    FREEZE_ANIMATION_AT = 3 # dynamic_render at which machines stop rotating on screen, payouts are unaffected
     
     # world upgrades
-    multiplier = {
+    BASE_MULTIPLIER = {
         "market": 1,
         "grass": 1,
         "rent": 1,
@@ -63,150 +94,202 @@ class Tile(pygame.sprite.Sprite, TileFunctions):
         "qt": 1,
         "win": 1
     }
+    multiplier = dict(BASE_MULTIPLIER)
+    
+    # dispatch tables compiled from the catalog, see compile_catalog
+    CLICK_RULES = [] # index tile type code: fn(tile) -> click value
+    TICK_PAYOUTS = [] # index machine code: fn(tile_mgr, tiles) or None, runs on machine tick
+    CHANCE_PAYOUTS = [] # index machine code: fn(tile_mgr, tiles) or None, runs every machine process
 
-    def __init__(self, coord: tuple):
-        pygame.sprite.Sprite.__init__(self)
-        
+    def __init__(self, coord: tuple, board: BoardRenderer = None):
         # attr
         self.coord = coord
+        self.board = board # tiles have no surface of their own, colors go to the world's board
+        self.world = None # TileManager told about type, stage and machine changes, set once the whole board exists
+        self.type_code = TILE_CODES["dirt"]
+        self.grass_stage_code = 0
+        self.machine_code = 0
         self.type = "dirt" # start all tiles with dirt, converts to grass on grass_stage 1
         self.grass_stage = 0 # 4 stages
         self.water_evap = 0 # water tiles start at 16, and disappear back to dirt at 0
         self.water_does_evap = True
         self.machine = None # machine is drawn on top of tile color
-        self.machine_img = None
-        self.machine_rot_curr = 0 # rotation to animate machines
-        self.machine_rot_rate = 0
+        self.machine_rot_start = 0 # rotation at world tick 0, purely visual, see machine_angle
+        self.machine_rot_rate = 0 # degrees per world tick
         self.machine_moneymake = 0 # how much machines make per logic tick
+        self.machine_payout_every = 0 # world ticks between tick payouts
+        self.machine_next_payout = 0 # world tick of the next tick payout
         self.queued_val = 0 # push to queued if this tile's machine should give money
-        self.render_stage = self.dynamic_render # every x: render frame
         
         """
         debug::performance tweaking purposes
-        self.machine = "house"
-        self.machine_img = "img/machine_dirt_excav.png"
+        self.machine = "dirtexcav"
         self.machine_moneymake = 1
         self.machine_rot_rate = 5
         """
         
-        # pygame surface
-        self.image = pygame.Surface((50, 50))
-        self.tile_bg = self.image # this is for machine rendering later
-        self.rect = self.image.get_rect()
-        # 50 for the scale, 25 for offset
-        self.rect.center = ((coord[0] * 50) + 25, (coord[1] * 50) + 25)
-        TileFunctions.__init__(self, self.image)
+        TileFunctions.__init__(self, None)
         
         # convert to default dirt
         self.convert_to_dirt()
+    
+    
+    def paint(self, color: tuple):
+        """Write the new color into the board color array"""
+        if self.board != None:
+            self.board.paint(self.coord, color)
+    
+    
+    @property
+    def type(self) -> str:
+        """Tile type name, stored as type_code"""
+        return TILE_TYPES[self.type_code]
+    
+    
+    @type.setter
+    def type(self, name: str):
+        code = TILE_CODES[name]
+        if code != self.type_code:
+            old, self.type_code = self.type_code, code
+            if self.world != None:
+                self.world.type_changed(self, old)
+    
+    
+    @property
+    def grass_stage(self) -> int:
+        """0 - 4, stored as grass_stage_code"""
+        return self.grass_stage_code
+    
+    
+    @grass_stage.setter
+    def grass_stage(self, stage: int):
+        if stage != self.grass_stage_code:
+            old, self.grass_stage_code = self.grass_stage_code, stage
+            if self.world != None:
+                self.world.grass_stage_changed(self, old)
+    
+    
+    @property
+    def machine(self) -> str | None:
+        """Machine name or None, stored as machine_code"""
+        return MACHINES[self.machine_code]
+    
+    
+    @machine.setter
+    def machine(self, name: str | None):
+        old, self.machine_code = self.machine_code, MACHINE_CODES[name]
+        if self.board != None:
+            self.board.set_machine(self.coord, self.machine_code)
+        if self.world != None:
+            self.world.machine_counts[old] -= 1
+            self.world.machine_counts[self.machine_code] += 1
+    
+    
+    @property
+    def machine_img(self) -> str | None:
+        """Sprite path of the machine, shared by every tile with the same machine"""
+        return MACHINE_SPRITES[self.machine_code]
+    
+    
+    @property
+    def rect(self) -> pygame.Rect:
+        """Pixel rect, derived from coord"""
+        return pygame.Rect(self.coord[0] * 50, self.coord[1] * 50, 50, 50)
 
 
-    def update(self):
+    def update(self, greener: int = None, evaps: int = None):
         """
-        Sprite updates that can be easily applied without needing adjacent tiles info\n
-        This is a named section from pygame.sprite.Sprite
+        Tile updates that can be easily applied without needing adjacent tiles info\n
+        Called once per world step from TileManager.simulate. A one tick step rolls here,
+        a coarse step passes how many of its ticks came up greener and evaporating
         """
         
         # ---------------- tiles ----------------
         # if grass that isn't totally grown yet, chance to grow greener and ++ on grass_stage
-        if self.type == "grass" and self.grass_stage < 4 and self.rperc(self.CHANCE_GREENER_GRASS):
-            self.grass_stage += 1
-            self.new_fill_color(-20, self.grass_stage * 2 * random.randint(1, 2), 0)
+        if self.type == "grass" and self.grass_stage < GRASS_STAGES:
+            grows = self.rperc(self.CHANCE_GREENER_GRASS) if greener == None else min(greener, GRASS_STAGES - self.grass_stage)
+            for _ in range(grows):
+                self.grass_stage += 1
+                self.new_fill_color(-20, self.grass_stage * 2 * random.randint(1, 2), 0)
         
         # water evaporate
-        if self.type == "water" and self.water_evap > 0 and self.rperc(self.CHANCE_WATER_EVAP):
-            if self.machine != "waterpump" and self.water_does_evap:
+        if self.type == "water" and self.water_evap > 0:
+            dries = self.rperc(self.CHANCE_WATER_EVAP) if evaps == None else min(evaps, self.water_evap)
+            if dries and self.machine != "waterpump" and self.water_does_evap:
                 # does not have a water pump and it does evaporate
-                self.water_evap -= 1
-                self.new_fill_color(2, 2, -6) # go towards dirt color
+                for _ in range(dries):
+                    self.water_evap -= 1
+                    self.new_fill_color(2, 2, -6) # go towards dirt color
         
         # on total water evaporation
         if self.type == "water" and self.water_evap == 0:
             self.water_evap = 0
             self.convert_to_dirt() # reset to dirt
-        
-        # ---------------- machines ----------------
-        if self.machine != None and self.machine_img != None:
-            self.process_machine_tile()
     
     
-    def process_machine_tile(self):
-        """Draw a machine on top of a tile"""
-        
-        # first determine whether to render this tile/machine
-        # affects self.image.fill and surf.blit at bottom
-        do_render = (self.render_stage == 0)
-        if self.render_stage == 0: self.render_stage = self.dynamic_render
-        self.render_stage -= 1
-        
-        # clear tile first
-        if do_render:
-            self.image.fill(self.color)
-        
-        # load machine image
-        surf = pygame.image.load(self.machine_img) # size 50x50
-        
-        # rotation math
-        surf = pygame.transform.rotate(surf, self.machine_rot_curr)
-        x_offset, y_offset = surf.get_size()
-        x_offset = (50 - x_offset) / 2
-        y_offset = (50 - y_offset) / 2
-        self.machine_rot_curr += self.machine_rot_rate
-        
-        # queue a money make if it should
-        # this section is DEPENDENT on machine rotation
-        if self.machine_rot_curr % self.MACHINE_TICK_EVERY == 0:
-            # dirt
-            if self.machine == "dirtexcav":
-                self.queued_val = self.machine_moneymake
-            
-            # grass
-            if self.machine == "grassharv" and self.type == "grass" and self.grass_stage > 0:
-                self.queued_val = self.machine_moneymake * self.grass_stage * Tile.multiplier["grass"]
-                
-                # chance to not eat grass_stage
-                if self.rperc(.2):
-                    self.grass_stage -= 1
-                    
-                # smallest chance to completely eat grass stage
-                if self.rperc(self.GRASSHARV_TOTALLY_EAT_GRASS):
-                    self.convert_to_dirt()
-                
-                self.new_fill_color(0, -2 * random.randint(1, 2), 0)
-            
-            # reset grass to dirt if it harvests last grass
-            if self.machine == "grassharv" and self.grass_stage == 0:
-                self.convert_to_dirt()
-            
-            # water pump refresh water
-            if self.machine == "waterpump":
-                # cost to run pump
-                self.queued_val = self.machine_moneymake
-                if self.type != "water":
-                    self.convert_to_water()
-            
-            # quantum pc
-            if self.machine == "quantumpc" and self.type == "quantum":
-                self.queued_val = self.machine_moneymake * Tile.multiplier["qt"]
-        
-        
-        # queue moneymaking that is NOT DEPENDENT on machine rotation
-        if self.machine == "house" and self.rperc(self.CHANCE_HOUSE_TAX):
-            # random chance to payout taxes
-            self.queued_val = self.machine_moneymake * Tile.multiplier["rent"]
-            
-        elif self.machine == "market" and self.rperc(self.CHANCE_MARKET_PNL):
-            # random profits or loss, but positive average ev
-            if self.rperc(.3):
-                # 30% losing
-                self.queued_val = random.randint(1, 6) * -120 * Tile.multiplier["market"]
-            else:
-                # 70% winning
-                self.queued_val = random.randint(1, 8) * 120 * Tile.multiplier["market"]
+    def machine_angle(self, tick: int) -> float:
+        """Rotation to draw at a world tick, derived on demand so nothing advances it per tick"""
+        return self.machine_rot_start + self.machine_rot_rate * tick
+    
+    
+    def schedule_payouts(self, now: int, every: int = None):
+        """
+        Start this machine's payout clock at world tick now\n
+        every defaults to one payout per MACHINE_TICK_EVERY degrees at its rotation rate
+        """
+        if every == None:
+            every = self.MACHINE_TICK_EVERY / abs(self.machine_rot_rate) if self.machine_rot_rate else self.MACHINE_TICK_EVERY
+        self.machine_payout_every = max(round(every), 1)
+        self.machine_next_payout = now + self.machine_payout_every
+    
+    
+    # ---------------- click rules, named by catalog TILE_CLICK ----------------
+    def click_grass(self) -> int:
+        """Grass value depends on stage, clicking exhausts it"""
+        val = int(self.grass_stage * 1.5 * Tile.multiplier["grass"]) + 2
         
-        # render on top of reset tile
-        if do_render:
-            self.image.blit(surf, (x_offset, y_offset))
+        # reset grass
+        self.grass_stage = 0
+        self.convert_to_dirt()
+        return val
+    
+    
+    def click_quantum(self) -> int:
+        return 21000 * Tile.multiplier["qt"]
+    
+    
+    # ---------------- machine rotation rules, named by catalog "rotation" ----------------
+    def rotation_spin(self):
+        """Random speed, chance to reverse"""
+        self.machine_rot_rate = random.randint(
+            self.MACHINE_ROTATION_SPEED[0], 
+            self.MACHINE_ROTATION_SPEED[1]
+        )
+        self.machine_rot_rate *= (self.rperc(.5) - .5) * 2 # chance to reverse
+    
+    
+    def rotation_orthogonal(self):
+        """Doesn't spin, random orthogonal dir"""
+        self.machine_rot_rate = 0
+        self.machine_rot_start = random.randint(0, 3) * 90
+    
+    
+    def rotation_pump(self):
+        self.machine_rot_rate = -4
+    
+    
+    def rotation_quantum(self):
+        """Fast spin, chance to reverse"""
+        self.machine_rot_rate = (random.randint(-2, 2) * 8) + 42
+        self.machine_rot_rate *= (self.rperc(.5) - .5) * 2 # chance to reverse
+    
+    
+    def convert_to_quantum_or_dirt(self):
+        """Keep a quantum tile quantum, anything else back to dirt"""
+        if self.type == "quantum":
+            self.convert_to_quantum()
+        else:
+            self.convert_to_dirt()
 
 
     def convert_to_water(self):
@@ -256,10 +339,16 @@ class TileManager(Tile):
     The main sprite tracking class that interfaces outside of tile module\n
     Controls sprite updates that require adjacent-tile wizardry
     """
+    ITEM_TABLE = [] # index item code: compiled catalog item, see compile_catalog
+    
     def __init__(self):
-        # LayeredUpdates is a kind of pygame sprite group that allows retrieval of sprite at coord
-        self.sprite_tiles = pygame.sprite.LayeredUpdates()
-        self.queued_val_arr = [] # list of dict of {coord: (pixel coord), val: int}
+        # flat list of tiles, x-major so a tile coord maps straight to its index
+        self.sprite_tiles = []
+        self.board = BoardRenderer(TileFunctions.BOARD_SIZE, TileFunctions.RENDER_SCALE) # tile colors and the one board surface
+        self.queued_val_arr = [] # list of (pixel coord, val) machine payouts waiting for the main loop
+        self.tick = 0 # world ticks simulated, machine payout clocks count in these
+        self.step_ticks = 1 # ticks the running simulate step stands in for
+        self.rng = np.random.default_rng(random.getrandbits(64)) # batched draws for machine payouts
         
         # create a list of all coords, makes list comprehension easier for later if needed
         self.list_all_coords = []
@@ -268,21 +357,102 @@ class TileManager(Tile):
                 self.list_all_coords.append((x, y))
         
         # create a grid of Tile objs lining the background
-        [self.sprite_tiles.add(Tile(coord)) for coord in self.list_all_coords]
+        self.sprite_tiles = [Tile(coord, self.board) for coord in self.list_all_coords]
+        
+        # index: indexes of the in-bounds tiles around it, edges just have fewer
+        self.neighbours = [
+            tuple(
+                nx * TileFunctions.BOARD_SIZE[1] + ny
+                for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y))
+                if 0 <= nx < TileFunctions.BOARD_SIZE[0] and 0 <= ny < TileFunctions.BOARD_SIZE[1]
+            )
+            for x, y in self.list_all_coords
+        ]
+        
+        # buffers the per tick and per frame passes refill instead of building new lists
+        self.centers = [(x * 50 + 25, y * 50 + 25) for x, y in self.list_all_coords] # index: pixel coord payouts float from
+        self.machine_groups = [[] for _ in MACHINES] # index machine code: tiles, see process_machines
+        self.ticking_groups = [[] for _ in MACHINES] # index machine code: tiles due a tick payout
+        self.machine_draws = [] # frame_update's machines to draw
+        self.track_tiles()
         
         # make water tiles to demonstrate how water and grass work
         for _ in range(4):
             self.create_random_water()
+    
+    
+    def reset(self):
+        """Back to a fresh world, reuses every Tile instead of building a new board"""
+        Tile.multiplier.clear()
+        Tile.multiplier.update(Tile.BASE_MULTIPLIER)
+        self.queued_val_arr.clear()
+        self.tick = 0
+        self.rng = np.random.default_rng(random.getrandbits(64))
+        
+        for st in self.sprite_tiles:
+            Tile.__init__(st, st.coord, self.board)
+        self.track_tiles()
+        
+        for _ in range(4):
+            self.create_random_water()
 
 
-    def frame_update(self, screen: pygame.display):
+    def frame_update(self, screen: pygame.display, ticks: int = 1):
         """----------------------------- WORLD, TILE UPDATE -----------------------------"""
+        self.simulate(ticks)
+        
+        # draw board and machines to screen, under heavy load machines hold still
+        tick = self.tick if Tile.dynamic_render < Tile.FREEZE_ANIMATION_AT else 0
+        tiles = self.sprite_tiles
+        machines = self.machine_draws
+        machines.clear()
+        for index in self.drawn_indexes():
+            st = tiles[index]
+            if st.machine_code:
+                machines.append((index, st.coord, st.machine_img, st.machine_angle(tick)))
+        self.board.draw(screen, machines, Tile.dynamic_render)
+    
+    
+    def drawn_indexes(self):
+        """Indexes of tiles whose machines the board draws as sprites, only those in view with a camera"""
+        camera = self.board.camera
+        if camera == None:
+            return range(len(self.sprite_tiles))
+        if not camera.detailed:
+            # zoomed out machines are markers in the board colors
+            return ()
+        x0, y0, x1, y1 = camera.visible_tiles()
+        height = TileFunctions.BOARD_SIZE[1]
+        return [index for x in range(x0, x1) for index in range(x * height + y0, x * height + y1)]
+    
+    
+    def simulate(self, ticks: int = 1):
+        """
+        One world step without drawing, usable headless\n
+        A step of more than one tick is a coarse step for idle frames and idle server worlds: it
+        advances the world ticks ticks in one pass. Rolls that can come up more than once (grass
+        greening, evaporation, rent, market) draw how many of the step's ticks they came up, one
+        off events (dirt turning to grass, collecting a queued payout) take the chance of
+        happening at least once (step_chance). Payout clocks have periods past any coarse step
+        """
+        self.tick += ticks
+        self.step_ticks = ticks
+        
         # this will call update() on all Tile instances
         # includes self grass grow
-        self.sprite_tiles.update()
-        
-        # draw sprites to screen
-        self.sprite_tiles.draw(screen)
+        tiles = self.sprite_tiles
+        if ticks == 1:
+            for st in tiles:
+                st.update()
+        else:
+            # one draw for the whole board of how many ticks each tile's rolls came up
+            greener = self.rng.binomial(ticks, Tile.CHANCE_GREENER_GRASS, len(tiles)).tolist()
+            evaps = self.rng.binomial(ticks, Tile.CHANCE_WATER_EVAP, len(tiles)).tolist()
+            for st, grows, dries in zip(tiles, greener, evaps):
+                st.update(grows, dries)
+        
+        # machine rotation and payouts, batched per machine type
+        self.process_machines()
     
         # check all water tiles to grow grass adjacent
         self.water_grows_grass()
@@ -293,8 +463,8 @@ class TileManager(Tile):
         # check moneymaking queued values
         self.check_moneymaking()
         
-        # tiles should not infinitely spread
-        assert len(self.sprite_tiles) <= 560
+        # tiles should not infinitely spread, one per board cell
+        assert len(self.sprite_tiles) == TileFunctions.BOARD_SIZE[0] * TileFunctions.BOARD_SIZE[1]
     
     
     def check_moneymaking(self):
@@ -303,51 +473,169 @@ class TileManager(Tile):
         It uses CHANCE_CHECK_MACHINE, so won't grab queued profit immediately,\n
         saving on processing.
         """
-        check_these = [
-            st for st in self.sprite_tiles
-            if self.rperc(self.CHANCE_CHECK_MACHINE)
-        ]
-        
-        for st in check_these:
+        tiles = self.sprite_tiles
+        chance = step_chance(self.CHANCE_CHECK_MACHINE, self.step_ticks)
+        for index in np.flatnonzero(self.rng.random(len(tiles)) < chance).tolist():
+            st = tiles[index]
             if st.queued_val != 0:
-                # convert to pixel coords
-                coord = (
-                    st.coord[0] * 50 + 25,
-                    st.coord[1] * 50 + 25
-                )
-                
-                # append new to self list
-                self.queued_val_arr.append({
-                    "coord": coord, 
-                    "val": st.queued_val
-                })
+                self.queued_val_arr.append((self.centers[index], st.queued_val))
                 
                 # this sprite's queued value goes back to 0
                 st.queued_val = 0
 
 
-    def return_sprite_at_coord(self, coord: tuple, coord_mode: bool = True) -> pygame.sprite.Sprite:
-        """Get tile sprite object given set of tile coords. Use coord_mode False to use pixel coords"""
-        
-        # tile coord
-        if coord_mode:
+    def process_machines(self):
+        """
+        Run each machine type's payout over all of its tiles at once. Random outcomes are
+        drawn for the whole batch in one call, so hundreds of houses or markets cost a few
+        array ops instead of a branch per tile
+        """
+        tick = self.tick
+        everyone = self.machine_groups
+        ticking = self.ticking_groups
+        for group in everyone:
+            group.clear()
+        for group in ticking:
+            group.clear()
+        for st in self.sprite_tiles:
+            if st.machine_code:
+                everyone[st.machine_code].append(st)
+                
+                # tick payouts follow the machine's own payout clock, not its rotation
+                if st.machine_next_payout <= tick:
+                    ticking[st.machine_code].append(st)
+                    st.machine_next_payout += st.machine_payout_every
+        
+        for code in range(1, len(MACHINES)):
+            payout = Tile.TICK_PAYOUTS[code]
+            if payout != None and ticking[code]:
+                payout(self, ticking[code])
+            
+            # chance payouts are NOT DEPENDENT on machine rotation
+            payout = Tile.CHANCE_PAYOUTS[code]
+            if payout != None and everyone[code]:
+                payout(self, everyone[code])
+    
+    
+    # ---------------- batched machine payouts, named by catalog "payout" ----------------
+    def payout_flat(self, tiles: list):
+        """Dirt excavator"""
+        for st in tiles:
+            st.queued_val = st.machine_moneymake
+    
+    
+    def payout_grass(self, tiles: list):
+        """Grass harvester, eats grass stages"""
+        count = len(tiles)
+        keeps_stage = self.rng.random(count) < .2 # chance to not eat grass_stage
+        eats_all = self.rng.random(count) < self.GRASSHARV_TOTALLY_EAT_GRASS # smallest chance to completely eat grass stage
+        shade = self.rng.integers(1, 3, count) * -2
+        mult = Tile.multiplier["grass"]
+        
+        for st, keep, eat, dg in zip(tiles, keeps_stage.tolist(), eats_all.tolist(), shade.tolist()):
+            if st.type == "grass" and st.grass_stage > 0:
+                st.queued_val = st.machine_moneymake * st.grass_stage * mult
+                if keep:
+                    st.grass_stage -= 1
+                if eat:
+                    st.convert_to_dirt()
+                st.new_fill_color(0, dg, 0)
+            
+            # reset grass to dirt if it harvests last grass
+            if st.grass_stage == 0:
+                st.convert_to_dirt()
+    
+    
+    def payout_pump(self, tiles: list):
+        """Water pump refreshes water, costs to run"""
+        for st in tiles:
+            st.queued_val = st.machine_moneymake
+            if st.type != "water":
+                st.convert_to_water()
+    
+    
+    def payout_quantum(self, tiles: list):
+        """Quantum pc, only on quantum tiles"""
+        mult = Tile.multiplier["qt"]
+        for st in tiles:
+            if st.type == "quantum":
+                st.queued_val = st.machine_moneymake * mult
+    
+    
+    def payout_rent(self, tiles: list):
+        """Houses, random chance to payout taxes, once per tick it came up in a coarse step"""
+        counts = self.rng.binomial(self.step_ticks, self.CHANCE_HOUSE_TAX, len(tiles))
+        mult = Tile.multiplier["rent"]
+        for i in np.flatnonzero(counts).tolist():
+            tiles[i].queued_val = tiles[i].machine_moneymake * mult * int(counts[i])
+    
+    
+    def payout_market(self, tiles: list):
+        """Markets, random profits or loss, but positive average ev"""
+        counts = self.rng.binomial(self.step_ticks, self.CHANCE_MARKET_PNL, len(tiles))
+        hits = np.flatnonzero(counts)
+        if len(hits) == 0:
+            return
+        
+        # 30% losing 1-6 * 120, 70% winning 1-8 * 120, a coarse step sums each tile's trades
+        trades = int(counts[hits].sum())
+        losing = self.rng.random(trades) < .3
+        vals = np.where(
+            losing,
+            self.rng.integers(1, 7, trades) * -120,
+            self.rng.integers(1, 9, trades) * 120
+        ) * Tile.multiplier["market"]
+        if trades > len(hits):
+            vals = np.add.reduceat(vals, np.concatenate(([0], np.cumsum(counts[hits])[:-1])))
+        for i, val in zip(hits.tolist(), vals.tolist()):
+            tiles[i].queued_val = val
+
+
+    def tile_counts(self) -> tuple[Counter, Counter]:
+        """(tile type: count, machine: count) for the whole board, from the census"""
+        types = Counter({TILE_TYPES[code]: count for code, count in enumerate(self.type_counts) if count})
+        machines = Counter({MACHINES[code]: count for code, count in enumerate(self.machine_counts) if code and count})
+        return types, machines
+
+
+    def tile_records(self, coords: list) -> bytes:
+        """Type code, grass stage, machine code, r, g, b for each tile coord, the spectator record, see spectate.py"""
+        height = TileFunctions.BOARD_SIZE[1]
+        tiles = [self.sprite_tiles[x * height + y] for x, y in coords]
+        records = np.empty((len(tiles), 6), dtype=np.uint8)
+        records[:, 0] = [st.type_code for st in tiles]
+        records[:, 1] = [st.grass_stage_code for st in tiles]
+        records[:, 2] = [st.machine_code for st in tiles]
+        if tiles:
+            xs, ys = zip(*coords)
+            records[:, 3:] = self.board.colors[list(xs), list(ys)]
+        return records.tobytes()
+
+
+    def return_sprite_at_coord(self, coord: tuple, coord_mode: bool = True) -> Tile:
+        """Get tile object given set of tile coords. Use coord_mode False to use pixel coords"""
+        
+        # pixel coord
+        if not coord_mode:
             coord = (
-                coord[0] * 50 + 25,
-                coord[1] * 50 + 25
+                int(coord[0] // 50),
+                int(coord[1] // 50)
             )
         
         # clamping coord helps lower out of bounds issues later
-        coord = (
-            min(max(coord[0], 0), TileFunctions.BOARD_SIZE_PIXELS[0] - 1), # 0 - max x - 1
-            min(max(coord[1], 0), TileFunctions.BOARD_SIZE_PIXELS[1] - 1) # 0 - max y - 1
-        )
+        x = min(max(coord[0], 0), TileFunctions.BOARD_SIZE[0] - 1) # 0 - max x - 1
+        y = min(max(coord[1], 0), TileFunctions.BOARD_SIZE[1] - 1) # 0 - max y - 1
         
-        try:
-            ret = self.sprite_tiles.get_sprites_at(coord)[0]
-        except IndexError:
-            # error catch, if notice any weird upper left corner bugs...
-            ret = self.sprite_tiles.get_sprites_at((0, 0))[0]
-        return ret
+        return self.sprite_tiles[x * TileFunctions.BOARD_SIZE[1] + y]
+    
+    
+    def tiles_at(self, pixel_coords: list) -> list:
+        """Tiles under many pixel coords at once, clamped like return_sprite_at_coord"""
+        coords = np.asarray(pixel_coords, dtype=np.int64).reshape(-1, 2) // 50
+        xs = np.clip(coords[:, 0], 0, TileFunctions.BOARD_SIZE[0] - 1)
+        ys = np.clip(coords[:, 1], 0, TileFunctions.BOARD_SIZE[1] - 1)
+        tiles = self.sprite_tiles
+        return [tiles[index] for index in (xs * TileFunctions.BOARD_SIZE[1] + ys).tolist()]
 
 
     def is_adjacent_to_type(self, this_coord: tuple, check_for_type: str) -> bool:
@@ -376,56 +664,131 @@ class TileManager(Tile):
         return any([north, south, west, east])
 
 
+    # ---------------- census ----------------
+    def count_tiles(self):
+        """Count every tile from scratch, after this the tiles keep the counts up to date"""
+        self.type_counts = [0] * len(TILE_TYPES) # index type code: tiles
+        self.grass_stage_counts = [0] * (GRASS_STAGES + 1) # index stage: grass tiles at that stage
+        self.machine_counts = [0] * len(MACHINES) # index machine code: tiles, code 0 is no machine
+        for st in self.sprite_tiles:
+            self.type_counts[st.type_code] += 1
+            self.machine_counts[st.machine_code] += 1
+            if st.type_code == GRASS_CODE:
+                self.grass_stage_counts[st.grass_stage_code] += 1
+    
+    
+    def count_type(self, name: str) -> int:
+        """Tiles of a type, ex. count_type("water")"""
+        return self.type_counts[TILE_CODES[name]]
+    
+    
+    def count_machine(self, name: str) -> int:
+        """Tiles with a machine, ex. count_machine("grassharv")"""
+        return self.machine_counts[MACHINE_CODES[name]]
+    
+    
+    def count_grass_stage(self, stage: int) -> int:
+        """Grass tiles at a grass stage"""
+        return self.grass_stage_counts[stage]
+    
+    
+    def grass_stage_changed(self, tile: Tile, old: int):
+        if self.board.touched != None:
+            self.board.touched.add(tile.coord)
+        if tile.type_code == GRASS_CODE:
+            self.grass_stage_counts[old] -= 1
+            self.grass_stage_counts[tile.grass_stage_code] += 1
+    
+    
+    def check_census(self) -> list:
+        """Compare the counters against a full scan, returns a line per mismatch, empty if consistent"""
+        types = Counter(st.type_code for st in self.sprite_tiles)
+        stages = Counter(st.grass_stage_code for st in self.sprite_tiles if st.type_code == GRASS_CODE)
+        machines = Counter(st.machine_code for st in self.sprite_tiles)
+        mismatches = []
+        for label, names, counts, scanned in (
+            ("type", TILE_TYPES, self.type_counts, types),
+            ("grass stage", range(GRASS_STAGES + 1), self.grass_stage_counts, stages),
+            ("machine", MACHINES, self.machine_counts, machines),
+        ):
+            for code, name in enumerate(names):
+                if counts[code] != scanned[code]:
+                    mismatches.append(f"{label} {name}: counted {counts[code]}, scanned {scanned[code]}")
+        return mismatches
+    
+    
+    # ---------------- growth frontiers ----------------
+    def track_tiles(self):
+        """Point every tile back at this world, rebuild the census and the frontiers from scratch"""
+        for st in self.sprite_tiles:
+            st.world = self
+        self.count_tiles()
+        self.water_frontier = set() # indexes of dirt tiles next to water
+        self.grass_frontier = set() # indexes of dirt tiles next to grass
+        for index in range(len(self.sprite_tiles)):
+            self.refresh_frontier(index)
+    
+    
+    def type_changed(self, tile: Tile, old: int):
+        """A tile changed type, only it and its neighbours can enter or leave a frontier"""
+        self.type_counts[old] -= 1
+        self.type_counts[tile.type_code] += 1
+        if old == GRASS_CODE:
+            self.grass_stage_counts[tile.grass_stage_code] -= 1
+        if tile.type_code == GRASS_CODE:
+            self.grass_stage_counts[tile.grass_stage_code] += 1
+        
+        if self.board.touched != None:
+            self.board.touched.add(tile.coord)
+        
+        index = tile.coord[0] * TileFunctions.BOARD_SIZE[1] + tile.coord[1]
+        self.refresh_frontier(index)
+        for near in self.neighbours[index]:
+            self.refresh_frontier(near)
+    
+    
+    def refresh_frontier(self, index: int):
+        tiles = self.sprite_tiles
+        near_water = near_grass = False
+        if tiles[index].type_code == DIRT_CODE:
+            for near in self.neighbours[index]:
+                code = tiles[near].type_code
+                near_water = near_water or code == WATER_CODE
+                near_grass = near_grass or code == GRASS_CODE
+        
+        if near_water:
+            self.water_frontier.add(index)
+        else:
+            self.water_frontier.discard(index)
+        if near_grass:
+            self.grass_frontier.add(index)
+        else:
+            self.grass_frontier.discard(index)
+    
+    
+    def grow_frontier(self, frontier: set, chance: float):
+        """Each frontier tile turns to grass at chance, cost scales with the frontier not the board"""
+        if not frontier:
+            return
+        
+        # decide for the whole frontier first, converting changes the sets
+        hits = np.flatnonzero(self.rng.random(len(frontier)) < chance)
+        if not hits.size:
+            return
+        indexes = list(frontier)
+        for hit in hits.tolist():
+            self.sprite_tiles[indexes[hit]].convert_to_grass()
+
+
     def water_grows_grass(self):
         """Water tiles will occasionally spawn grass on dirt adjacent to them"""
-        
-        # checking everything is insanely slow, so spot check random pixels
-        check_these = [
-            st for st in self.sprite_tiles
-            if self.rperc(self.CHANCE_CHECK_COORD)
-        ]
-        
-        # obtain a list of water adjacent blocks that are also dirt
-        coords_for_water_adj = [
-            st.coord 
-            for st in check_these 
-            if self.is_adjacent_to_type(st.coord, "water") 
-            and st.type == "dirt"
-        ]
-        # everything here is water adjacent and is dirt
-        
-        # tile will convert to grass if passing individual random check
-        [
-            self.return_sprite_at_coord(coord).convert_to_grass() 
-            for coord in coords_for_water_adj 
-            if self.rperc(self.CHANCE_GRASS_FROM_WATER)
-        ]
+        # same odds as spot checking CHANCE_CHECK_COORD of the board, then CHANCE_GRASS_FROM_WATER
+        self.grow_frontier(self.water_frontier, step_chance(self.CHANCE_CHECK_COORD * self.CHANCE_GRASS_FROM_WATER, self.step_ticks))
 
 
     def grass_grows_grass(self):
         """If unlocked: grass tiles will occasionally spawn grass on dirt adjacent to them"""
-        
-        # checking everything is insanely slow, so spot check random pixels
-        check_these = [
-            st for st in self.sprite_tiles
-            if self.rperc(self.CHANCE_CHECK_COORD)
-        ]
-
-        # obtain a list of water adjacent blocks that are also dirt
-        coords_for_water_adj = [
-            st.coord 
-            for st in check_these
-            if self.is_adjacent_to_type(st.coord, "grass") 
-            and st.type == "dirt"
-        ]
-        # everything here is water adjacent and is dirt
-
-        # tile will convert to grass if passing individual random check
-        [
-            self.return_sprite_at_coord(coord).convert_to_grass() 
-            for coord in coords_for_water_adj
-            if self.rperc(Tile.multiplier["grassspread"])
-        ]
+        self.grow_frontier(self.grass_frontier, step_chance(self.CHANCE_CHECK_COORD * Tile.multiplier["grassspread"], self.step_ticks))
 
 
     def create_random_water(self):
@@ -440,205 +803,142 @@ class TileManager(Tile):
     
     
     def click_event_value(self, pixel_coord: tuple, coins: float, active_button) -> int:
-        """Primary Event/Click Logic"""
-        this_sprite = self.return_sprite_at_coord(pixel_coord, coord_mode=False)
-        val = "Can't Afford!" # default to can't afford cuts down on elses
-        is_selling_machine = False
-        is_selling_tile = False
-        is_buying_machine = False
-        is_buying_tile = False
-        
-        if active_button != None:
-            can_buy_this = float(coins) >= active_button.cost
-        
-        
+        """Primary Event/Click Logic, dispatched through the compiled catalog tables"""
+        return self.click_tile(self.return_sprite_at_coord(pixel_coord, coord_mode=False), coins, active_button)
+    
+    
+    def click_tile(self, this_sprite: Tile, coins: float, active_button) -> int:
+        """Click an already resolved tile, see click_event_value"""
         # ------------------------------------------------------------------
         # not trying to buy anything, proceed normally with tile click
         if active_button == None:
-                
-            # dirt
-            if this_sprite.type == "dirt":
-                val = 1
-            
-            # dirt
-            if this_sprite.type == "pavement":
-                val = 7
-                
-            # water
-            elif this_sprite.type == "water":
-                val = 0
-                
-            # grass
-            elif this_sprite.type == "grass":
-                val = int(this_sprite.grass_stage * 1.5 * Tile.multiplier["grass"]) + 2
-                
-                # reset grass
-                this_sprite.grass_stage = 0
-                this_sprite.convert_to_dirt()
-            
-            # quant tile
-            if this_sprite.type == "quantum":
-                val = 21000 * Tile.multiplier["qt"]
+            return Tile.CLICK_RULES[this_sprite.type_code](this_sprite)
+        
+        # buy upgrades are located in upgrade_button
+        item = TileManager.ITEM_TABLE[active_button.item_code]
         
         # ------------------------------------------------------------------
         # sell stuff
-        # sell dirtexcav
-        elif active_button.label == "Dirt Excavator" and this_sprite.machine == "dirtexcav":
-            this_sprite.convert_to_dirt()
-            is_selling_machine = True
-        
-        # sell house
-        elif active_button.label == "House" and this_sprite.machine == "house":
-            this_sprite.convert_to_dirt()
-            is_selling_machine = True
-        
-        # sell grassharv
-        elif active_button.label == "Grass Harvester" and this_sprite.machine == "grassharv":
-            this_sprite.convert_to_grass()
-            is_selling_machine = True
-        
-        # sell water pump
-        elif active_button.label == "Water Pump" and this_sprite.machine == "waterpump":
-            this_sprite.convert_to_water()
-            is_selling_machine = True
-        
-        # sell market
-        elif active_button.label == "Market" and this_sprite.machine == "market":
-            this_sprite.convert_to_dirt()
-            is_selling_machine = True
-        
-        # sell pavement
-        elif active_button.label == "Decorative Pavement" and this_sprite.type == "pavement":
-            this_sprite.convert_to_dirt()
-            is_selling_tile = True
-        
-        # sell quantum tile
-        elif active_button.label == "Quantum Tile" and this_sprite.type == "quantum":
-            this_sprite.convert_to_dirt()
-            is_selling_tile = True
-        
-        # sell quantum pc
-        elif active_button.label == "Quantum PC" and this_sprite.machine == "quantumpc":
-            if this_sprite.type == "quantum":
-                this_sprite.convert_to_quantum()
-            else:
-                this_sprite.convert_to_dirt()
-                
-            is_selling_machine = True
-        
+        if item["sell"] != None and getattr(this_sprite, item["sell_attr"]) == item["code"]:
+            item["sell"](this_sprite)
+            val = math.floor(active_button.cost * SELL_REFUND)
+            active_button.cost -= active_button.increase
+            if item["kind"] == "machine":
+                this_sprite.machine = None
+            return val
         
         # ------------------------------------------------------------------
-        # trying to buy tiles
-        # water
-        elif active_button.label == "Water Tile" and can_buy_this:
-            # can renew and refresh buy buying another on top of old
-            this_sprite.convert_to_water()
-            this_sprite.water_evap = 16
-            is_buying_tile = True
+        # v buy below this point v
+        if item["buy"] == None:
+            return "Can't Afford!"
         
-        # pavement
-        elif active_button.label == "Decorative Pavement" and can_buy_this:
-            this_sprite.convert_to_pavement()
-            is_buying_tile = True
+        # sprite not machine-empty
+        if item["needs_empty"] and this_sprite.machine_code:
+            return "Occupied!"
         
-        # quantum tile
-        elif active_button.label == "Quantum Tile" and can_buy_this:
-            this_sprite.convert_to_quantum()
-            is_buying_tile = True
+        if float(coins) < active_button.cost:
+            return "Can't Afford!"
         
+        item["buy"](self, this_sprite)
+        val = -active_button.cost
+        if item["kind"] == "machine":
+            this_sprite.machine_moneymake = active_button.profit
+        active_button.cost += active_button.increase
+            
+        return val
+    
+    
+    def paint_tiles(self, tiles: list, coins: float, active_button) -> int:
+        """
+        Buy or sell active_button's item on many tiles as one purchase, see click_tile\n
+        The first tile picks the mode like a single click would: if it already holds the item
+        every tile holding it is sold, otherwise the item is bought on every tile that takes it,
+        in order, for as many as coins cover. Cost and refund come from series_cost instead of
+        stepping active_button.cost once per tile.
+        """
+        if len(tiles) == 1:
+            return self.click_tile(tiles[0], coins, active_button)
+        item = TileManager.ITEM_TABLE[active_button.item_code]
+        holds = lambda tile: getattr(tile, item["sell_attr"]) == item["code"]
         
         # ------------------------------------------------------------------
-        # buy upgrades are located in upgrade_button
-        
+        # sell stuff
+        if item["sell"] != None and holds(tiles[0]):
+            sold = [tile for tile in tiles if holds(tile)]
+            val = math.floor(self.series_cost(active_button.cost, -active_button.increase, len(sold)) * SELL_REFUND)
+            for tile in sold:
+                item["sell"](tile)
+                if item["kind"] == "machine":
+                    tile.machine = None
+            active_button.cost -= active_button.increase * len(sold)
+            return val
         
         # ------------------------------------------------------------------
-        # v buy machine below this point v
+        # v buy below this point v
+        if item["buy"] == None:
+            return "Can't Afford!"
+        
+        # tiles that already hold a sellable item would be sold by a click, painting skips them
+        # unsellable ones (water) are bought again on top, a click refreshes them the same way
+        sellable = item["sell"] != None
+        free = [tile for tile in tiles if not (sellable and holds(tile)) and not (item["needs_empty"] and tile.machine_code)]
+        if not free:
+            return "Occupied!"
+        
+        count = self.affordable_count(active_button.cost, active_button.increase, float(coins), len(free))
+        if count == 0:
+            return "Can't Afford!"
+        
+        for tile in free[:count]:
+            item["buy"](self, tile)
+            if item["kind"] == "machine":
+                tile.machine_moneymake = active_button.profit
+        val = -self.series_cost(active_button.cost, active_button.increase, count)
+        active_button.cost += active_button.increase * count
         
-        # sprite not machine-empty
-        elif this_sprite.machine != None:
-            val = "Occupied!"
-            
-        # buy dirt excav
-        elif active_button.label == "Dirt Excavator" and can_buy_this:
-            this_sprite.machine = "dirtexcav"
-            this_sprite.machine_rot_rate = random.randint(
-                self.MACHINE_ROTATION_SPEED[0], 
-                self.MACHINE_ROTATION_SPEED[1]
-            )
-            this_sprite.machine_rot_rate *= (self.rperc(.5) - .5) * 2 # chance to reverse
-            is_buying_machine = True
-        
-        # buy house
-        elif active_button.label == "House" and can_buy_this:
-            this_sprite.machine = "house"
-            this_sprite.machine_rot_rate = 0
-            this_sprite.machine_rot_curr = random.randint(0, 3) * 90 # random orthogonal dir
-            is_buying_machine = True
-        
-        # buy grass harvester
-        elif active_button.label == "Grass Harvester" and can_buy_this:
-            this_sprite.machine = "grassharv"
-            this_sprite.machine_rot_rate = random.randint(
-                self.MACHINE_ROTATION_SPEED[0], 
-                self.MACHINE_ROTATION_SPEED[1]
-            )
-            this_sprite.machine_rot_rate *= (self.rperc(.5) - .5) * 2 # chance to reverse
-            is_buying_machine = True
-        
-        # buy water pump
-        elif active_button.label == "Water Pump" and can_buy_this:
-            this_sprite.machine = "waterpump"
-            this_sprite.machine_rot_rate = -4
-            is_buying_machine = True
-            
-            # automatically set tile and adjacent tiles to water to save on processing
-            x, y = this_sprite.coord
-            for y_offset in range(-1, 2):
-                for x_offset in range(-1, 2):
-                    coord = (x + x_offset, y + y_offset)
-                    self.return_sprite_at_coord(coord).convert_to_water()
-                    self.return_sprite_at_coord(coord).water_does_evap = False
-        
-        # buy market
-        elif active_button.label == "Market" and can_buy_this:
-            this_sprite.machine = "market"
-            this_sprite.machine_rot_rate = 0
-            this_sprite.machine_rot_curr = random.randint(0, 3) * 90
-            is_buying_machine = True
-        
-        # buy quantum pc
-        elif active_button.label == "Quantum PC" and can_buy_this:
-            this_sprite.machine = "quantumpc"
-            this_sprite.machine_rot_rate = (random.randint(-2, 2) * 8) + 42
-            this_sprite.machine_rot_rate *= (self.rperc(.5) - .5) * 2 # chance to reverse
-            is_buying_machine = True
-
-        # ------------------------------------------------------------------  
-        
-        # value, machine, and button cost logic
-        # selling
-        if is_selling_machine:
-            val = math.floor(active_button.cost * .8)
-            active_button.cost -= active_button.increase
-            this_sprite.machine = None
-        elif is_selling_tile:
-            val = math.floor(active_button.cost * .8)
-            active_button.cost -= active_button.increase
-        
-        # buying
-        elif is_buying_tile:
-            val = -active_button.cost
-            active_button.cost += active_button.increase
-        elif is_buying_machine:
-            val = -active_button.cost
-            this_sprite.machine_img = active_button.machine_location
-            this_sprite.machine_moneymake = active_button.profit
-            active_button.cost += active_button.increase
-            
         return val
     
     
-    def upgrade_button(self, active_button) -> bool:
+    @staticmethod
+    def series_cost(cost: int, increase: int, count: int) -> int:
+        """Total of count purchases starting at cost, each one increase dearer than the last"""
+        return count * cost + increase * count * (count - 1) // 2
+    
+    
+    @staticmethod
+    def affordable_count(cost: int, increase: int, coins: float, limit: int) -> int:
+        """Most purchases (up to limit) whose series_cost fits in coins, root of the quadratic"""
+        if coins < cost:
+            return 0
+        if increase == 0:
+            count = limit if cost <= 0 else int(coins // cost)
+        else:
+            # increase/2 n^2 + (cost - increase/2) n - coins <= 0
+            b = cost - increase / 2
+            count = int((-b + math.sqrt(b * b + 2 * increase * coins)) / increase)
+            
+            # float rounding can be one off either way
+            while count > 0 and TileManager.series_cost(cost, increase, count) > coins:
+                count -= 1
+            while count < limit and TileManager.series_cost(cost, increase, count + 1) <= coins:
+                count += 1
+        return min(count, limit)
+    
+    
+    @staticmethod
+    def flood(tile_mgr, this_sprite: Tile):
+        """Set tile and adjacent tiles to water that doesn't evaporate, saves on processing"""
+        x, y = this_sprite.coord
+        for y_offset in range(-1, 2):
+            for x_offset in range(-1, 2):
+                coord = (x + x_offset, y + y_offset)
+                tile_mgr.return_sprite_at_coord(coord).convert_to_water()
+                tile_mgr.return_sprite_at_coord(coord).water_does_evap = False
+    
+    
+    @staticmethod
+    def upgrade_button(active_button) -> bool:
+        """Apply an upgrade to the world multipliers, returns True if it was the win upgrade"""
         if active_button != None:
             
             # check stage
@@ -651,4 +951,69 @@ class TileManager(Tile):
                     # player has won, do something
                     return True
         
-        return False
\ No newline at end of file
+        return False
+
+
+def compile_catalog():
+    """
+    Compile the catalog once into integer-coded dispatch tables.\n
+    Rule names in catalog.py resolve to Tile / TileManager functions here, so a click
+    or a machine tick is a list lookup instead of a chain of string compares.
+    Payouts are TileManager methods that take every tile of one machine type at once.
+    """
+    # click value per tile type code
+    Tile.CLICK_RULES = []
+    for name in TILE_TYPES:
+        rule = TILE_CLICK[name]
+        if isinstance(rule, int):
+            Tile.CLICK_RULES.append(lambda tile, val=rule: val)
+        else:
+            Tile.CLICK_RULES.append(getattr(Tile, f"click_{rule}"))
+    
+    # machine payouts per machine code, rent and market are chance based instead of tick based
+    chance_payouts = ("rent", "market")
+    Tile.TICK_PAYOUTS = [None] * len(MACHINES)
+    Tile.CHANCE_PAYOUTS = [None] * len(MACHINES)
+    
+    TileManager.ITEM_TABLE = []
+    for code, item in enumerate(ITEMS):
+        entry = {"kind": item["kind"], "sell": None, "sell_attr": None, "code": 0, "buy": None, "needs_empty": False}
+        
+        if item["kind"] == "tile":
+            convert = getattr(Tile, f"convert_to_{item['tile']}")
+            entry["code"] = TILE_CODES[item["tile"]]
+            entry["sell_attr"] = "type_code"
+            entry["buy"] = lambda tile_mgr, tile, convert=convert: convert(tile)
+        
+        elif item["kind"] == "machine":
+            machine_code = MACHINE_CODES[item["machine"]]
+            entry["code"] = machine_code
+            entry["sell_attr"] = "machine_code"
+            
+            # payout
+            payout = getattr(TileManager, f"payout_{item['payout']}")
+            if item["payout"] in chance_payouts:
+                Tile.CHANCE_PAYOUTS[machine_code] = payout
+            else:
+                Tile.TICK_PAYOUTS[machine_code] = payout
+            
+            rotation = getattr(Tile, f"rotation_{item['rotation']}")
+            on_buy = getattr(TileManager, item["on_buy"]) if "on_buy" in item else None
+            payout_every = item.get("payout_every")
+            
+            def buy(tile_mgr, tile, machine=item["machine"], rotation=rotation, on_buy=on_buy, payout_every=payout_every):
+                tile.machine = machine
+                rotation(tile)
+                tile.schedule_payouts(tile_mgr.tick, payout_every)
+                if on_buy != None:
+                    on_buy(tile_mgr, tile)
+            entry["buy"] = buy
+        
+        if item.get("sell_to") != None:
+            entry["sell"] = getattr(Tile, f"convert_to_{item['sell_to']}")
+        entry["needs_empty"] = item.get("placement") == "empty"
+        
+        TileManager.ITEM_TABLE.append(entry)
+
+
+compile_catalog()
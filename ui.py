@@ -1,13 +1,16 @@
 import pygame
 import math
 import random
+import time
+from catalog import ITEMS, SHOP_COUNT
+from assets import Assets, Atlas
 
 
 class BaseUI():
     GOLD_COLOR = (255, 190, 50)
     BOARD_SIZE = ()
     BOARD_SIZE_PIXELS = ()
-    MONEYPERSEC_DECAY_RATE = .8 # raise to make money per second decay slower # .8
+    RENDER_SCALE = 1.0 # screen resolution relative to the layout, all UI coords stay in layout pixels
     
     """Base UI class"""
     def __init__(self, screen, static_mode: bool = True):
@@ -45,8 +48,15 @@ class BaseUI():
     
     
     def draw_image(self, icon_location: str, coord: tuple, alpha: int = 255) -> int:
-        img = pygame.image.load(icon_location)
-        img.set_alpha(alpha)
+        # sprites come straight from the atlas
+        if alpha == 255 and Atlas.has(icon_location):
+            return Atlas.blit(self.screen, icon_location, coord).height
+        
+        img = Atlas.sprite(icon_location) if Atlas.has(icon_location) else Assets.get(icon_location)
+        if alpha != 255:
+            # cached surface is shared, don't change its alpha for everyone
+            img = img.copy()
+            img.set_alpha(alpha)
         self.screen.blit(img, coord)
         return img.get_height()
     
@@ -59,6 +69,26 @@ class BaseUI():
         return (self.x + padding[0], self.y + padding[1])
         
     
+    @staticmethod
+    def to_render(coord: tuple) -> tuple:
+        """Layout coord (or size) to screen pixels at RENDER_SCALE"""
+        return (round(coord[0] * BaseUI.RENDER_SCALE), round(coord[1] * BaseUI.RENDER_SCALE))
+    
+    
+    @staticmethod
+    def to_logical(coord: tuple) -> tuple:
+        """Screen pixel, ex. mouse position, back to a layout coord"""
+        return (int(coord[0] / BaseUI.RENDER_SCALE), int(coord[1] / BaseUI.RENDER_SCALE))
+    
+    
+    @staticmethod
+    def scale_surface(surf: pygame.Surface) -> pygame.Surface:
+        """Surface drawn at layout size resized to RENDER_SCALE, the same surface at 1"""
+        if BaseUI.RENDER_SCALE == 1:
+            return surf
+        return pygame.transform.smoothscale(surf, BaseUI.to_render(surf.get_size()))
+    
+    
     @staticmethod
     def displayitize_thousands(amount: float) -> str:
         """
@@ -136,21 +166,27 @@ class StaticUI(BaseUI):
 
 
 class DynamicUI(BaseUI):
-    """UI that moves or updates"""
+    """UI that moves or updates. dirty is raised whenever its value changes so it only gets redrawn then"""
     def __init__(self, screen):
         super().__init__(screen)
         self.inner_attr = {}
+        self.dirty = True # needs a redraw
         
     
     def set_inner_attr(self, var_name: str, value: any):
         """Absolute value set or create new dynamic internal variable"""
-        self.inner_attr[var_name] = str(value)
+        value = str(value)
+        if self.inner_attr.get(var_name) != value:
+            self.inner_attr[var_name] = value
+            self.dirty = True
         
         
     def change_inner_attr(self, var_name: str, delta_val: int | float):
         """Increment or decrement"""
         delta_val = float(delta_val)
-        self.inner_attr[var_name] = str(float(self.inner_attr[var_name]) + delta_val)
+        if delta_val != 0:
+            self.inner_attr[var_name] = str(float(self.inner_attr[var_name]) + delta_val)
+            self.dirty = True
         
     
     def get_inner_attr(self, var_name: str) -> any:
@@ -165,6 +201,11 @@ class DynamicUI(BaseUI):
         box = pygame.Surface((br_corner[0] - ul_corner[0], br_corner[1] - ul_corner[1]))
         box.fill(color)
         self.screen.blit(box, (ul_corner))
+    
+    
+    def invalidate(self):
+        """Force a redraw on the next render"""
+        self.dirty = True
         
 
 class Button(DynamicUI):
@@ -179,7 +220,8 @@ class Button(DynamicUI):
             is_upgrade: bool = False,
             upgrade_max_stages: int = 2,
             upgrade_key: str = "",
-            increase: int = 0
+            increase: int = 0,
+            item_code: int = None
         ):
         super().__init__(screen)
         
@@ -199,7 +241,7 @@ class Button(DynamicUI):
         self.upgrade_key = upgrade_key
         self.status = False
         self.increase = increase
-        self.draw_button()
+        self.item_code = item_code # catalog ITEMS index
 
 
     def draw_button(self):
@@ -220,41 +262,25 @@ class Button(DynamicUI):
     
     
     def set_status(self, active: bool):
-        """Set this buttons status"""
-        self.status = active
-        
-        # also redraw button
-        self.draw_button()
+        """Set this buttons status, only needs a redraw if it actually changed"""
+        if self.status != active:
+            self.status = active
+            self.dirty = True
     
     
-    def click_within_bounds(self, click_coord: tuple) -> bool:
-        """Set self.status accordingly for a click"""
-        side_side = click_coord[0] > self.ulx and click_coord[0] < self.brx
-        up_down = click_coord[1] > self.uly and click_coord[1] < self.bry
-        
-        # inner_bool will be true if clicked on this button
-        inner_bool = all([side_side, up_down])
-        
-        if inner_bool:
-            # this button was clicked on
-            if not self.status:
-                # prev state was inactive, activate it
-                self.set_status(True)
-            else:
-                # prev state was active, so inactive it
-                self.set_status(False)
-                
-        else:
-            # this button was not clicked on
-            self.set_status(False)
-            
-        return self.status
+    def within_bounds(self, click_coord: tuple) -> bool:
+        """True if click_coord is on this button"""
+        side_side = self.ulx < click_coord[0] < self.brx
+        up_down = self.uly < click_coord[1] < self.bry
+        return side_side and up_down
     
     
     def double_cost(self):
         """Modify cost of a button"""
         if self.is_upgrade:
             
+            self.dirty = True
+            
             # still has upgrades to go
             if self.upgrade_stage < self.upgrade_max_stages:
                 self.upgrade_stage += 1
@@ -273,23 +299,28 @@ class Button(DynamicUI):
 
 
 class FloatingNumber(BaseUI):
-    """
-    Create RPG-like floating numbers\n
-    Also has a simple moving average of coins / sec
-    """
+    """Create RPG-like floating numbers"""
     PIXEL_RAISE_PER_FRAME = 5 # def: 5 # pixels that a floating number goes up y dir per frame gen
     
     def __init__(self, screen):
         super().__init__(screen)
-        self.list_floaters = [] # array of dict with {val:int, stage:int, x:int, y:int} 
-        # stage starts 20, once goes down to 0 it is deleted
-        self.decay = 0 # to save on processing emulate a really long array, decays at some % per render
-        self.last7 = [0] * 7 # actual sma
-        self.decay_frame = 12 # only decays every 12 frames
+        self.list_floaters = [] # array of dict with {val:int, stage:int, x:int, y:int, img:rendered val} 
+        # stage starts 8, once goes below 0 it is deleted
+        self.spare = [] # retired floater dicts, reused so a steady stream of payouts allocates nothing
+        
+        # floaters are drawn straight onto the screen, so sized for the render scale
+        if BaseUI.RENDER_SCALE != 1:
+            self.font["h2"] = pygame.font.SysFont("georgia", round(32 * BaseUI.RENDER_SCALE))
+        self.icon = None # coin icon at render scale, made on first draw
+        self.view = None # board pixels to view layout pixels or None if off screen, ex. Camera.to_view
         
         
-    def create_number(self, click_coord: tuple, val: int | float):
-        """Create a new floating number"""
+    def create_number(self, click_coord: tuple, val: int | float, on_board: bool = True):
+        """Create a new floating number, on_board False for coords already in screen layout"""
+        if on_board and self.view != None:
+            click_coord = self.view(click_coord)
+            if click_coord == None:
+                return
         
         # check if x is too far right first
         req_x = (BaseUI.BOARD_SIZE_PIXELS[0] - 50 - (len(str(val)) * 16))
@@ -302,21 +333,21 @@ class FloatingNumber(BaseUI):
             strval = BaseUI.displayitize_thousands(val)
         if isinstance(val, int):
             strval = BaseUI.displayitize_thousands(val)
-        if isinstance(val, str):
-            val = 0.0
             
-        self.list_floaters.append({
-            "val": strval,
-            "floatval": float(val),
-            "stage": 8,
-            "x": click_coord[0],
-            "y": click_coord[1]
-        })
+        item = self.spare.pop() if self.spare else {}
+        item["val"] = strval
+        item["stage"] = 8
+        item["x"] = click_coord[0]
+        item["y"] = click_coord[1]
+        item["img"] = None
+        self.list_floaters.append(item)
     
     
     def draw_all_floaters(self):
         """Render all of the floating numbers, wherever they are"""
-        for index, item in enumerate(self.list_floaters):
+        floaters = self.list_floaters
+        kept = 0
+        for item in floaters:
             coord_img = (
                 item["x"] + 15, # x
                 item["y"] - 4 # y
@@ -332,268 +363,223 @@ class FloatingNumber(BaseUI):
             opa = 255
             
             
-            super().draw_image("img/icon_tilecoin_sm.png", coord_img, alpha=opa)
-            super().draw_text("h2", str(item["val"]), BaseUI.GOLD_COLOR, coord_text, alpha=opa)
+            if self.icon == None:
+                self.icon = BaseUI.scale_surface(Atlas.sprite("img/icon_tilecoin_sm.png"))
+            self.screen.blit(self.icon, BaseUI.to_render(coord_img))
+            
+            # the text never changes while it floats, render it once
+            if item["img"] == None:
+                item["img"] = self.font["h2"].render(str(item["val"]), True, BaseUI.GOLD_COLOR)
+                item["img"].set_alpha(opa)
+            self.screen.blit(item["img"], BaseUI.to_render(coord_text))
             
             
             # update its stage and y pos so it floats upwards
-            self.list_floaters[index]["stage"] -= 1
-            self.list_floaters[index]["y"] -= self.PIXEL_RAISE_PER_FRAME
+            item["stage"] -= 1
+            item["y"] -= self.PIXEL_RAISE_PER_FRAME
             
-            # check end of stage removal
-            if self.list_floaters[index]["stage"] < 0:
-                # strange end-of-life flickering if remove too early, hence -20 for stage check
-                # fixing the flickering requires more processing power to draw it in a different spot for a few frames
-                # and we can't spare power, so, flicker away ?!?
-                self.list_floaters.remove(item)
-                
-                # add it to decay for money per second
-                self.decay += item["floatval"]
-                
+            # check end of stage removal, live floaters are packed to the front in place
+            if item["stage"] < 0:
+                item["img"] = None
+                self.spare.append(item)
+            else:
+                floaters[kept] = item
+                kept += 1
+        del floaters[kept:]
+
+
+class IncomeMeter():
+    """
+    Exact coins / sec over sliding time windows\n
+    Every payout is recorded as (monotonic timestamp, amount) into a fixed size ring buffer.
+    Each window keeps its own tail index and a running sum, so recording and reading
+    are O(1) amortized and do not depend on frame rate or on floaters being drawn.
+    """
+    WINDOWS = (1, 10, 60) # seconds
+    CAPACITY = 4096 # ring buffer slots, payouts at the same timestamp share one slot
+    
+    def __init__(self, windows: tuple = WINDOWS, capacity: int = CAPACITY, clock = time.monotonic):
+        self.windows = tuple(windows)
+        self.capacity = capacity
+        self.clock = clock
+        
+        # ring buffer, absolute entry n lives in slot n % capacity
+        self.times = [0.0] * capacity
+        self.amounts = [0.0] * capacity
+        self.count = 0 # total entries ever written
+        
+        # per window: absolute index of its oldest entry and running sum of its entries
+        self.tails = [0] * len(self.windows)
+        self.sums = [0.0] * len(self.windows)
+    
+    
+    def record(self, amount: int | float, now: float = None):
+        """Record a payout, negative amounts (running costs, market losses) are allowed"""
+        if now is None:
+            now = self.clock()
+        amount = float(amount)
+        last = self.count - 1
+        
+        if self.count > 0 and self.times[last % self.capacity] == now:
+            # same timestamp as the newest entry, merge into it
+            self.amounts[last % self.capacity] += amount
+            for i, tail in enumerate(self.tails):
+                if tail <= last:
+                    self.sums[i] += amount
+            return
+        
+        # ring is full, the oldest entry gets overwritten so evict it from any window still holding it
+        oldest = self.count - self.capacity
+        if oldest >= 0:
+            for i, tail in enumerate(self.tails):
+                if tail <= oldest:
+                    self.sums[i] -= self.amounts[oldest % self.capacity]
+                    self.tails[i] = oldest + 1
+        
+        slot = self.count % self.capacity
+        self.times[slot] = now
+        self.amounts[slot] = amount
+        self.count += 1
+        for i in range(len(self.sums)):
+            self.sums[i] += amount
+        
+        self.expire(now)
+    
+    
+    def expire(self, now: float = None):
+        """Drop entries that fell out of each window"""
+        if now is None:
+            now = self.clock()
+        
+        for i, window in enumerate(self.windows):
+            tail = self.tails[i]
+            cutoff = now - window
+            while tail < self.count and self.times[tail % self.capacity] <= cutoff:
+                self.sums[i] -= self.amounts[tail % self.capacity]
+                tail += 1
+            
+            # empty window, snap back to 0 so float error can't build up
+            if tail == self.count:
+                self.sums[i] = 0.0
+            self.tails[i] = tail
     
-    def calc_sma(self) -> int:
-        """Add upp all current floaters for money per second, simple moving average"""
-        # current decay gets decayed, which helps save on having an array of size 1400 each render
-        if self.decay_frame == 0:
-            self.decay = round(self.decay * BaseUI.MONEYPERSEC_DECAY_RATE, 2)
-            self.decay_frame = 12
-        else:
-            self.decay_frame -= 1
-        
-        floater_sum = sum([s["floatval"] for s in self.list_floaters])
-        total = floater_sum + self.decay
-        
-        #print(f"decay {self.decay} -- {floater_sum} -- {total}")
-        
-        # actual sma stuff
-        self.last7.append(total)
-        self.last7.pop(0)
-        
-        # return the money per second
-        return round(sum(self.last7) / 7 / 2) # the last / 2 is just a const for rescaling the numbers since they aren't exactly run per second, but simulated from a decay to save on processing
+    
+    def rate(self, window: int = 10, now: float = None) -> float:
+        """Coins / sec over the given window, which must be one of self.windows"""
+        self.expire(now)
+        return self.sums[self.windows.index(window)] / window
+    
+    
+    def rates(self, now: float = None) -> dict:
+        """Coins / sec for every window, keyed by window seconds"""
+        self.expire(now)
+        return {window: self.sums[i] / window for i, window in enumerate(self.windows)}
 
 
 class BuyButtons(Button):
     """Return list of all Buy Buttons in the Shop"""
+    # height of button is determined first by its y offset, then its scale
+    # coords are local to the sidebar surface
+    Y_OFFSET_SHOP = 158
+    Y_OFFSET_UPGRADES = 200
+    Y_SCALE = 40
+    X_ABSOLUTE = 10
+    
     def __new__(cls, screen) -> list:
         """
-        Adding a buy button? places to consider:
-        1 here in BuyButton to make the button
-        
-        if machine or tile button:
-        2 in TileManager.click_event_value (2 if sellable, 1 if not) actually places or sells the tile
-        1 in Tile.process_machine_tile for functionality / moneymaking
-        
-        if upgrade button:
-        add relevant upgrade info to button while making it
+        One button per catalog item, adding a buy button only needs an entry in catalog.ITEMS\n
+        (and a payout / click rule in Tile if it introduces a new rule)
         """
+        arr = []
         
-        cls.arr = []
-        
-        # height of button is determined first by its y offset, then its scale
-        y_offset_shop = 158
-        y_offset_upgrades = 200
-        y_scale = 40
-        x_absolute = BaseUI.BOARD_SIZE_PIXELS[0] + 10
-        
-        # water tile
-        cls.arr.append(Button(screen, 
-            cost=17, 
-            icon_location="img/icon_blue.png",
-            machine_location=None,
-            label="Water Tile", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            increase = 0
-        ))
-        
-        # pavement
-        cls.arr.append(Button(screen, 
-            cost=23, 
-            icon_location="img/icon_pavement.png",
-            machine_location=None,
-            label="Decorative Pavement", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            increase = 0
-        ))
-        
-        # dirt excav
-        cls.arr.append(Button(screen, 
-            cost=32, 
-            icon_location="img/icon_dirt_excav.png", 
-            machine_location="img/machine_dirt_excav.png", 
-            label="Dirt Excavator", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            profit=1,
-            increase = 2
-        ))
-        
-        # house
-        cls.arr.append(Button(screen,
-            cost=500, 
-            icon_location="img/icon_house.png", 
-            machine_location="img/machine_house.png", 
-            label="House", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            profit=8,
-            increase = 24
-        ))
-        
-        # grass harv
-        cls.arr.append(Button(screen,
-            cost=2100, 
-            icon_location="img/icon_grass_excav.png", 
-            machine_location="img/machine_grass_excav.png", 
-            label="Grass Harvester", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            profit=12,
-            increase = 400
-        ))
-        
-        # water pump
-        cls.arr.append(Button(screen,
-            cost=34000, 
-            icon_location="img/icon_water_pump.png", 
-            machine_location="img/machine_water_pump.png", 
-            label="Water Pump", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            profit=-54, # cost to run pump
-            increase = 1000
-        ))
-        
-        # market
-        cls.arr.append(Button(screen,
-            cost=210000, 
-            icon_location="img/icon_market.png",
-            machine_location="img/machine_market.png",
-            label="Market", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            profit=0, # uses a randomly unique mostly positive, sometimes negative function in Tile,
-            increase = 10000
-        ))
-        
-        # quant tile
-        cls.arr.append(Button(screen,
-            cost=1001000, 
-            icon_location="img/icon_quantum_tile.png",
-            machine_location=None,
-            label="Quantum Tile", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            increase = 100000
-        ))
-        
-        # quant pc machine
-        cls.arr.append(Button(screen,
-            cost=2001000, 
-            icon_location="img/icon_quantum_pc.png",
-            machine_location="img/machine_quantum_pc.png",
-            label="Quantum PC", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_shop),
-            profit=20000,
-            increase = 240000
-        ))
-        
-        # upgrades
-        # grass mult upgrade
-        cls.arr.append(Button(screen,
-            cost=170, 
-            icon_location="img/icon_grass_mult.png", 
-            machine_location=None, 
-            label="Grass Profit x2", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_upgrades),
-            is_upgrade=True,
-            upgrade_max_stages=7,
-            upgrade_key="grass"
-        ))
-        
-        # rent upgrade
-        cls.arr.append(Button(screen,
-            cost=500, 
-            icon_location="img/icon_house.png", 
-            machine_location="img/machine_house.png", 
-            label="Rent x2", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_upgrades),
-            is_upgrade=True,
-            upgrade_max_stages=12,
-            upgrade_key="rent"
-        ))
-        
-        # grass spread upgrade
-        cls.arr.append(Button(screen,
-            cost=2100, 
-            icon_location="img/icon_grass_mult.png", 
-            machine_location=None, 
-            label="Grass Spreads x2", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_upgrades),
-            is_upgrade=True,
-            upgrade_max_stages=5,
-            upgrade_key="grassspread"
-        ))
-        
-        # market mult upgrade
-        cls.arr.append(Button(screen,
-            cost=17000, 
-            icon_location="img/icon_market.png",
-            machine_location=None,
-            label="Market Mult x2", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_upgrades),
-            is_upgrade=True,
-            upgrade_max_stages=6,
-            upgrade_key="market"
-        ))
-        
-        # quantum mult upgrade
-        cls.arr.append(Button(screen,
-            cost=1700000, 
-            icon_location="img/icon_quantum_pc.png",
-            machine_location=None,
-            label="Quantum Mult x2", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_upgrades),
-            is_upgrade=True,
-            upgrade_max_stages=6,
-            upgrade_key="qt"
-        ))
-        
-        # win pillar
-        cls.arr.append(Button(screen,
-            cost=1000000000, 
-            icon_location="img/icon_win.png",
-            machine_location=None,
-            label="WIN", 
-            coord=(x_absolute, (len(cls.arr) * y_scale) + y_offset_upgrades),
-            is_upgrade=True,
-            upgrade_max_stages=1,
-            upgrade_key="win"
-        ))
+        for item_code, item in enumerate(ITEMS):
+            is_upgrade = item["kind"] == "upgrade"
+            y_offset = cls.Y_OFFSET_UPGRADES if is_upgrade else cls.Y_OFFSET_SHOP
+            
+            arr.append(Button(screen,
+                cost=item["cost"],
+                icon_location=item["icon"],
+                machine_location=item.get("sprite"),
+                label=item["label"],
+                coord=(cls.X_ABSOLUTE, (len(arr) * cls.Y_SCALE) + y_offset),
+                profit=item.get("profit"),
+                is_upgrade=is_upgrade,
+                upgrade_max_stages=item.get("upgrade_max_stages", 2),
+                upgrade_key=item.get("upgrade_key", ""),
+                increase=item.get("increase", 0),
+                item_code=item_code
+            ))
         
         # return whole list afterwards
-        return cls.arr
+        return arr
+    
+    
+    @classmethod
+    def index_at(cls, buttons: list, local_coord: tuple) -> int | None:
+        """
+        Index of the button in buttons (a list BuyButtons made) under a sidebar-local coord, or None.\n
+        Rows are a fixed layout so the row is computed straight from y instead of checking every button
+        """
+        y = local_coord[1]
+        index = (y - cls.Y_OFFSET_SHOP) // cls.Y_SCALE
+        if not 0 <= index < SHOP_COUNT:
+            index = (y - cls.Y_OFFSET_UPGRADES) // cls.Y_SCALE
+            if not SHOP_COUNT <= index < len(buttons):
+                return None
+        
+        # x bounds and the gap between rows
+        if buttons[index].within_bounds(local_coord):
+            return index
+        return None
 
 
 class PauseMenu(StaticUI):
     """Instructions Menu"""
+    IMAGE = "img/instructions.jpg"
+    
     def __init__(self, screen):
         self.screen = screen
-        self.surf = pygame.image.load("img/instructions.jpg")
-        self.surf.set_alpha(40)
-    
-    
-    def draw_menu(self):
-        self.screen.blit(self.surf, (0, 0))
+        self.scaled = None # surf at render scale, made on first draw
+        
+        # big jpg, decode in the background while the first frame renders
+        Assets.preload([self.IMAGE])
+    
+    
+    @property
+    def surf(self) -> pygame.Surface:
+        """Instructions image, waits for it if it's still decoding"""
+        surf = Assets.get(self.IMAGE)
+        surf.set_alpha(40)
+        return surf
+    
+    
+    def draw_menu(self) -> bool:
+        """Blend the menu over the screen once, returns False if the image isn't decoded yet"""
+        # not decoded yet, show it a few frames later instead of stalling
+        if Assets.peek(self.IMAGE) == None:
+            return False
+        if self.scaled == None:
+            self.scaled = BaseUI.scale_surface(self.surf)
+            self.scaled.set_alpha(40)
+        self.screen.blit(self.scaled, (0, 0))
+        return True
 
 
 class WinMenu(StaticUI):
     """Fancy Win Menu -- Only for Winners!"""
+    IMAGE = "img/win.jpg"
+    
     def __init__(self, screen):
         self.screen = screen
-        self.surf = pygame.image.load("img/win.jpg")
-        self.surf.set_alpha(100)
+        self.surf = None # only winners need it, loaded on first draw
         
         self.randomize_fresh()
         self.stage = 10 # once reaches 0 it will re randomize
     
     
     def randomize_fresh(self):
-        self.surf.set_alpha(100)
+        if self.surf != None:
+            self.surf.set_alpha(100)
         self.x = random.randint(-200, BaseUI.BOARD_SIZE_PIXELS[0] + 200)
         self.y = random.randint(-200, BaseUI.BOARD_SIZE_PIXELS[1] - 200)
         self.ran_x = random.randint(1, 6) * (random.randint(0, 1) -.5) * 2
@@ -601,6 +587,10 @@ class WinMenu(StaticUI):
     
     
     def draw_menu(self):
+        if self.surf == None:
+            self.surf = BaseUI.scale_surface(Assets.get(self.IMAGE))
+            self.surf.set_alpha(100)
+        
         if self.stage == 0:
             self.stage = 20
             self.randomize_fresh()
@@ -608,29 +598,83 @@ class WinMenu(StaticUI):
         if self.stage == 1:
             self.surf.set_alpha(255)
             
-        self.screen.blit(self.surf, (self.x, self.y))
+        self.screen.blit(self.surf, BaseUI.to_render((self.x, self.y)))
         self.x += self.ran_x
         self.y += self.ran_y
         self.stage -= 1
 
 
+class Sidebar():
+    """
+    Retained-mode sidebar\n
+    Everything right of the board is drawn into one cached surface. Widgets are DynamicUI
+    elements with a dirty flag, only dirty ones get redrawn (once per frame at most),
+    and the surface is only blitted to the screen if something changed.
+    The surface stays at layout size, below render scale 1 a resized copy is blitted.
+    """
+    WIDTH = 400
+    
+    def __init__(self, screen):
+        self.screen = screen
+        self.x = BaseUI.BOARD_SIZE_PIXELS[0] # layout x of the sidebar
+        self.surf = pygame.Surface((self.WIDTH, BaseUI.BOARD_SIZE_PIXELS[1]))
+        self.widgets = [] # list of (DynamicUI, draw function)
+        self.needs_blit = True
+    
+    
+    def add_widget(self, widget: DynamicUI, draw_fn):
+        """Track a widget, draw_fn redraws it onto self.surf"""
+        self.widgets.append((widget, draw_fn))
+    
+    
+    def to_local(self, coord: tuple) -> tuple:
+        """Layout coord to sidebar surface coord"""
+        return (coord[0] - self.x, coord[1])
+    
+    
+    def invalidate(self):
+        """Something else drew over the sidebar on screen, blit it again next render"""
+        self.needs_blit = True
+    
+    
+    def render(self) -> bool:
+        """Redraw dirty widgets and blit if anything changed. Returns True if it blitted"""
+        for widget, draw_fn in self.widgets:
+            if widget.dirty:
+                draw_fn()
+                widget.dirty = False
+                self.needs_blit = True
+        
+        if not self.needs_blit:
+            return False
+        
+        self.screen.blit(BaseUI.scale_surface(self.surf), BaseUI.to_render((self.x, 0)))
+        self.needs_blit = False
+        return True
+
+
 class UIManager():
+    MPS_WINDOW = 10 # seconds of income averaged for the money per second counter
+    
     def __init__(self, screen):
-        """Setup UI components. Init is drawn behind TileManager"""
-        sui = StaticUI(screen, (BaseUI.BOARD_SIZE_PIXELS[0], 0)) # static encompasses all elements
-        self.coins = DynamicUI(screen) # dynamic UI elements are individually tracked
-        self.mps = DynamicUI(screen) # money per second
-        self.buy_buttons_arr = BuyButtons(screen)
+        """Setup UI components. Everything is drawn into the retained sidebar surface"""
+        self.sidebar = Sidebar(screen)
+        surf = self.sidebar.surf
+        sui = StaticUI(surf, (0, 0)) # static encompasses all elements
+        self.coins = DynamicUI(surf) # dynamic UI elements are individually tracked
+        self.mps = DynamicUI(surf) # money per second
+        self.buy_buttons_arr = BuyButtons(surf)
         self.mps_frame = 3 # only render money per second every 3 frames for visibility
+        self.income = IncomeMeter()
         
         self.screen = screen
         self.active_button = None
         
-        # draw static UI in order as it appears
+        # draw static UI in order as it appears, only once
         sui.draw_image("img/icon_tilecoin.png", padding=(10, 14))
         # ---
         sui.draw_text("p", "<ESC for Instructions>", color=(80,80,80), padding=(80, 0))
-        self.mults = DynamicUI(screen)
+        self.mults = DynamicUI(surf)
         sui.draw_separator()
         # ---
         sui.draw_text("h2", "SHOP", color=BaseUI.GOLD_COLOR, padding=(145, 0))
@@ -641,46 +685,81 @@ class UIManager():
         # dynamic components
         # coin counter
         self.coins.set_inner_attr("coins", 0) # debug::starting cash
-        self.coins.draw_text("h2", "0", color=BaseUI.GOLD_COLOR, coord=(BaseUI.BOARD_SIZE_PIXELS[0] + 68, 4))
+        self.sidebar.add_widget(self.coins, self.draw_coins)
         # money per second
         self.mps.set_inner_attr("mps", 0)
-        self.mps.draw_text("p", f"0 / sec", color="white", coord=(BaseUI.BOARD_SIZE_PIXELS[0] + 68, 42))
+        self.sidebar.add_widget(self.mps, self.draw_mps)
+        # shop and upgrade buttons
+        for buy_button in self.buy_buttons_arr:
+            self.sidebar.add_widget(buy_button, buy_button.draw_button)
+    
+    
+    def draw_coins(self):
+        """Reset coins bg and redraw"""
+        self.coins.draw_visible_box((68, 4), (400, 46), color=(0, 0, 0))
+        self.coins.draw_text("h2", self.coins.get_inner_attr("coins"), color=BaseUI.GOLD_COLOR, coord=(68, 4), displayitize=True)
     
     
-    def update_mps(self, sma: float):
+    def draw_mps(self):
+        """Reset money per second bg and redraw"""
+        mps = BaseUI.displayitize_thousands(self.mps.get_inner_attr("mps"))
+        self.mps.draw_visible_box((68, 42), (400, 74), color=(0, 0, 0))
+        self.mps.draw_text("p", f"{mps} / sec", color="white", coord=(68, 42))
+    
+    
+    def update_mps(self):
         """Update money per second"""
         if self.mps_frame == 0:
-            self.mps.set_inner_attr("mps", sma)
-            
-            # reset bg and redraw
-            sma = BaseUI.displayitize_thousands(sma)
-            self.mps.draw_visible_box((BaseUI.BOARD_SIZE_PIXELS[0] + 68, 42), (BaseUI.BOARD_SIZE_PIXELS[0] + 400, 74), color=(0, 0, 0))
-            self.mps.draw_text("p", f"{sma} / sec", color="white", coord=(BaseUI.BOARD_SIZE_PIXELS[0] + 68, 42))
-            
+            self.mps.set_inner_attr("mps", round(self.income.rate(self.MPS_WINDOW)))
             self.mps_frame = 3
         else:
             self.mps_frame -= 1
     
     
-    def update_coins(self, value_clicked: int):
-        """Update Coins"""
-        # on click that is a tile delete coins and redraw
+    def update_coins(self, value_clicked: int, is_income: bool = True):
+        """Update Coins. Use is_income False for purchases and sales so they stay out of money per second"""
+        # redrawn once on the next render, no matter how many payouts came in this frame
         self.coins.change_inner_attr("coins", value_clicked)
-        
-        # reset coins and redraw
-        self.coins.draw_visible_box((BaseUI.BOARD_SIZE_PIXELS[0] + 68, 4), (BaseUI.BOARD_SIZE_PIXELS[0] + 400, 46), color=(0, 0, 0))
-        self.coins.draw_text("h2", self.coins.get_inner_attr("coins"), color=BaseUI.GOLD_COLOR, coord=(BaseUI.BOARD_SIZE_PIXELS[0] + 68, 4), displayitize=True)
+        if is_income:
+            self.income.record(value_clicked)
     
     
     def button_check(self, click_coord: tuple):
-        """Check if buttons should be activated or inactivated."""
-        self.active_button = None
+        """Activate the clicked button, clicking the active button or anything else deselects."""
+        index = BuyButtons.index_at(self.buy_buttons_arr, self.sidebar.to_local(click_coord))
+        clicked = None if index is None else self.buy_buttons_arr[index]
         
-        for buy_button in self.buy_buttons_arr:
-            if buy_button.click_within_bounds(click_coord):
-                self.active_button = buy_button
+        if clicked is self.active_button:
+            # clicked the already active button, toggle it off
+            clicked = None
+        self.select(clicked)
+    
+    
+    def select(self, button: Button | None):
+        """Make button the active one, only the old and new buttons get redrawn"""
+        if self.active_button != None:
+            self.active_button.set_status(False)
+        if button != None:
+            button.set_status(True)
+        self.active_button = button
+    
+    
+    def deselect(self):
+        """Deselect the active button"""
+        self.select(None)
     
     
     def refresh_button(self):
+        """Active button cost may have changed"""
         if self.active_button != None:
-            self.active_button.draw_button()
\ No newline at end of file
+            self.active_button.invalidate()
+    
+    
+    def invalidate(self):
+        """Blit the whole sidebar again, e.g. after a menu drew over it"""
+        self.sidebar.invalidate()
+    
+    
+    def render(self) -> bool:
+        """Draw the sidebar, call once per frame"""
+        return self.sidebar.render()